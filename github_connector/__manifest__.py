@@ -6,7 +6,7 @@
 {
     "name": "Github Connector",
     "summary": "Synchronize information from Github repositories",
-    "version": "14.0.2.3.0",
+    "version": "14.0.2.4.0",
     "category": "Connector",
     "license": "AGPL-3",
     "author": "Odoo Community Association (OCA), GRAP, Akretion, Tecnativa",
@@ -30,10 +30,15 @@
         "views/view_github_repository.xml",
         "views/view_github_repository_branch.xml",
         "views/view_github_team.xml",
+        "views/view_github_api_cache.xml",
+        "views/view_github_avatar_queue.xml",
+        "views/view_github_api_usage.xml",
+        "views/view_github_sync_run.xml",
         "views/menu.xml",
         "report/github_repository_branch_rule_info_report_view.xml",
         "wizards/view_wizard_create_team.xml",
         "wizards/view_wizard_create_repository.xml",
+        "wizards/view_wizard_sync_plan.xml",
     ],
     "demo": [
         "demo/github_analysis_rule_group_demo.xml",
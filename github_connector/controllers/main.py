@@ -0,0 +1,38 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import json
+import logging
+
+from odoo import http
+from odoo.http import Response, request
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubWebhookController(http.Controller):
+    @http.route(
+        "/github_connector/webhook",
+        type="http",
+        auth="public",
+        methods=["POST"],
+        csrf=False,
+    )
+    def webhook(self, **kwargs):
+        """Receive the deliveries of a Github webhook, configured with the
+        'application/json' content type and the 'github.webhook_secret'
+        secret"""
+        webhook = request.env["github.webhook"].sudo()
+        body = request.httprequest.get_data()
+        signature = request.httprequest.headers.get("X-Hub-Signature-256")
+        if not webhook._verify_signature(body, signature):
+            _logger.warning("Github webhook delivery with an invalid signature.")
+            return Response("Invalid signature", status=403)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return Response("Invalid payload", status=400)
+        webhook._process_event(
+            request.httprequest.headers.get("X-GitHub-Event"), payload
+        )
+        return Response("OK", status=200)
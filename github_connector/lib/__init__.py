@@ -0,0 +1,7 @@
+from . import avatar
+from . import client
+from . import crawler
+from . import fetch
+from . import git_download
+from . import graphql
+from . import retry
@@ -0,0 +1,101 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Download of the Github avatars.
+
+The avatars are downloaded concurrently, through a pooled HTTP session, and
+kept in a small in-memory cache keyed by URL: Github versions the avatar
+URLs (``?v=``), so a given URL always returns the same image, and a user
+member of several organizations is downloaded once.
+
+The downloads share the retry policy and the circuit breaker of the calls to
+the Github API (see ``retry``).
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+
+from .retry import CircuitOpenError, call_with_retry
+
+_logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 256
+DEFAULT_TIMEOUT = 10
+
+_session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def checksum(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def _cache_get(url):
+    with _cache_lock:
+        content = _cache.get(url)
+        if content is not None:
+            _cache.move_to_end(url)
+        return content
+
+
+def _cache_set(url, content):
+    with _cache_lock:
+        _cache[url] = content
+        _cache.move_to_end(url)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _download(url, max_try):
+    try:
+        response = call_with_retry(
+            lambda: _session.get(url, timeout=DEFAULT_TIMEOUT), max_try=max_try
+        )
+        response.raise_for_status()
+        return response.content
+    except (requests.RequestException, CircuitOpenError) as err:
+        _logger.warning("Unable to download the avatar %s: %s", url, err)
+    return None
+
+
+def fetch_avatars(urls, concurrency, max_try):
+    """Return {url: content} for the given avatar URLs.
+
+    The avatars that could not be downloaded are not in the result.
+    """
+    res = {}
+    to_download = []
+    for url in set(urls):
+        content = _cache_get(url)
+        if content is None:
+            to_download.append(url)
+        else:
+            res[url] = content
+    if not to_download:
+        return res
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(to_download))),
+        thread_name_prefix="github_avatar",
+    ) as executor:
+        contents = list(executor.map(partial(_download, max_try=max_try), to_download))
+    for i, url in enumerate(to_download):
+        content = contents[i]
+        if content is not None:
+            _cache_set(url, content)
+            res[url] = content
+    return res
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
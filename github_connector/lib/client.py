@@ -0,0 +1,398 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Process-wide registry of Github API clients.
+
+Building a new ``Github`` object for each call means a new HTTP session, and
+so new TCP / TLS handshakes for every request. The clients are here shared by
+all the calls made in a worker (process or thread), keyed by base URL and
+token, and the underlying keep-alive connections are pooled.
+
+The clients can also be given a cache store, in which case the GET calls are
+made conditional (ETag / Last-Modified). When Github answers ``304 Not
+Modified`` (which does not consume the rate limit), the cached response is
+replayed to PyGithub.
+
+The failed calls are retried, and the calls suspended when Github fails
+repeatedly (see ``retry``).
+"""
+
+import json
+import logging
+import threading
+import time
+from functools import partial
+
+import requests
+from github import Github
+from github.GithubException import GithubException
+from github.Requester import RequestsResponse
+
+from .retry import call_with_retry
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.github.com"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 15
+
+# Headers that are not replayed from the cache, but taken from the
+# (304) response actually received
+_UNCACHED_HEADERS = {
+    "content-length",
+    "content-encoding",
+    "transfer-encoding",
+    "date",
+    "x-github-request-id",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+    "x-ratelimit-used",
+    "x-ratelimit-resource",
+}
+CACHE_HEADER = "X-Github-Connector-Cache"
+
+_clients = {}
+_clients_lock = threading.RLock()
+_recorders = threading.local()
+
+
+class RequestRecorder:
+    """Collect statistics about the calls made to the Github API.
+
+    A recorder is active in the current thread while used as a context
+    manager. Recorders can be nested, and shared by several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_qty = 0
+        self.not_modified_qty = 0
+        self.network_time = 0.0
+        self.retry_qty = 0
+        self.retry_time = 0.0
+        self.trip_qty = 0
+        self.rate_limit = {}
+
+    def __enter__(self):
+        active_recorders().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        active_recorders().remove(self)
+
+    @property
+    def consumed_qty(self):
+        """Calls counted by Github in the rate limit"""
+        return self.request_qty - self.not_modified_qty
+
+    def record(self, response, elapsed, rate_limit):
+        with self._lock:
+            self.request_qty += 1
+            self.network_time += elapsed
+            if response.status_code == 304:
+                self.not_modified_qty += 1
+            if rate_limit:
+                self.rate_limit[rate_limit[0]] = rate_limit[1:]
+
+    def record_retry(self, delay):
+        with self._lock:
+            self.retry_qty += 1
+            self.retry_time += delay
+
+    def record_trip(self):
+        with self._lock:
+            self.trip_qty += 1
+
+
+class SyncRecorder(RequestRecorder):
+    """Also collect, by model, the records synchronized from Github, and
+    the cost of the synchronization in SQL queries and in time (set by
+    the caller)."""
+
+    def __init__(self):
+        super().__init__()
+        self.query_qty = 0
+        self.duration = 0.0
+        self._record_ids = {}
+
+    def record_sync(self, model, ids, created=False, updated=False):
+        with self._lock:
+            record_ids = self._record_ids.setdefault(
+                model, {"seen": set(), "created": set(), "updated": set()}
+            )
+            record_ids["seen"].update(ids)
+            if created:
+                record_ids["created"].update(ids)
+            if updated:
+                record_ids["updated"].update(ids)
+
+    def get_record_qties(self):
+        """Return {model: (created, updated, unchanged)}"""
+        res = {}
+        for model, record_ids in self._record_ids.items():
+            updated = record_ids["updated"] - record_ids["created"]
+            res[model] = (
+                len(record_ids["created"]),
+                len(updated),
+                len(record_ids["seen"] - record_ids["created"] - updated),
+            )
+        return res
+
+
+def record_sync(model, ids, created=False, updated=False):
+    """Notify the active sync recorders of synchronized records"""
+    for recorder in active_recorders():
+        if isinstance(recorder, SyncRecorder):
+            recorder.record_sync(model, ids, created=created, updated=updated)
+
+
+def active_recorders():
+    """Return the recorders active in the current thread"""
+    if not hasattr(_recorders, "stack"):
+        _recorders.stack = []
+    return _recorders.stack
+
+
+def parse_rate_limit(headers):
+    """Return (resource, remaining, limit, reset timestamp) from the
+    X-RateLimit headers of a response, or None"""
+    if "X-RateLimit-Remaining" not in headers:
+        return None
+    return (
+        headers.get("X-RateLimit-Resource", "core"),
+        int(headers["X-RateLimit-Remaining"]),
+        int(headers.get("X-RateLimit-Limit", 0)),
+        int(headers.get("X-RateLimit-Reset", 0)),
+    )
+
+
+class GithubConnection:
+    """Mimic the httplib connection object expected by PyGithub.
+
+    Contrary to the connection classes provided by PyGithub, the request
+    being prepared is stored in a thread local, so a single connection
+    (and the pooled session behind it) can be used by several threads.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=None,
+        strict=False,
+        timeout=None,
+        retry=None,
+        pool_size=None,
+        client=None,
+        protocol="https",
+        **kwargs
+    ):
+        self.protocol = protocol
+        self.host = host
+        self.port = port if port else (443 if protocol == "https" else 80)
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.client = client
+        self._local = threading.local()
+
+    def request(self, verb, url, input, headers):
+        self._local.request = (verb, url, input, headers)
+
+    def getresponse(self):
+        verb, url, data, headers = self._local.request
+        del self._local.request
+        response = self.client.request(
+            verb,
+            "{}://{}:{}{}".format(self.protocol, self.host, self.port, url),
+            headers=headers,
+            data=data,
+            timeout=self.timeout,
+            verify=self.verify,
+        )
+        return RequestsResponse(response)
+
+    def close(self):
+        return
+
+
+class GithubClient:
+    """A Github API client, with its pooled HTTP session."""
+
+    def __init__(self, token, base_url, pool_size, timeout, cache=None):
+        self.token = token
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.cache = cache
+        # Last known rate limit, by resource: (remaining, limit, reset)
+        self.rate_limit = {}
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.github = Github(
+            token, base_url=base_url, timeout=timeout, pool_size=pool_size
+        )
+        self.requester = self.github._Github__requester
+        self._install_connection_classes()
+
+    def _install_connection_classes(self):
+        # PyGithub creates its connections through the classes stored
+        # on the requester. Replace them by our pooled, thread safe one.
+        requester = self.requester
+        https_class = partial(GithubConnection, client=self, protocol="https")
+        http_class = partial(GithubConnection, client=self, protocol="http")
+        requester._Requester__httpsConnectionClass = https_class
+        requester._Requester__httpConnectionClass = http_class
+        requester._Requester__connectionClass = (
+            http_class if base_url_scheme(self.base_url) == "http" else https_class
+        )
+        requester._Requester__connection = None
+
+    def request(self, verb, url, headers=None, data=None, **kwargs):
+        """Send a request to the Github API, through the pooled session"""
+        entry = None
+        headers = dict(headers or {})
+        if verb == "GET" and self.cache is not None:
+            entry = self.cache.get(url)
+            if entry:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+        def send():
+            start = time.monotonic()
+            response = self.session.request(
+                verb, url, headers=headers, data=data, allow_redirects=False, **kwargs
+            )
+            self._record(response, time.monotonic() - start)
+            return response
+
+        response = call_with_retry(send, recorders=active_recorders)
+        if entry and response.status_code == 304:
+            return self._replay_cache_entry(entry, response)
+        if verb == "GET" and self.cache is not None and response.status_code == 200:
+            self._store_cache_entry(url, response)
+        return response
+
+    @property
+    def graphql_url(self):
+        # https://api.github.com/graphql, or for Github Enterprise Server,
+        # https://host/api/graphql
+        if self.base_url.endswith("/api/v3"):
+            return self.base_url[: -len("/v3")] + "/graphql"
+        return self.base_url + "/graphql"
+
+    def graphql(self, query, variables=None, allow_partial=False):
+        """Run a query on the Github GraphQL API, and return its data.
+
+        :param allow_partial: if True, errors are ignored if some data
+            was returned (for example when one of the queried repositories
+            does not exist)
+        """
+        response = self.request(
+            "POST",
+            self.graphql_url,
+            headers={
+                "Authorization": "bearer %s" % self.token,
+                "Content-Type": "application/json",
+            },
+            data=json.dumps({"query": query, "variables": variables or {}}),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        output = response.json() if response.text else {}
+        if response.status_code >= 400:
+            raise GithubException(response.status_code, output, response.headers)
+        if output.get("errors") and not (allow_partial and output.get("data")):
+            raise GithubException(response.status_code, output, response.headers)
+        return output["data"]
+
+    def _record(self, response, elapsed):
+        rate_limit = parse_rate_limit(response.headers)
+        if rate_limit:
+            self.rate_limit[rate_limit[0]] = rate_limit[1:]
+        for recorder in active_recorders():
+            recorder.record(response, elapsed, rate_limit)
+
+    def _store_cache_entry(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        headers = {
+            k: v
+            for k, v in response.headers.items()
+            if k.lower() not in _UNCACHED_HEADERS
+        }
+        self.cache.set(
+            url,
+            {
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": json.dumps(headers),
+                "payload": response.text,
+            },
+        )
+
+    def _replay_cache_entry(self, entry, not_modified):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = not_modified.url
+        response.encoding = "utf-8"
+        response._content = entry["payload"].encode("utf-8")
+        response.headers.update(json.loads(entry["headers"] or "{}"))
+        response.headers.update(
+            {
+                k: v
+                for k, v in not_modified.headers.items()
+                if k.lower() in _UNCACHED_HEADERS - {"content-length"}
+            }
+        )
+        response.headers[CACHE_HEADER] = "HIT"
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def base_url_scheme(base_url):
+    return base_url.split("://", 1)[0].lower()
+
+
+def get_client(
+    token, base_url=DEFAULT_BASE_URL, pool_size=DEFAULT_POOL_SIZE, cache=None
+):
+    """Return the shared client for the given token and base URL.
+
+    Clients that were built for the same base URL and cache with another
+    token (or another pool size) are obsolete, and are closed.
+
+    :param cache: optional cache store, providing ``get(url)`` and
+        ``set(url, values)``. It must be hashable, as it is part of the
+        registry key.
+    """
+    key = (base_url, cache, token, pool_size)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            for other_key in [k for k in _clients if k[:2] == key[:2]]:
+                _clients.pop(other_key).close()
+            _logger.debug(
+                "New Github client for %s (pool size %d)", base_url, pool_size
+            )
+            client = _clients[key] = GithubClient(
+                token, base_url, pool_size, DEFAULT_TIMEOUT, cache=cache
+            )
+    return client
+
+
+def clear_clients():
+    """Drop all the clients of the current worker."""
+    with _clients_lock:
+        while _clients:
+            _clients.popitem()[1].close()
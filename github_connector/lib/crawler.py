@@ -0,0 +1,311 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Concurrent crawl of a Github organization.
+
+The REST synchronization walks the members, the repositories, their branches
+and the teams one call after the other, interleaved with the ORM writes.
+Here, an asyncio crawler walks the whole organization, with at most
+``concurrency`` calls in flight, made in a thread pool through the shared
+client (and so its pooled connections, its cache and its retries). The
+crawl only collects the raw Github data (as returned by the REST API), that
+is then written by the caller, in its own thread.
+
+The crawl stops with ``RateLimitReserveReached`` when the remaining rate
+limit falls below the given reserve.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+
+from github.GithubException import GithubException
+
+from .client import DEFAULT_TIMEOUT
+from .fetch import _call_with_recorders, active_recorders
+
+_logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+TEAM_ROLES = ("member", "maintainer")
+
+
+class RateLimitReserveReached(GithubException):
+    """Raised when the crawl would consume the reserve of the rate limit"""
+
+
+class CrawlResult:
+    """Raw Github data of an organization.
+
+    :ivar members: users members of the organization
+    :ivar repositories: repositories of the organization
+    :ivar branches: {repository full name: names of the serie branches},
+        only for the repositories whose branches were crawled
+    :ivar teams: teams of the organization
+    :ivar team_members: {team id: [(user, role)]}
+    :ivar team_repositories: {team id: [repository]}, with their
+        'permissions' for the team
+    """
+
+    def __init__(self):
+        self.members = []
+        self.repositories = []
+        self.branches = {}
+        self.teams = []
+        self.team_members = {}
+        self.team_repositories = {}
+
+
+def _parse_date(value):
+    return value and datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+class OrganizationCrawler:
+    """Crawl an organization, its members, repositories, branches and teams.
+
+    :param client: ``GithubClient``
+    :param login: login of the organization
+    :param branch_names: names of the branches to look for (the series)
+    :param known_user_ids: Github ids of the users already known, that are
+        not completed (the user lists don't give their name)
+    :param watermark: the branches of the repositories not updated nor
+        pushed since this (naive UTC) date are not crawled
+    :param is_ignored: function telling if the branches of a repository
+        (given its name) must not be crawled
+    :param concurrency: maximum number of calls in flight
+    :param rate_limit_reserve: remaining rate limit not to consume
+    :param branch_lookup_threshold: the branches are looked up by name,
+        unless there are more names than this, in which case they are listed
+    """
+
+    def __init__(
+        self,
+        client,
+        login,
+        branch_names=(),
+        known_user_ids=(),
+        watermark=None,
+        is_ignored=None,
+        concurrency=4,
+        rate_limit_reserve=0,
+        branch_lookup_threshold=10,
+    ):
+        self.client = client
+        self.login = login
+        self.branch_names = list(branch_names)
+        self.known_user_ids = set(known_user_ids)
+        self.watermark = watermark
+        self.is_ignored = is_ignored or (lambda name: False)
+        self.concurrency = max(1, concurrency)
+        self.rate_limit_reserve = rate_limit_reserve
+        self.branch_lookup_threshold = branch_lookup_threshold
+        self.result = CrawlResult()
+        self._headers = {
+            "Authorization": "token %s" % client.token,
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "PyGithub/Python",
+        }
+        self._users = {}
+        self._tasks = []
+        self._recorders = []
+        self._loop = self._executor = self._semaphore = None
+
+    def crawl(self):
+        """Crawl the organization, and return a ``CrawlResult``"""
+        # The recorders are thread local: they are activated in the threads
+        # making the calls
+        self._recorders = list(active_recorders())
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="github_crawl"
+        )
+        try:
+            self._loop.run_until_complete(self._crawl())
+        finally:
+            # On error, cancel the rest of the crawl
+            pending = [x for x in self._tasks if not x.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            self._executor.shutdown(wait=True)
+            self._loop.close()
+        return self.result
+
+    async def _crawl(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        await self._gather(
+            self._crawl_members(), self._crawl_repositories(), self._crawl_teams()
+        )
+
+    def _task(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.append(task)
+        return task
+
+    def _gather(self, *coros):
+        return asyncio.gather(*[self._task(x) for x in coros])
+
+    # HTTP Section
+    def _check_rate_limit(self):
+        rate_limit = self.client.rate_limit.get("core")
+        if rate_limit and rate_limit[0] < self.rate_limit_reserve:
+            raise RateLimitReserveReached(
+                403,
+                {
+                    "message": "Github rate limit almost exhausted (%d remaining"
+                    " requests)." % rate_limit[0]
+                },
+                {},
+            )
+
+    async def _get(self, url, params=None, allow_404=False):
+        """Return the response of a GET call to the API"""
+        if params:
+            url = "{}?{}".format(url, urlencode(params))
+        async with self._semaphore:
+            self._check_rate_limit()
+            response = await asyncio.get_event_loop().run_in_executor(
+                self._executor,
+                _call_with_recorders,
+                self._recorders,
+                self._request,
+                url,
+            )
+        if response.status_code == 404 and allow_404:
+            return None
+        if response.status_code >= 400:
+            raise GithubException(
+                response.status_code,
+                response.json() if response.text else {},
+                response.headers,
+            )
+        return response
+
+    def _request(self, url):
+        return self.client.request(
+            "GET", url, headers=self._headers, timeout=DEFAULT_TIMEOUT
+        )
+
+    async def _get_list(self, url, params=None):
+        """Return all the items of a paginated list, the pages after the
+        first one being fetched together"""
+        params = dict(params or {}, per_page=PER_PAGE)
+        response = await self._get(url, params)
+        items = response.json()
+        last_url = response.links.get("last", {}).get("url")
+        if not last_url:
+            return items
+        page_qty = int(parse_qs(urlparse(last_url).query)["page"][0])
+        responses = await self._gather(
+            *[self._get(url, dict(params, page=i)) for i in range(2, page_qty + 1)]
+        )
+        for page_response in responses:
+            items += page_response.json()
+        return items
+
+    # Crawl Section
+    def _api_url(self, path):
+        return self.client.base_url + path
+
+    async def _complete_user(self, user):
+        """Return the complete data of a user, fetched once by crawl"""
+        if user["id"] in self.known_user_ids:
+            return user
+        if user["id"] not in self._users:
+            self._users[user["id"]] = self._task(self._get(user["url"]))
+        response = await self._users[user["id"]]
+        return response.json()
+
+    async def _complete_users(self, users):
+        return await self._gather(*[self._complete_user(x) for x in users])
+
+    async def _crawl_members(self):
+        members = await self._get_list(self._api_url("/orgs/%s/members" % self.login))
+        self.result.members = await self._complete_users(members)
+
+    async def _crawl_repositories(self):
+        repositories = await self._get_list(
+            self._api_url("/orgs/%s/repos" % self.login)
+        )
+        self.result.repositories = repositories
+        await self._gather(
+            *[
+                self._crawl_branches(x)
+                for x in repositories
+                if self._must_crawl_branches(x)
+            ]
+        )
+
+    def _must_crawl_branches(self, repository):
+        if not self.branch_names or self.is_ignored(repository["name"]):
+            return False
+        if not self.watermark:
+            return True
+        change_date = max(
+            filter(
+                None,
+                [
+                    _parse_date(repository.get("updated_at")),
+                    _parse_date(repository.get("pushed_at")),
+                ],
+            ),
+            default=None,
+        )
+        return not change_date or change_date > self.watermark
+
+    async def _crawl_branches(self, repository):
+        url = repository["url"] + "/branches"
+        if len(self.branch_names) > self.branch_lookup_threshold:
+            branches = await self._get_list(url)
+            found = {x["name"] for x in branches}
+        else:
+            responses = await self._gather(
+                *[
+                    self._get("{}/{}".format(url, quote(x, safe="")), allow_404=True)
+                    for x in self.branch_names
+                ]
+            )
+            # The redirections are not followed: as with the REST
+            # synchronization, a renamed branch (301 to its new name) is not
+            # a serie branch
+            found = {
+                self.branch_names[i]
+                for i, response in enumerate(responses)
+                if response is not None
+                and response.status_code == 200
+                and response.json().get("name") == self.branch_names[i]
+            }
+        self.result.branches[repository["full_name"]] = [
+            x for x in self.branch_names if x in found
+        ]
+
+    async def _crawl_teams(self):
+        teams = await self._get_list(self._api_url("/orgs/%s/teams" % self.login))
+        self.result.teams = teams
+        await self._gather(*[self._crawl_team(x) for x in teams])
+
+    async def _crawl_team(self, team):
+        # The role of the members is not in the list: list each role
+        lists = await self._gather(
+            *[
+                self._get_list(team["url"] + "/members", {"role": role})
+                for role in TEAM_ROLES
+            ],
+            self._get_list(team["url"] + "/repos")
+        )
+        members = []
+        for i, role in enumerate(TEAM_ROLES):
+            users = await self._complete_users(lists[i])
+            members += [(user, role) for user in users]
+        self.result.team_members[team["id"]] = members
+        self.result.team_repositories[team["id"]] = lists[-1]
+
+
+def crawl_organization(client, login, **kwargs):
+    """Crawl an organization (see ``OrganizationCrawler``), and return a
+    ``CrawlResult``"""
+    return OrganizationCrawler(client, login, **kwargs).crawl()
@@ -0,0 +1,85 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Concurrent fetch of the Github paginated lists.
+
+Iterating a PyGithub ``PaginatedList`` requests the pages one after the
+other, and completing the lazy objects (for example the users, whose name
+and email are not in the members list) costs one more call by object, also
+made serially. Here, the pages and the completions are fetched in a bounded
+thread pool, while the items are yielded in the order of the list, in the
+calling thread, that stays the only one using the ORM.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import active_recorders
+
+DEFAULT_CONCURRENCY = 4
+
+
+def _call_with_recorders(recorders, func, *args):
+    # The recorders are thread local: activate the ones of the calling
+    # thread in the worker, so that the requests made are still counted.
+    stack = active_recorders()
+    stack.extend(recorders)
+    try:
+        return func(*args)
+    finally:
+        del stack[len(stack) - len(recorders) :]
+
+
+def _complete(item):
+    # raw_data completes the object if needed
+    item.raw_data
+    return item
+
+
+def complete_many(items, concurrency):
+    """Complete the given lazy objects, concurrently.
+
+    :param items: list of PyGithub objects
+    :param concurrency: maximum number of concurrent requests
+    """
+    if concurrency <= 1 or len(items) <= 1:
+        for item in items:
+            _complete(item)
+        return
+    recorders = list(active_recorders())
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="github_fetch"
+    ) as executor:
+        futures = [
+            executor.submit(_call_with_recorders, recorders, _complete, item)
+            for item in items
+        ]
+        for future in futures:
+            future.result()
+
+
+def iter_paginated(paginated_list, per_page, concurrency):
+    """Yield the items of a paginated list, in order.
+
+    :param paginated_list: PyGithub PaginatedList
+    :param per_page: number of items by page, as set on the Github object
+    :param concurrency: maximum number of concurrent requests. With 1, the
+        list is simply iterated.
+    """
+    if concurrency <= 1:
+        yield from paginated_list
+        return
+    recorders = list(active_recorders())
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="github_fetch"
+    ) as executor:
+
+        def submit(func, *args):
+            return executor.submit(_call_with_recorders, recorders, func, *args)
+
+        # The size of the list is only known after the first page: a full
+        # one means there are more pages, that are then fetched together
+        pages = [submit(paginated_list.get_page, 0)]
+        if len(pages[0].result()) >= per_page:
+            page_qty = -(-paginated_list.totalCount // per_page)
+            pages += [submit(paginated_list.get_page, i) for i in range(1, page_qty)]
+        for page in pages:
+            yield from page.result()
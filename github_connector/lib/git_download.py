@@ -0,0 +1,357 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Concurrent download of the source code of the branches.
+
+Cloning or updating a branch is mostly waiting for the network: the git
+commands are run in a bounded thread pool, each one in its own process, with
+a timeout. The results are returned to the calling thread, that stays the
+only one using the ORM.
+
+The branches are either independent clones, or worktrees of a bare mirror
+shared by the branches of a repository (see ``download_mirrored``), whose
+objects are then stored and fetched once.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 600
+
+
+CLONE_STRATEGIES = [
+    ("full", "Full History"),
+    ("single_branch", "Single Branch"),
+    ("shallow", "Shallow (Last Commits)"),
+    ("partial", "Partial (Blobs on Demand)"),
+]
+
+# A branch to download into path, with the options of the clone and of the
+# fetch of the updates (see get_strategy_args). The key identifies the job
+# for the caller. If mirror is set, path is a worktree of this bare mirror,
+# shared with the other jobs of the same mirror.
+DownloadJob = namedtuple(
+    "DownloadJob",
+    ["key", "url", "branch", "path", "clone_args", "fetch_args", "mirror"],
+)
+DownloadJob.__new__.__defaults__ = ((), (), None)
+
+
+def get_strategy_args(strategy, depth=1):
+    """Return (clone options, fetch options) of a clone strategy.
+
+    - full: all the branches, with their history
+    - single_branch: only the downloaded branch, with its history
+    - shallow: only the last ``depth`` commits of the branch
+    - partial: the history of the branch, but only the files of the
+      checked out commit (the others are fetched on demand)
+    """
+    if strategy == "single_branch":
+        return ["--single-branch"], []
+    if strategy == "shallow":
+        depth_args = ["--depth", str(max(1, depth))]
+        return depth_args + ["--single-branch"], depth_args
+    if strategy == "partial":
+        return ["--filter=blob:none", "--single-branch"], ["--filter=blob:none"]
+    return [], []
+
+
+class DownloadResult:
+    """Outcome of a ``DownloadJob``
+
+    :ivar changed: True if the branch was cloned, or if the update brought
+        new commits
+    :ivar error: the error message if the download failed, else None
+    """
+
+    def __init__(self, job, changed=False, error=None):
+        self.job = job
+        self.changed = changed
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+def _git(args, cwd, timeout):
+    return subprocess.run(
+        ["git"] + args,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+        timeout=timeout,
+        check=True,
+        env=dict(os.environ, GIT_TERMINAL_PROMPT="0"),
+    ).stdout
+
+
+def _head(path, timeout):
+    return _git(["rev-parse", "HEAD"], path, timeout).strip()
+
+
+def _is_clone(path):
+    # In a worktree, .git is a file
+    return os.path.isdir(os.path.join(path, ".git"))
+
+
+def _clone(job, timeout):
+    _logger.info("Cloning new repository into %s ...", job.path)
+    parent = os.path.dirname(job.path.rstrip(os.sep))
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    try:
+        _git(
+            ["clone", "--quiet", "-b", job.branch]
+            + list(job.clone_args)
+            + [job.url, job.path],
+            None,
+            timeout,
+        )
+    except Exception:
+        shutil.rmtree(job.path, ignore_errors=True)
+        raise
+    return DownloadResult(job, changed=True)
+
+
+def _update(job, timeout):
+    # The working tree is only read: it is reset to the fetched commit,
+    # with the same options as the clone (for example the depth)
+    _logger.info("Updating existing repository %s ...", job.path)
+    _git(
+        ["fetch", "--quiet"] + list(job.fetch_args) + ["origin", job.branch],
+        job.path,
+        timeout,
+    )
+    fetched = _git(["rev-parse", "FETCH_HEAD"], job.path, timeout).strip()
+    if fetched == _head(job.path, timeout):
+        return DownloadResult(job)
+    _git(["reset", "--quiet", "--hard", "FETCH_HEAD"], job.path, timeout)
+    return DownloadResult(job, changed=True)
+
+
+def _error_message(error):
+    if isinstance(error, subprocess.TimeoutExpired):
+        return "Timeout after %d seconds" % error.timeout
+    if isinstance(error, subprocess.CalledProcessError):
+        return (error.stderr or b"").decode(errors="replace").strip() or str(error)
+    return str(error)
+
+
+def download(job, timeout=DEFAULT_TIMEOUT):
+    """Clone the branch if it is not downloaded yet, update it otherwise.
+
+    If the update fails, the local folder is deleted and the branch cloned
+    again.
+    """
+    try:
+        if not _is_clone(job.path):
+            shutil.rmtree(job.path, ignore_errors=True)
+            return _clone(job, timeout)
+        try:
+            return _update(job, timeout)
+        except (OSError, subprocess.SubprocessError) as error:
+            _logger.warning(
+                "Error when updating the branch %s in the local folder %s (%s)."
+                " Deleting the local folder and trying again.",
+                job.branch,
+                job.path,
+                _error_message(error),
+            )
+            shutil.rmtree(job.path)
+            return _clone(job, timeout)
+    except (OSError, subprocess.SubprocessError) as error:
+        _logger.warning(
+            "Unable to download the branch %s into %s: %s",
+            job.branch,
+            job.path,
+            _error_message(error),
+        )
+        return DownloadResult(job, error=_error_message(error))
+
+
+def _is_shallow(path, timeout):
+    output = _git(["rev-parse", "--is-shallow-repository"], path, timeout)
+    return output.strip() == b"true"
+
+
+def _init_mirror(jobs, timeout):
+    """Create the bare mirror of the jobs, seeded with the objects of the
+    existing clones of their branches, so that only the new commits are then
+    downloaded"""
+    mirror = jobs[0].mirror
+    _logger.info("Creating the mirror %s ...", mirror)
+    shutil.rmtree(mirror, ignore_errors=True)
+    _git(["init", "--quiet", "--bare", mirror], None, timeout)
+    for job in jobs:
+        try:
+            # The history of a shallow clone would make the mirror shallow
+            if not _is_clone(job.path) or _is_shallow(job.path, timeout):
+                continue
+            _git(
+                ["fetch", "--quiet"]
+                + list(job.fetch_args)
+                + [os.path.abspath(job.path), "+HEAD:refs/heads/%s" % job.branch],
+                mirror,
+                timeout,
+            )
+        except (OSError, subprocess.SubprocessError) as error:
+            _logger.info(
+                "Unable to reuse the clone %s in the mirror %s: %s",
+                job.path,
+                mirror,
+                _error_message(error),
+            )
+
+
+def _fetch_mirror(jobs, timeout):
+    """Fetch the branches of the jobs into their mirror, or all the branches
+    of the repository if they are not cloned as single branches"""
+    job = jobs[0]
+    if "--single-branch" in job.clone_args:
+        refspecs = ["+refs/heads/{0}:refs/heads/{0}".format(x.branch) for x in jobs]
+    else:
+        refspecs = ["+refs/heads/*:refs/heads/*"]
+    _git(
+        ["fetch", "--quiet"] + list(job.fetch_args) + ["origin"] + refspecs,
+        job.mirror,
+        timeout,
+    )
+
+
+def _checkout(job, timeout):
+    """Check out the fetched branch in the worktree of the job, creating the
+    worktree (or replacing the clone of the branch) if needed"""
+    commit = _git(["rev-parse", "refs/heads/" + job.branch], job.mirror, timeout)
+    commit = commit.strip()
+    head = None
+    if os.path.isfile(os.path.join(job.path, ".git")):
+        try:
+            if _head(job.path, timeout) == commit:
+                return DownloadResult(job)
+            _git(
+                ["checkout", "--quiet", "--force", "--detach", commit.decode()],
+                job.path,
+                timeout,
+            )
+            return DownloadResult(job, changed=True)
+        except (OSError, subprocess.SubprocessError) as error:
+            _logger.warning(
+                "Error when updating the worktree %s (%s). Creating it again.",
+                job.path,
+                _error_message(error),
+            )
+    elif _is_clone(job.path):
+        # Clone of the previous layout: unchanged if at the same commit
+        try:
+            head = _head(job.path, timeout)
+        except (OSError, subprocess.SubprocessError):
+            head = None
+    shutil.rmtree(job.path, ignore_errors=True)
+    _git(["worktree", "prune"], job.mirror, timeout)
+    # The worktree is detached, as the fetches can't update a branch checked
+    # out in a worktree
+    _git(
+        [
+            "worktree",
+            "add",
+            "--quiet",
+            "--force",
+            "--detach",
+            os.path.abspath(job.path),
+            commit.decode(),
+        ],
+        job.mirror,
+        timeout,
+    )
+    return DownloadResult(job, changed=head != commit)
+
+
+def download_mirrored(jobs, timeout=DEFAULT_TIMEOUT):
+    """Download the branches of jobs sharing the same mirror: the bare
+    mirror is created if needed, fetched once for all the branches, then each
+    branch is checked out in its worktree.
+
+    The existing clones of the branches are migrated: they seed the new
+    mirror, and are replaced by worktrees.
+    """
+    mirror = jobs[0].mirror
+    errors = {}
+    try:
+        if not os.path.exists(os.path.join(mirror, "HEAD")):
+            _init_mirror(jobs, timeout)
+        # The repository may have been renamed
+        _git(["config", "remote.origin.url", jobs[0].url], mirror, timeout)
+        try:
+            _fetch_mirror(jobs, timeout)
+        except subprocess.CalledProcessError:
+            if len(jobs) == 1:
+                raise
+            # A missing branch fails the whole fetch: fetch them one by one
+            for i, job in enumerate(jobs):
+                try:
+                    _fetch_mirror([job], timeout)
+                except (OSError, subprocess.SubprocessError) as error:
+                    errors[i] = _error_message(error)
+    except (OSError, subprocess.SubprocessError) as error:
+        _logger.warning(
+            "Unable to fetch the mirror %s: %s", mirror, _error_message(error)
+        )
+        return [DownloadResult(x, error=_error_message(error)) for x in jobs]
+    results = []
+    for i, job in enumerate(jobs):
+        if i in errors:
+            results.append(DownloadResult(job, error=errors[i]))
+            continue
+        try:
+            results.append(_checkout(job, timeout))
+        except (OSError, subprocess.SubprocessError) as error:
+            _logger.warning(
+                "Unable to check out the branch %s into %s: %s",
+                job.branch,
+                job.path,
+                _error_message(error),
+            )
+            results.append(DownloadResult(job, error=_error_message(error)))
+    return results
+
+
+def _download_group(jobs, timeout):
+    if jobs[0].mirror:
+        return download_mirrored(jobs, timeout)
+    return [download(x, timeout) for x in jobs]
+
+
+def download_all(jobs, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """Download the given jobs with at most ``concurrency`` git processes at
+    the same time, and return their results, in the order of the jobs.
+
+    The jobs sharing a mirror are downloaded together, one after the other.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    groups = defaultdict(list)
+    for i, job in enumerate(jobs):
+        groups[job.mirror or i].append(i)
+    groups = list(groups.values())
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(groups))),
+        thread_name_prefix="github_git",
+    ) as executor:
+        futures = [
+            executor.submit(_download_group, [jobs[i] for i in group], timeout)
+            for group in groups
+        ]
+        for group_index, future in enumerate(futures):
+            for i, result in enumerate(future.result()):
+                results[groups[group_index][i]] = result
+    return results
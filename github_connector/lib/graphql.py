@@ -0,0 +1,125 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Bulk fetch of repositories and branches with the Github GraphQL API.
+
+With the REST API, synchronizing the branches of an organization costs one
+call by repository, plus the pagination of its branches. Here, the
+repositories of an organization are fetched by pages of 50, along with the
+branches matching the series names, that are requested as aliased ``ref``
+fields. The repositories are returned with the same keys as in the REST API,
+so they can be mapped by ``get_conversion_dict()``.
+"""
+
+import json
+
+REPOSITORY_PAGE_SIZE = 50
+
+_REPOSITORY_FIELDS = """
+    databaseId
+    name
+    nameWithOwner
+    url
+    description
+    homepageUrl
+    createdAt
+    updatedAt
+    pushedAt
+    owner { login }
+"""
+
+_ORGANIZATION_REPOSITORIES_QUERY = """
+query($login: String!, $cursor: String) {
+  organization(login: $login) {
+    repositories(first: %(page_size)d, after: $cursor,
+                 orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { %(repository_fields)s %(ref_fields)s }
+    }
+  }
+}
+"""
+
+
+def _quote(value):
+    # JSON strings are valid GraphQL strings
+    return json.dumps(value)
+
+
+def _ref_fields(branch_names):
+    return " ".join(
+        "b%d: ref(qualifiedName: %s) { name }" % (i, _quote("refs/heads/" + name))
+        for i, name in enumerate(branch_names)
+    )
+
+
+def _found_branch_names(node, branch_names):
+    return [
+        name
+        for i, name in enumerate(branch_names)
+        if (node.get("b%d" % i) or {}).get("name")
+    ]
+
+
+def _rest_repository_data(client, node):
+    """Convert a GraphQL repository node into a REST API repository"""
+    return {
+        "id": node["databaseId"],
+        "name": node["name"],
+        "full_name": node["nameWithOwner"],
+        "html_url": node["url"],
+        "clone_url": node["url"] + ".git",
+        "url": "{}/repos/{}".format(client.base_url, node["nameWithOwner"]),
+        "description": node["description"],
+        "homepage": node["homepageUrl"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "pushed_at": node["pushedAt"],
+        "owner": {"login": node["owner"]["login"]},
+    }
+
+
+def iter_organization_repositories(client, login, branch_names):
+    """Yield (repository data, matching branch names) for all the
+    repositories of the given organization"""
+    query = _ORGANIZATION_REPOSITORIES_QUERY % {
+        "page_size": REPOSITORY_PAGE_SIZE,
+        "repository_fields": _REPOSITORY_FIELDS,
+        "ref_fields": _ref_fields(branch_names),
+    }
+    cursor = None
+    while True:
+        data = client.graphql(query, {"login": login, "cursor": cursor})
+        repositories = data["organization"]["repositories"]
+        for node in repositories["nodes"]:
+            yield (
+                _rest_repository_data(client, node),
+                _found_branch_names(node, branch_names),
+            )
+        if not repositories["pageInfo"]["hasNextPage"]:
+            break
+        cursor = repositories["pageInfo"]["endCursor"]
+
+
+def get_repositories_branch_names(client, full_names, branch_names):
+    """Return {full name: matching branch names} for the given repositories
+
+    :param full_names: repository full names ('owner/name')
+    :param branch_names: names of the branches to look for
+    """
+    res = {}
+    ref_fields = _ref_fields(branch_names)
+    for start in range(0, len(full_names), REPOSITORY_PAGE_SIZE):
+        chunk = full_names[start : start + REPOSITORY_PAGE_SIZE]
+        query = "query { %s }" % " ".join(
+            "r%d: repository(owner: %s, name: %s) { %s }"
+            % (i, _quote(owner), _quote(name), ref_fields or "id")
+            for i, (owner, name) in enumerate(
+                full_name.split("/", 1) for full_name in chunk
+            )
+        )
+        data = client.graphql(query, allow_partial=True)
+        for i, full_name in enumerate(chunk):
+            node = data.get("r%d" % i)
+            if node is not None:
+                res[full_name] = _found_branch_names(node, branch_names)
+    return res
@@ -0,0 +1,196 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Retry policy and circuit breaker shared by the network calls of the
+connector (Github API and avatars).
+
+Failed calls (connection errors, 5xx, 429 and secondary rate limits) are
+retried with an exponential backoff and full jitter, or after the delay
+given by Github in the ``Retry-After`` header. When too many calls of the
+worker fail, the circuit breaker opens, and all the calls fail immediately
+with ``CircuitOpenError`` until the end of the cooldown.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from github.GithubException import GithubException
+
+_logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(GithubException):
+    """Raised instead of calling Github while the circuit breaker is open"""
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a call"""
+
+    def __init__(
+        self,
+        max_try=5,
+        backoff_factor=0.5,
+        backoff_max=30,
+        retry_after_max=60,
+        jitter=True,
+    ):
+        self.max_try = max_try
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.jitter = jitter
+
+    def is_failure(self, response):
+        if response.status_code in RETRY_STATUSES:
+            return True
+        # Secondary rate limits are 403 with a Retry-After header
+        return response.status_code == 403 and "Retry-After" in response.headers
+
+    def get_delay(self, attempt, response=None):
+        """Return the seconds to wait before the given retry (starting at 1),
+        or None if it is not worth waiting"""
+        if response is not None and "Retry-After" in response.headers:
+            delay = _parse_retry_after(response.headers["Retry-After"])
+            if delay is not None:
+                return delay if delay <= self.retry_after_max else None
+        delay = min(self.backoff_factor * 2 ** (attempt - 1), self.backoff_max)
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitBreaker:
+    """Open the circuit when the error rate of the calls made in the last
+    ``window`` seconds reaches ``threshold`` (with at least ``min_calls``
+    calls), for ``cooldown`` seconds."""
+
+    def __init__(self, threshold=0.5, min_calls=10, window=60, cooldown=60):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.trip_qty = 0
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._opened_until = 0
+
+    def get_remaining(self):
+        """Return the seconds before the circuit closes, 0 if it is closed"""
+        return max(0.0, self._opened_until - time.monotonic())
+
+    def check(self):
+        remaining = self.get_remaining()
+        if remaining:
+            raise CircuitOpenError(
+                503,
+                {
+                    "message": "Github calls suspended for %d seconds after"
+                    " too many errors." % remaining
+                },
+                {},
+            )
+
+    def record(self, success):
+        """Record the outcome of a call, and return True if it opened the
+        circuit"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append((now, success))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            failure_qty = sum(1 for x in self._calls if not x[1])
+            if (
+                len(self._calls) < self.min_calls
+                or failure_qty < self.threshold * len(self._calls)
+                or now < self._opened_until
+            ):
+                return False
+            self._opened_until = now + self.cooldown
+            self._calls.clear()
+            self.trip_qty += 1
+        _logger.warning(
+            "%d of the last Github calls failed: calls suspended for %d seconds.",
+            failure_qty,
+            self.cooldown,
+        )
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._opened_until = 0
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+default_policy = RetryPolicy()
+circuit_breaker = CircuitBreaker()
+
+
+def configure(max_try=None, threshold=None, cooldown=None):
+    """Change the settings of the shared retry policy and circuit breaker"""
+    if max_try is not None:
+        default_policy.max_try = max(1, max_try)
+    if threshold is not None:
+        circuit_breaker.threshold = threshold
+    if cooldown is not None:
+        circuit_breaker.cooldown = cooldown
+
+
+def call_with_retry(send, max_try=None, policy=None, breaker=None, recorders=None):
+    """Call send() (returning a requests response) until it succeeds, or
+    the maximum number of tries is reached.
+
+    :param recorders: optional function returning the objects notified
+        of the retries and trips (see ``client.RequestRecorder``)
+
+    :return: the last response. Its status may be an error.
+    :raise CircuitOpenError: if the circuit breaker is open
+    :raise requests.RequestException: if the last try failed with it
+    """
+    policy = policy or default_policy
+    breaker = breaker or circuit_breaker
+    max_try = max_try or policy.max_try
+    attempt = 0
+    while True:
+        breaker.check()
+        response = error = None
+        try:
+            response = send()
+        except requests.RequestException as err:
+            error = err
+        failed = error is not None or policy.is_failure(response)
+        if breaker.record(not failed) and recorders:
+            for recorder in recorders():
+                recorder.record_trip()
+        if not failed:
+            return response
+        attempt += 1
+        delay = policy.get_delay(attempt, response)
+        if attempt >= max_try or delay is None:
+            if error is not None:
+                raise error
+            return response
+        _logger.info(
+            "Github call failed (%s), retry %d/%d in %.1f seconds.",
+            error or response.status_code,
+            attempt,
+            max_try - 1,
+            delay,
+        )
+        for recorder in recorders() if recorders else []:
+            recorder.record_retry(delay)
+        time.sleep(delay)
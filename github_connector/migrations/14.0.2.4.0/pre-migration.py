@@ -0,0 +1,19 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+from openupgradelib import openupgrade
+
+
+@openupgrade.migrate()
+def migrate(env, version):
+    # Remove the duplicated branches, so that the unique(repository_id, name)
+    # constraint can be created
+    openupgrade.logged_query(
+        env.cr,
+        """
+        DELETE FROM github_repository_branch branch
+        USING github_repository_branch other
+        WHERE branch.repository_id = other.repository_id
+            AND branch.name = other.name
+            AND branch.id > other.id
+        """,
+    )
@@ -1,14 +1,24 @@
 from . import abstract_github_model
+from . import ir_config_parameter
+from . import ir_cron
+from . import github_avatar_mixin
 
 from . import res_partner
 
 from . import github_analysis_rule
 from . import github_analysis_rule_group
 from . import github_analysis_rule_info
+from . import github_api_cache
+from . import github_avatar_queue
+from . import github_api_usage
 from . import github_organization
 from . import github_organization_serie
 from . import github_repository
 from . import github_repository_branch
+from . import github_sync_run
+from . import github_sync_run_stat
+from . import github_sync_scheduler
 from . import github_team
 from . import github_team_partner
 from . import github_team_repository
+from . import github_webhook
@@ -5,14 +5,27 @@
 
 import base64
 import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-from urllib.request import urlopen
 
-from github import Github
 from github.GithubException import UnknownObjectException
 
 from odoo import _, api, fields, models, tools
 from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+from ..lib.avatar import fetch_avatars
+from ..lib.client import (
+    DEFAULT_BASE_URL,
+    DEFAULT_POOL_SIZE,
+    SyncRecorder,
+    get_client,
+    record_sync,
+)
+from ..lib.fetch import DEFAULT_CONCURRENCY, complete_many, iter_paginated
+from ..lib.retry import configure as configure_retry
 
 _logger = logging.getLogger(__name__)
 
@@ -30,6 +43,9 @@ class AbstractGithubModel(models.AbstractModel):
     _description = "Github abstract model"
     _github_login_field = None
     _need_individual_call = False
+    # Github fields that are not always in the objects returned in lists.
+    # If one of them is missing, the object is completed with an extra call.
+    _github_must_have_fields = []
     _field_list_prevent_overwrite = []
 
     github_id_external = fields.Char(string="Github Id", readonly=True, index=True)
@@ -75,23 +91,69 @@ class AbstractGithubModel(models.AbstractModel):
             "github_write_date": "updated_at",
         }
 
+    @api.model
+    @tools.ormcache()
+    def _get_conversion_items(self):
+        """Return the items of get_conversion_dict() that match a field of
+        the model, as a tuple of (odoo_field, github_field)"""
+        return tuple(
+            (k, v) for k, v in self.get_conversion_dict().items() if k in self._fields
+        )
+
+    @api.model
+    @tools.ormcache()
+    def _get_datetime_field_names(self):
+        return frozenset(
+            name for name, field in self._fields.items() if field.type == "datetime"
+        )
+
     def process_timezone_fields(self, res):
+        datetime_field_names = self._get_datetime_field_names()
         for k, v in res.items():
-            if self._fields[k].type == "datetime" and isinstance(v, str):
+            if k in datetime_field_names and isinstance(v, str):
                 res[k] = datetime.strptime(v, "%Y-%m-%dT%H:%M:%SZ")
 
+    @api.model
+    def _get_github_raw_data(self, gh_data):
+        """Return the raw data of a Github object.
+
+        The objects returned in the lists of the Github API are partial.
+        They are completed (with an extra call) only if one of the
+        ``_github_must_have_fields`` is missing.
+        """
+        raw_data = gh_data._rawData
+        missing_fields = [x for x in self._github_must_have_fields if x not in raw_data]
+        if missing_fields:
+            _logger.debug(
+                "Completing %s %s: missing %s.",
+                type(gh_data).__name__,
+                raw_data.get("id"),
+                ", ".join(missing_fields),
+            )
+            raw_data = gh_data.raw_data
+        return raw_data
+
     @api.model
     def get_odoo_data_from_github(self, data):
         """Prepare function that maps data from a Github object to a dictionary of
         values ready to create an Odoo record
         """
-        map_dict = self.get_conversion_dict()
+        raw_data = self._get_github_raw_data(data)
         res = {}
-        for k, v in map_dict.items():
-            if hasattr(self, k) and hasattr(data, v):
-                res.update({k: getattr(data, v)})
+        missing_fields = []
+        for k, v in self._get_conversion_items():
+            if v in raw_data:
+                res[k] = raw_data[v]
+            else:
+                missing_fields.append(v)
+        if missing_fields:
+            _logger.debug(
+                "Fields %s not found in the Github data of %s %s.",
+                ", ".join(missing_fields),
+                self._name,
+                raw_data.get("id"),
+            )
         res.update({"github_last_sync_date": fields.Datetime.now()})
-        # res.update({"github_type": type(data).__name__})
         self.process_timezone_fields(res)
         return res
 
@@ -117,6 +179,78 @@ class AbstractGithubModel(models.AbstractModel):
         """Hook that will be called after a creation in github.
         Override this function to add custom logic for after creation."""
 
+    def _get_sync_plan(self):
+        """Override this function in models that inherit this abstract to
+        return what full_update() would change, without writing anything.
+
+        :return: list of dicts (see ``_prepare_sync_plan_line``)
+        """
+        return []
+
+    @api.model
+    def _prepare_sync_plan_line(self, action, record, name=None, changes=None):
+        """Return a change of a synchronization plan
+
+        :param action: 'create', 'update' or 'remove'
+        :param record: the record changed, or an empty recordset of its
+            model for creations
+        :param changes: for updates, dict {field name: new value}
+        """
+        return {
+            "res_model": record._name,
+            "res_id": record.id,
+            "action": action,
+            "name": name or record.display_name,
+            "changes": changes
+            and "\n".join(
+                "%s: %s → %s" % (k, record[k], v) for k, v in sorted(changes.items())
+            ),
+        }
+
+    @api.model
+    def _plan_github_objects(self, gh_objects, update=False):
+        """Plan the creation of the records of Github objects that don't
+        exist, and, if update is set, the update of the other ones.
+
+        :return: (list of plan lines, {Github id: record})
+        """
+        gh_objects = list(gh_objects)
+        records = self._search_github_records(gh_objects)
+        plan = []
+        planned_ids = set()
+        for gh_object in gh_objects:
+            github_id = str(gh_object._rawData["id"])
+            if github_id in planned_ids:
+                continue
+            planned_ids.add(github_id)
+            record = records.get(github_id)
+            if not record:
+                plan.append(
+                    self._prepare_sync_plan_line(
+                        "create",
+                        self.browse(),
+                        gh_object._rawData.get(self._github_login_field or "name")
+                        or github_id,
+                    )
+                )
+            elif update:
+                data = self.get_odoo_data_from_github(gh_object)
+                changes = record._get_github_changes(data)
+                if changes:
+                    plan.append(
+                        self._prepare_sync_plan_line("update", record, changes=changes)
+                    )
+        return plan, records
+
+    @api.model
+    def _plan_removal(self, records):
+        return [self._prepare_sync_plan_line("remove", x) for x in records]
+
+    def button_sync_plan(self):
+        """Dry run of full_update()"""
+        plan = self.env["wizard.sync.plan"]._create_from_records(self)
+        return plan._get_action()
+
     # Custom Public Function
     @api.model
     def get_from_id_or_create(self, gh_data=None, data=None, extra_data=None):
@@ -180,6 +314,105 @@ class AbstractGithubModel(models.AbstractModel):
         # Odoo dictionary, so we need to pass the full gh_data object.
         return self._create_from_github_data(data, extra_data)
 
+    @api.model
+    def _search_github_records(self, gh_objects):
+        """Search the existing records matching Github objects, by Github id
+        with a single query, then the remaining ones by Github name with a
+        second one.
+
+        :param gh_objects: list of Github objects
+        :return: dict {Github id: record}
+        """
+        model = self.with_context(active_test=False)
+        # The objects are identified from the data returned in the lists,
+        # so that only the ones to create are (if needed) completed
+        github_ids = [str(x._rawData["id"]) for x in gh_objects]
+        # Github ids are stored as strings
+        records = {
+            record.github_id_external: record
+            for record in model.search([("github_id_external", "in", github_ids)])
+        }
+        missing_ids = {}
+        if self._github_login_field:
+            for i, gh_object in enumerate(gh_objects):
+                github_name = gh_object._rawData.get(self._github_login_field)
+                if github_ids[i] not in records and github_name:
+                    missing_ids[github_name] = github_ids[i]
+        if missing_ids:
+            domain = [("github_name", "in", list(missing_ids))]
+            # The names of some objects (as the team slugs) are unique only
+            # in their organization
+            org_id = self.env.context.get("github_organization_id")
+            if org_id and "organization_id" in self._fields:
+                domain.append(("organization_id", "=", org_id))
+            existing_objects = defaultdict(self.browse)
+            for record in model.search(domain):
+                existing_objects[record.github_name] |= record
+            for github_name, existing_object in existing_objects.items():
+                if len(existing_object) > 1:
+                    raise UserError(
+                        _("Duplicate object with Github login %s") % (github_name,)
+                    )
+                records[missing_ids[github_name]] = existing_object
+        return records
+
+    @api.model
+    def get_or_create_many(self, gh_objects, extra_data=None):
+        """Set-based version of get_from_id_or_create().
+
+        The existing records are searched by Github id with a single query,
+        then the remaining ones by Github name with a second one, and the
+        missing records are created together, their partial Github objects
+        being completed concurrently (see 'github.fetch_concurrency').
+
+        :param gh_objects: iterable of Github objects
+        :param extra_data: dict with extra data to be put into the created
+            records
+        :return: The records, in the order of gh_objects
+        """
+        extra_data = extra_data or {}
+        gh_objects = list(gh_objects)
+        github_ids = [str(x._rawData["id"]) for x in gh_objects]
+        records = self._search_github_records(gh_objects)
+        for github_id, record in records.items():
+            if record.github_id_external != github_id:
+                record.github_id_external = github_id
+                _logger.info(
+                    "Existing object %s#%d with Github name '%s' has been"
+                    " updated with unique Github id %s",
+                    self._name,
+                    record.id,
+                    record.github_name,
+                    github_id,
+                )
+        to_create = {}
+        for i, gh_object in enumerate(gh_objects):
+            if github_ids[i] not in records:
+                to_create.setdefault(github_ids[i], gh_object)
+        # The partial objects to create are completed together
+        complete_many(
+            [
+                gh_object
+                for gh_object in to_create.values()
+                if any(
+                    x not in gh_object._rawData for x in self._github_must_have_fields
+                )
+            ],
+            self._get_fetch_concurrency(),
+        )
+        vals_list = {
+            github_id: dict(self.get_odoo_data_from_github(gh_object), **extra_data)
+            for github_id, gh_object in to_create.items()
+        }
+        if vals_list:
+            new_records = self.create(list(vals_list.values()))
+            for i, github_id in enumerate(vals_list):
+                records[github_id] = new_records[i]
+            record_sync(self._name, new_records.ids, created=True)
+        res = self.browse([records[x].id for x in github_ids])
+        record_sync(self._name, res.ids)
+        return res
+
     @api.model
     def create_from_name(self, name):
         """Call Github API, using a URL using github name. Load data and
@@ -242,26 +475,20 @@ class AbstractGithubModel(models.AbstractModel):
         :param child_update: set to True if you want to reload childs
             Objects linked to this object. (like members for teams)
         """
-        for item in self:
-            gh_obj = item.find_related_github_object()
-            data = self.get_odoo_data_from_github(gh_obj)
-            item._update_from_github_data(data)
+        datas = [
+            self.get_odoo_data_from_github(item.find_related_github_object())
+            for item in self
+        ]
+        self._update_many_from_github_data(datas)
         if child_update:
             self.full_update()
 
     def get_base64_image_from_github(self, url):
-        max_try = int(
-            self.sudo().env["ir.config_parameter"].get_param("github.max_try")
-        )
-        for _i in range(max_try):
-            try:
-                stream = urlopen(url, timeout=10).read()
-                break
-            except Exception as err:
-                _logger.warning("URL Call Error. %s" % (err.__str__()))
-        else:
+        max_try = self._get_config_param("github.max_try", 5)
+        content = fetch_avatars([url], 1, max_try).get(url)
+        if content is None:
             raise UserError(_("Maximum attempts reached."))
-        return base64.standard_b64encode(stream)
+        return base64.standard_b64encode(content)
 
     # Custom Private Function
     @api.model
@@ -271,26 +498,97 @@ class AbstractGithubModel(models.AbstractModel):
         return self.create(data)
 
     def _update_from_github_data(self, data):
-        for item in self:
-            # Optimization. Due to the fact that github datas rarely change,
-            # and that there a lot of related / computed fields invalidation
-            # process, we realize a write only if data changed
-            to_write = {}
-            for k, v in data.items():
-                if hasattr(item[k], "id"):
-                    to_compare = item[k].id
-                else:
-                    to_compare = item[k]
-                # do not overwrite existing values for some given fields
-                if to_compare != v and (
-                    k not in self._field_list_prevent_overwrite or to_compare is False
-                ):
-                    to_write[k] = v
-            if to_write:
-                item.write(to_write)
+        return self._update_many_from_github_data([data] * len(self))
+
+    def _get_github_changes(self, data):
+        """Return the values of data that differ from the record, once
+        converted to the type of their field (for example, the Github ids
+        are integers, stored as strings). The synchronization date is not a
+        change."""
+        self.ensure_one()
+        to_write = {}
+        for k, v in data.items():
+            if k == "github_last_sync_date":
+                continue
+            field = self._fields[k]
+            value = self[k]
+            if field.type in ("one2many", "many2many"):
+                # The x2many commands can't be compared
+                changed = True
+            else:
+                changed = value != field.convert_to_record(
+                    field.convert_to_cache(v, self, validate=False), self
+                )
+            if field.type == "many2one":
+                value = value.id
+            # do not overwrite existing values for some given fields
+            if changed and (
+                k not in self._field_list_prevent_overwrite or value is False
+            ):
+                to_write[k] = v
+        return to_write
+
+    def _update_many_from_github_data(self, datas):
+        """Update the records from their Github data.
+
+        Optimization. Due to the fact that github datas rarely change,
+        and that there a lot of related / computed fields invalidation
+        process, only the changed values are written, and the records
+        sharing the same changes are written together.
+
+        :param datas: list of dicts of values, in the order of the records
+        :return: dict {field name: number of updated records}
+        """
+        changes = defaultdict(list)
+        # Changes with unhashable values (x2many commands, ...) given by an
+        # overload of get_odoo_data_from_github, written record by record
+        single_changes = []
+        counts = Counter()
+        synced_ids = []
+        for i, item in enumerate(self):
+            data = datas[i]
+            if "github_last_sync_date" in data:
+                synced_ids.append(item.id)
+            to_write = item._get_github_changes(data)
+            if not to_write:
+                continue
+            counts.update(to_write)
+            key = tuple(sorted(to_write.items()))
+            try:
+                changes[key].append(item.id)
+            except TypeError:
+                single_changes.append((to_write, [item.id]))
+        writes = [(dict(x), ids) for x, ids in changes.items()] + single_changes
+        for to_write, ids in writes:
+            self.browse(ids).write(to_write)
+            record_sync(self._name, ids, updated=True)
+        if synced_ids:
+            # The same sync date for all the records, written at once
+            self.browse(synced_ids).write(
+                {"github_last_sync_date": fields.Datetime.now()}
+            )
+        record_sync(self._name, self.ids)
+        self.flush()
+        _logger.debug(
+            "%d %s updated from Github data, in %d writes: %s",
+            len(self),
+            self._name,
+            len(writes),
+            dict(counts),
+        )
+        return dict(counts)
 
     def get_github_connector(self):
-        ICP = self.env["ir.config_parameter"]
+        """Return the Github client shared by the current worker.
+
+        The client (and its pool of HTTP connections) is reused for all
+        the calls made with the same token and base URL.
+        """
+        return self._get_github_client().github
+
+    @api.model
+    def _get_github_client(self):
+        ICP = self.env["ir.config_parameter"].sudo()
         token = tools.config.get("github_token") or ICP.get_param(
             "github.access_token", default=""
         )
@@ -301,7 +599,79 @@ class AbstractGithubModel(models.AbstractModel):
                     " or as the 'github.access_token' configuration parameter."
                 )
             )
-        return Github(token)
+        base_url = ICP.get_param("github.base_url", default=DEFAULT_BASE_URL)
+        pool_size = self._get_config_param("github.pool_size", DEFAULT_POOL_SIZE)
+        cache = self.env["github.api.cache"]._get_cache_store()
+        configure_retry(
+            max_try=self._get_config_param("github.max_try", 5),
+            threshold=self._get_config_param("github.circuit_breaker_error_rate", 50)
+            / 100.0,
+            cooldown=self._get_config_param("github.circuit_breaker_cooldown", 60),
+        )
+        return get_client(token, base_url.rstrip("/"), pool_size, cache=cache)
+
+    @api.model
+    def _get_fetch_concurrency(self):
+        """Return the maximum number of concurrent Github requests of a
+        fetch (see 'github.fetch_concurrency'), bounded by the connection
+        pool of the client"""
+        concurrency = self._get_config_param(
+            "github.fetch_concurrency", DEFAULT_CONCURRENCY
+        )
+        return min(concurrency, self._get_github_client().pool_size)
+
+    @api.model
+    def _iter_github_list(self, paginated_list):
+        """Yield the Github objects of a paginated list, in order, the pages
+        being fetched concurrently (see 'github.fetch_concurrency').
+        The objects are completed only when needed (see
+        ``_github_must_have_fields`` and ``get_or_create_many``).
+        """
+        return iter_paginated(
+            paginated_list,
+            self._get_github_client().github.per_page,
+            self._get_fetch_concurrency(),
+        )
+
+    @api.model
+    @contextmanager
+    def _record_github_sync(self, label):
+        """Context manager measuring a synchronization: the Github requests,
+        the time spent waiting for Github, the SQL queries and the records
+        created, updated or unchanged by model. The figures are logged, and
+        available on the yielded recorder (see ``SyncRecorder``) on exit.
+        The responses of the Github API are cached at the end."""
+        recorder = SyncRecorder()
+        # The Github API cache is read with a single cursor, and written once
+        cache_store = self.env["github.api.cache"]._get_cache_store()
+        query_count = self.env.cr.sql_log_count
+        start = time.monotonic()
+        try:
+            with recorder, cache_store.batch() if cache_store else ExitStack():
+                yield recorder
+        finally:
+            recorder.duration = time.monotonic() - start
+            recorder.query_qty = self.env.cr.sql_log_count - query_count
+            _logger.info(
+                "%s: %.1fs, %d Github requests (%.1fs), %d SQL queries. %s",
+                label,
+                recorder.duration,
+                recorder.request_qty,
+                recorder.network_time,
+                recorder.query_qty,
+                ", ".join(
+                    "%s: %d created, %d updated, %d unchanged" % ((model,) + qties)
+                    for model, qties in recorder.get_record_qties().items()
+                ),
+            )
+
+    @api.model
+    def _get_config_param(self, key, default):
+        """Return the evaluated value of the given system parameter"""
+        value = self.env["ir.config_parameter"].sudo().get_param(key)
+        if not value:
+            return default
+        return safe_eval(value)
 
     def create_in_github(self):
         """Create an object in Github through the API
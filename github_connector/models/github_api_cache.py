@@ -0,0 +1,174 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import api, fields, models, registry
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubApiCacheStore:
+    """Cache store given to the Github clients.
+
+    The entries are read and written with their own cursor, as the clients
+    are shared between transactions (and threads). Within a batch (see
+    ``batch``), the entries are read with a single cursor, and the new ones
+    are buffered and written together at its end. A failure of the cache
+    never breaks the call to the API.
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, dbname):
+        self.dbname = dbname
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._cr = None
+        self._pending = {}
+
+    @classmethod
+    def get_store(cls, dbname):
+        """Return the store of the database, shared by the clients"""
+        with cls._stores_lock:
+            if dbname not in cls._stores:
+                cls._stores[dbname] = cls(dbname)
+            return cls._stores[dbname]
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.dbname == self.dbname
+
+    def __hash__(self):
+        return hash((type(self), self.dbname))
+
+    @contextmanager
+    def batch(self):
+        """Share a cursor between the reads, and write the new entries on
+        exit (of the outermost batch)"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._flush()
+
+    def _get_cursor(self):
+        if self._cr is None:
+            self._cr = registry(self.dbname).cursor()
+        return self._cr
+
+    def _close_cursor(self, commit=False):
+        cr, self._cr = self._cr, None
+        if cr is None:
+            return
+        try:
+            # Not committed during the tests, not to leak outside of them
+            if commit and not getattr(threading.current_thread(), "testing", False):
+                cr.commit()
+        finally:
+            cr.close()
+
+    def get(self, url):
+        with self._lock:
+            if url in self._pending:
+                return dict(self._pending[url])
+            try:
+                cr = self._get_cursor()
+                cr.execute(
+                    "SELECT etag, last_modified, headers, payload"
+                    " FROM github_api_cache WHERE url = %s",
+                    (url,),
+                )
+                entry = cr.dictfetchone()
+            except psycopg2.Error as e:
+                _logger.debug("Unable to read the Github API cache: %s", e)
+                self._close_cursor()
+                return None
+            if not self._batch_depth:
+                self._close_cursor()
+            return entry
+
+    def set(self, url, values):
+        with self._lock:
+            self._pending[url] = values
+            if not self._batch_depth:
+                self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        try:
+            if pending:
+                cr = self._get_cursor()
+                # Always in the same order, not to deadlock with a concurrent
+                # flush
+                for url in sorted(pending):
+                    cr.execute(
+                        """
+                        INSERT INTO github_api_cache
+                            (url, etag, last_modified, headers, payload,
+                             create_date, write_date)
+                        VALUES (%(url)s, %(etag)s, %(last_modified)s,
+                            %(headers)s, %(payload)s,
+                            now() at time zone 'UTC', now() at time zone 'UTC')
+                        ON CONFLICT (url) DO UPDATE SET
+                            etag = EXCLUDED.etag,
+                            last_modified = EXCLUDED.last_modified,
+                            headers = EXCLUDED.headers,
+                            payload = EXCLUDED.payload,
+                            write_date = EXCLUDED.write_date
+                        """,
+                        dict(pending[url], url=url),
+                    )
+            self._close_cursor(commit=True)
+        except psycopg2.Error as e:
+            _logger.debug("Unable to write the Github API cache: %s", e)
+            self._close_cursor()
+
+
+class GithubApiCache(models.Model):
+    _name = "github.api.cache"
+    _description = "Github API Cache"
+    _order = "write_date desc"
+    _rec_name = "url"
+
+    # Column Section
+    url = fields.Char(string="URL", required=True, readonly=True)
+
+    etag = fields.Char(string="ETag", readonly=True)
+
+    last_modified = fields.Char(string="Last Modified", readonly=True)
+
+    headers = fields.Text(string="Headers", readonly=True)
+
+    payload = fields.Text(string="Payload", readonly=True)
+
+    _sql_constraints = [
+        ("url_uniq", "unique(url)", "The Github API cache is unique by URL.")
+    ]
+
+    @api.model
+    def _get_cache_store(self):
+        """Return the store to give to the Github client,
+        or None if the cache is disabled"""
+        if not self.env["abstract.github.model"]._get_config_param(
+            "github.api_cache", True
+        ):
+            return None
+        return GithubApiCacheStore.get_store(self.env.cr.dbname)
+
+    @api.autovacuum
+    def _gc_github_api_cache(self):
+        days = self.env["abstract.github.model"]._get_config_param(
+            "github.api_cache_days", 30
+        )
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        self.search([("write_date", "<", limit_date)]).unlink()
@@ -0,0 +1,90 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, fields, models
+
+
+class GithubApiUsage(models.Model):
+    _name = "github.api.usage"
+    _description = "Github API Usage"
+    _order = "date_start desc"
+    _rec_name = "cron_id"
+
+    _STATE_SELECTION = [
+        ("running", "Running"),
+        ("done", "Done"),
+        ("paused", "Paused"),
+    ]
+
+    # Column Section
+    cron_id = fields.Many2one(
+        comodel_name="ir.cron",
+        string="Scheduled Action",
+        index=True,
+        readonly=True,
+        ondelete="cascade",
+    )
+
+    date_start = fields.Datetime(string="Start Date", readonly=True)
+
+    date_end = fields.Datetime(string="End Date", readonly=True, index=True)
+
+    state = fields.Selection(
+        selection=_STATE_SELECTION, string="State", readonly=True, default="running"
+    )
+
+    request_qty = fields.Integer(string="Requests", readonly=True)
+
+    not_modified_qty = fields.Integer(
+        string="Not Modified Requests",
+        readonly=True,
+        help="Requests answered by Github with '304 Not Modified', that"
+        " don't consume the rate limit.",
+    )
+
+    consumed_qty = fields.Integer(
+        string="Consumed Requests",
+        readonly=True,
+        help="Requests counted by Github in the rate limit.",
+    )
+
+    network_time = fields.Float(string="Network Time (s)", readonly=True)
+
+    retry_qty = fields.Integer(
+        string="Retries",
+        readonly=True,
+        help="Calls retried after a server error, a timeout or a secondary"
+        " rate limit.",
+    )
+
+    retry_time = fields.Float(
+        string="Retry Delay (s)",
+        readonly=True,
+        help="Time spent waiting before retrying the failed calls.",
+    )
+
+    circuit_trip_qty = fields.Integer(
+        string="Circuit Breaker Trips",
+        readonly=True,
+        help="Number of times the calls to Github were suspended because too"
+        " many of them failed.",
+    )
+
+    rate_limit_remaining = fields.Integer(string="Remaining Rate Limit", readonly=True)
+
+    rate_limit_reset_date = fields.Datetime(
+        string="Rate Limit Reset Date", readonly=True
+    )
+
+    @api.model
+    def _get_window_consumed_qty(self, cron, reset_date):
+        """Return the requests consumed by the cron in the current rate
+        limit window (one hour before reset_date)"""
+        usages = self.search(
+            [
+                ("cron_id", "=", cron.id),
+                ("rate_limit_reset_date", "=", reset_date),
+                ("state", "!=", "running"),
+            ]
+        )
+        return sum(usages.mapped("consumed_qty"))
@@ -0,0 +1,103 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import base64
+
+from odoo import api, fields, models
+
+from ..lib.avatar import checksum, fetch_avatars
+from ..lib.fetch import DEFAULT_CONCURRENCY
+
+
+class GithubAvatarMixin(models.AbstractModel):
+    """Set the image of a record from its Github avatar.
+
+    The avatar is downloaded only when its URL changes (Github versions the
+    URLs), and the image is written only when the content changes, so that
+    the resized variants are not regenerated for nothing.
+    """
+
+    _name = "github.avatar.mixin"
+    _description = "Github Avatar Mixin"
+    _github_avatar_field = "image_1920"
+
+    github_avatar_url = fields.Char(string="Github Avatar URL", readonly=True)
+
+    github_avatar_checksum = fields.Char(string="Github Avatar Checksum", readonly=True)
+
+    @api.model
+    def _fetch_github_avatars(self, urls):
+        abstract_model = self.env["abstract.github.model"]
+        return fetch_avatars(
+            urls,
+            abstract_model._get_config_param(
+                "github.fetch_concurrency", DEFAULT_CONCURRENCY
+            ),
+            abstract_model._get_config_param("github.max_try", 5),
+        )
+
+    @api.model
+    def _is_github_avatar_deferred(self):
+        return self.env["abstract.github.model"]._get_config_param(
+            "github.avatar_deferred", False
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        to_fetch = [
+            vals
+            for vals in vals_list
+            if vals.get("github_avatar_url") and self._github_avatar_field not in vals
+        ]
+        if not to_fetch:
+            return super().create(vals_list)
+        if self._is_github_avatar_deferred():
+            records = super().create(vals_list)
+            self.env["github.avatar.queue"].sudo()._enqueue(
+                records.filtered(lambda x: not x[self._github_avatar_field])
+            )
+            return records
+        avatars = self._fetch_github_avatars([x["github_avatar_url"] for x in to_fetch])
+        for vals in to_fetch:
+            content = avatars.get(vals["github_avatar_url"])
+            if content:
+                vals[self._github_avatar_field] = base64.b64encode(content)
+                vals["github_avatar_checksum"] = checksum(content)
+        return super().create(vals_list)
+
+    def write(self, vals):
+        url = vals.get("github_avatar_url")
+        if not url or self._github_avatar_field in vals:
+            return super().write(vals)
+        if self._is_github_avatar_deferred():
+            res = super().write(vals)
+            self.env["github.avatar.queue"].sudo()._enqueue(self)
+            return res
+        content = self._fetch_github_avatars([url]).get(url)
+        if not content:
+            # Download it again at the next synchronization
+            vals = dict(vals)
+            del vals["github_avatar_url"]
+            return super().write(vals) if vals else True
+        res = super().write(vals)
+        self._set_github_avatar(content)
+        return res
+
+    def _set_github_avatar(self, content):
+        """Set the image from the content of the Github avatar, if it changed"""
+        value = checksum(content)
+        # Don't overwrite images changed in Odoo, if the model prevents it
+        to_update = self.filtered(
+            lambda x: x.github_avatar_checksum != value
+            and (
+                self._github_avatar_field not in self._field_list_prevent_overwrite
+                or not x[self._github_avatar_field]
+            )
+        )
+        (self - to_update).write({"github_avatar_checksum": value})
+        to_update.write(
+            {
+                "github_avatar_checksum": value,
+                self._github_avatar_field: base64.b64encode(content),
+            }
+        )
@@ -0,0 +1,132 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from ..lib.avatar import fetch_avatars
+from ..lib.fetch import DEFAULT_CONCURRENCY
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubAvatarQueue(models.Model):
+    """Avatars waiting to be downloaded.
+
+    When 'github.avatar_deferred' is set, the partners and organizations are
+    created without image, and their avatars are downloaded later by the
+    'Download Github Avatars' cron.
+    """
+
+    _name = "github.avatar.queue"
+    _description = "Github Avatar Download Queue"
+    _order = "next_try_date, id"
+
+    # Column Section
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+
+    res_id = fields.Many2oneReference(
+        string="Record", model_field="res_model", required=True, readonly=True
+    )
+
+    url = fields.Char(string="Avatar URL", required=True, readonly=True)
+
+    attempt_qty = fields.Integer(string="Attempts", readonly=True)
+
+    next_try_date = fields.Datetime(
+        string="Next Try", required=True, readonly=True, index=True
+    )
+
+    _sql_constraints = [
+        (
+            "record_uniq",
+            "unique(res_model, res_id)",
+            "An avatar can be queued only once by record.",
+        )
+    ]
+
+    @api.model
+    def _enqueue(self, records):
+        """Queue the download of the Github avatars of the given records"""
+        records = records.filtered("github_avatar_url")
+        if not records:
+            return
+        existing_entries = self.search(
+            [("res_model", "=", records._name), ("res_id", "in", records.ids)]
+        )
+        entries_by_res_id = {x.res_id: x for x in existing_entries}
+        vals_list = []
+        for record in records:
+            vals = {
+                "url": record.github_avatar_url,
+                "attempt_qty": 0,
+                "next_try_date": fields.Datetime.now(),
+            }
+            if record.id in entries_by_res_id:
+                entries_by_res_id[record.id].write(vals)
+            else:
+                vals_list.append(dict(vals, res_model=records._name, res_id=record.id))
+        self.create(vals_list)
+
+    @api.model
+    def cron_download_avatars(self):
+        """Download the queued avatars, by batches, until the queue is empty
+        or the time budget of the run ('github.avatar_time_budget', in
+        seconds) is exhausted"""
+        abstract_model = self.env["abstract.github.model"]
+        batch_size = abstract_model._get_config_param("github.avatar_batch_size", 50)
+        deadline = time.monotonic() + abstract_model._get_config_param(
+            "github.avatar_time_budget", 300
+        )
+        while time.monotonic() < deadline:
+            entries = self.search(
+                [("next_try_date", "<=", fields.Datetime.now())], limit=batch_size
+            )
+            if not entries:
+                break
+            entries._download()
+            if not getattr(threading.current_thread(), "testing", False):
+                self._cr.commit()  # pylint: disable=invalid-commit
+        return True
+
+    def _download(self):
+        abstract_model = self.env["abstract.github.model"]
+        max_try = abstract_model._get_config_param("github.max_try", 5)
+        # Failed downloads are retried later, instead of immediately
+        avatars = fetch_avatars(
+            self.mapped("url"),
+            abstract_model._get_config_param(
+                "github.fetch_concurrency", DEFAULT_CONCURRENCY
+            ),
+            1,
+        )
+        done_entries = self.browse()
+        for entry in self:
+            record = self.env[entry.res_model].browse(entry.res_id).exists()
+            if not record:
+                done_entries |= entry
+            elif entry.url in avatars:
+                record._set_github_avatar(avatars[entry.url])
+                done_entries |= entry
+            elif entry.attempt_qty + 1 >= max_try:
+                _logger.warning(
+                    "Avatar of %s#%d dropped after %d attempts.",
+                    entry.res_model,
+                    entry.res_id,
+                    max_try,
+                )
+                done_entries |= entry
+            else:
+                # Exponential backoff: 2, 4, 8... minutes
+                entry.write(
+                    {
+                        "attempt_qty": entry.attempt_qty + 1,
+                        "next_try_date": fields.Datetime.now()
+                        + timedelta(minutes=2 ** (entry.attempt_qty + 1)),
+                    }
+                )
+        done_entries.unlink()
@@ -4,18 +4,35 @@
 # @author: Sylvain LE GAL (https://twitter.com/legalsylvain)
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
+import fnmatch
+import logging
+import re
+from datetime import datetime
+
 from github.GithubException import GithubException
+from github.NamedUser import NamedUser
+from github.Repository import Repository
+from github.Team import Team
+
+from odoo import _, api, exceptions, fields, models, tools
 
-from odoo import _, api, exceptions, fields, models
+from ..lib.crawler import crawl_organization
+from ..lib.fetch import DEFAULT_CONCURRENCY
+from ..lib.git_download import CLONE_STRATEGIES
+from ..lib.graphql import iter_organization_repositories
+
+_logger = logging.getLogger(__name__)
 
 
 class GithubOrganization(models.Model):
     _name = "github.organization"
-    _inherit = ["abstract.github.model"]
+    _inherit = ["abstract.github.model", "github.avatar.mixin"]
     _order = "name"
     _description = "Github organization"
 
     _github_login_field = "login"
+    _github_must_have_fields = ["name"]
+    _github_avatar_field = "image"
 
     # Columns Section
     name = fields.Char(string="Organization Name", required=True, readonly=True)
@@ -36,8 +53,10 @@ class GithubOrganization(models.Model):
         " you want to ignore. One repository per line."
         " If set, the repositories will be created, but branches"
         " synchronization and source code download will be disabled."
+        " A line can also be a glob pattern (l10n-*), or a regular"
+        " expression prefixed by 're:' (re:^odoo-.*-tools$)."
         " Exemple:\n"
-        "purchase-workflow\nOCB\nOpenUpgrade\n",
+        "purchase-workflow\nOCB\nl10n-*\n",
     )
 
     member_ids = fields.Many2many(
@@ -93,6 +112,79 @@ class GithubOrganization(models.Model):
         string="Analysis Rules", comodel_name="github.analysis.rule"
     )
 
+    sync_backend = fields.Selection(
+        string="Synchronization Backend",
+        selection=[("rest", "REST API"), ("graphql", "GraphQL API")],
+        default="rest",
+        required=True,
+        help="With the GraphQL API, the repositories and their branches"
+        " matching the organization series are fetched together, in a few"
+        " paginated queries, instead of one call by repository.",
+    )
+
+    sync_engine = fields.Selection(
+        string="Synchronization Engine",
+        selection=[("sequential", "Sequential"), ("crawler", "Concurrent Crawler")],
+        default="sequential",
+        required=True,
+        help="With the concurrent crawler, the members, repositories, branches"
+        " and teams are all fetched first, with concurrent calls to the REST"
+        " API (see 'github.fetch_concurrency'), then written together. The"
+        " synchronization backend is then ignored.",
+    )
+
+    clone_strategy = fields.Selection(
+        string="Clone Strategy",
+        selection=CLONE_STRATEGIES,
+        default="single_branch",
+        required=True,
+        help="How the source code of the branches is downloaded:\n"
+        "- Full History: all the branches of the repository, with their"
+        " history\n"
+        "- Single Branch: only the downloaded branch, with its history\n"
+        "- Shallow: only the last commits of the branch (see 'Clone Depth')\n"
+        "- Partial: the history of the branch, but only the files of its last"
+        " commit\n"
+        "The branches already downloaded keep the history they have. It can"
+        " be overridden by repository.",
+    )
+
+    clone_depth = fields.Integer(
+        string="Clone Depth",
+        default=1,
+        help="Number of commits downloaded by branch, with the 'Shallow'"
+        " clone strategy.",
+    )
+
+    source_layout = fields.Selection(
+        string="Source Code Layout",
+        selection=[
+            ("clone", "One Clone by Branch"),
+            ("worktree", "Shared Mirror and Worktrees"),
+        ],
+        default="worktree",
+        required=True,
+        help="With a shared mirror, the objects of a repository are downloaded"
+        " and stored once, in a bare mirror, and each branch is a worktree of"
+        " this mirror. The existing clones of the branches are migrated on"
+        " their next download, and the other way round.",
+    )
+
+    sync_incremental = fields.Boolean(
+        string="Incremental Synchronization",
+        help="If checked, the repositories that were not updated nor pushed on"
+        " Github since the last synchronization are skipped: their data,"
+        " branches and source code are not updated. Use 'Full Resync' to"
+        " update all of them.",
+    )
+
+    repository_sync_watermark = fields.Datetime(
+        string="Repositories Sync Watermark",
+        readonly=True,
+        help="Most recent update or push date on Github of the repositories,"
+        " at the last synchronization.",
+    )
+
     # Overloadable Section
     @api.model
     def get_conversion_dict(self):
@@ -104,27 +196,65 @@ class GithubOrganization(models.Model):
                 "location": "location",
                 "email": "email",
                 "website_url": "blog",
+                "github_avatar_url": "avatar_url",
             }
         )
         return res
 
-    @api.model
-    def get_odoo_data_from_github(self, gh_data):
-        res = super().get_odoo_data_from_github(gh_data)
-        if hasattr(gh_data, "avatar_url"):
-            res.update({"image": self.get_base64_image_from_github(gh_data.avatar_url)})
-        return res
-
     def full_update(self):
-        self.button_sync_member()
-        self.button_sync_repository()
-        self.button_sync_team()
+        crawler_organizations = self.filtered(lambda x: x.sync_engine == "crawler")
+        crawler_organizations._sync_crawler()
+        organizations = self - crawler_organizations
+        if organizations:
+            organizations.button_sync_member()
+            organizations.button_sync_repository()
+            organizations.button_sync_team()
+
+    def _get_sync_plan(self):
+        """Plan the changes of the members, repositories and teams. The
+        repositories are listed with the REST API, whatever the
+        synchronization backend."""
+        plan = []
+        partner_obj = self.env["res.partner"]
+        repository_obj = self.env["github.repository"]
+        team_obj = self.env["github.team"]
+        for organization in self:
+            gh_org = organization.find_related_github_object()
+            member_plan, partners = partner_obj._plan_github_objects(
+                partner_obj._iter_github_list(gh_org.get_members())
+            )
+            repository_plan, repositories = repository_obj.with_context(
+                github_organization_id=organization.id
+            )._plan_github_objects(
+                repository_obj._iter_github_list(gh_org.get_repos()), update=True
+            )
+            team_plan, teams = team_obj._plan_github_objects(
+                team_obj._iter_github_list(gh_org.get_teams())
+            )
+            for field_name, field_plan, records in (
+                ("member_ids", member_plan, partners),
+                ("repository_ids", repository_plan, repositories),
+                ("team_ids", team_plan, teams),
+            ):
+                plan += field_plan
+                plan += self._plan_removal(
+                    organization[field_name]
+                    - organization[field_name].browse([x.id for x in records.values()])
+                )
+        return plan
 
     @api.model
     def cron_update_organization_team(self):
-        organizations = self.search([])
-        organizations.full_update()
-        organizations.mapped("team_ids").full_update()
+        """Synchronize the organizations and their teams, page by page (see
+        'github.sync.run'), resuming the runs that were interrupted"""
+        organizations = self.search([]).sorted(
+            lambda x: x.github_last_sync_date or datetime.min
+        )
+        runs = self.env["github.sync.run"]._get_runs(organizations)
+        for run in self.env["github.sync.scheduler"]._iter_budgeted(
+            runs._iter_steps(), "github_connector.cron_update_organization"
+        ):
+            run._run_step()
         return True
 
     # Compute Section
@@ -150,6 +280,41 @@ class GithubOrganization(models.Model):
                 organization.organization_serie_ids
             )
 
+    @api.constrains("ignored_repository_names")
+    def _check_ignored_repository_names(self):
+        for organization in self:
+            try:
+                self._compile_ignored_repository_names(
+                    organization.ignored_repository_names
+                )
+            except re.error as e:
+                raise exceptions.ValidationError(
+                    _("Invalid pattern in the ignored repositories: %s") % e
+                )
+
+    @api.model
+    @tools.ormcache("ignored_repository_names")
+    def _compile_ignored_repository_names(self, ignored_repository_names):
+        """Return a regular expression matching the names of the ignored
+        repositories, or None.
+
+        Each line is a repository name, a glob pattern, or a regular
+        expression prefixed by 're:'.
+        """
+        patterns = []
+        for line in (ignored_repository_names or "").split("\n"):
+            line = line.strip()
+            if line.startswith("re:"):
+                patterns.append("(?:%s)\\Z" % line[3:])
+            elif line:
+                patterns.append(fnmatch.translate(line))
+        return patterns and re.compile("|".join(patterns)) or None
+
+    def _is_ignored_repository_name(self, name):
+        self.ensure_one()
+        regex = self._compile_ignored_repository_names(self.ignored_repository_names)
+        return bool(regex and name and regex.match(name))
+
     def find_related_github_object(self, obj_id=None):
         """Query Github API to find the related object"""
         gh_api = self.get_github_connector()
@@ -157,47 +322,262 @@ class GithubOrganization(models.Model):
 
     # Action section
     def button_sync_member(self):
-        gh_org = self.find_related_github_object()
-        partner_obj = self.env["res.partner"]
-        for organization in self:
-            member_ids = []
-            for gh_member in gh_org.get_members():
-                partner = partner_obj.get_from_id_or_create(gh_data=gh_member)
-                member_ids.append(partner.id)
-            organization.member_ids = member_ids
+        with self._record_github_sync(
+            "Members of %s" % ", ".join(self.mapped("github_name"))
+        ):
+            gh_org = self.find_related_github_object()
+            partner_obj = self.env["res.partner"]
+            for organization in self:
+                organization.member_ids = partner_obj.get_or_create_many(
+                    partner_obj._iter_github_list(gh_org.get_members())
+                )
 
     def button_sync_repository(self):
-        gh_org = self.find_related_github_object()
+        with self._record_github_sync(
+            "Repositories of %s" % ", ".join(self.mapped("github_name"))
+        ):
+            graphql_organizations = self.filtered(lambda x: x.sync_backend == "graphql")
+            graphql_organizations._sync_repository_graphql()
+            if not self - graphql_organizations:
+                return
+            gh_org = (self - graphql_organizations).find_related_github_object()
+            repository_obj = self.env["github.repository"]
+            for organization in self - graphql_organizations:
+                gh_repos = list(repository_obj._iter_github_list(gh_org.get_repos()))
+                repositories = repository_obj.with_context(
+                    github_organization_id=organization.id
+                ).get_or_create_many(gh_repos)
+                organization.repository_ids = repositories
+                organization._update_repositories_from_github(gh_repos, repositories)
+
+    def button_full_resync(self):
+        """Synchronize all the repositories and their branches, ignoring the
+        incremental synchronization"""
+        organizations = self.with_context(github_full_sync=True)
+        organizations.full_update()
+        organizations.mapped("repository_ids").button_sync_branch()
+
+    def _update_repositories_from_github(self, gh_repos, repositories, watermark=None):
+        """Update the repositories that changed on Github since the last
+        synchronization (or all of them, if it is not incremental), and move
+        the watermark of the organization.
+
+        :param gh_repos: Github repositories
+        :param repositories: the matching records, in the same order
+        :param watermark: the repositories changed before this date are not
+            updated. Default to the watermark of the organization.
+        :return: the updated repositories
+        """
+        self.ensure_one()
+        repository_obj = self.env["github.repository"].with_context(
+            github_organization_id=self.id
+        )
+        if watermark is None:
+            watermark = self._get_repository_watermark()
+        new_watermark = self.repository_sync_watermark
+        updated_repositories = repository_obj.browse()
+        datas = []
+        for i, gh_repo in enumerate(gh_repos):
+            data = repository_obj.get_odoo_data_from_github(gh_repo)
+            change_date = max(
+                filter(
+                    None, [data.get("github_write_date"), data.get("github_push_date")]
+                ),
+                default=False,
+            )
+            if watermark and change_date and change_date <= watermark:
+                continue
+            datas.append(data)
+            updated_repositories |= repositories[i]
+            if change_date and (not new_watermark or change_date > new_watermark):
+                new_watermark = change_date
+        updated_repositories._update_many_from_github_data(datas)
+        if updated_repositories:
+            _logger.info(
+                "%d/%d repositories of %s updated.",
+                len(updated_repositories),
+                len(repositories),
+                self.github_name,
+            )
+        self.repository_sync_watermark = new_watermark
+        return updated_repositories
+
+    def _get_repository_watermark(self):
+        """Return the date before which the changes of the repositories are
+        already synchronized, False if all of them must be updated"""
+        self.ensure_one()
+        if self.env.context.get("github_full_sync") or not self.sync_incremental:
+            return False
+        return self.repository_sync_watermark
+
+    def _sync_crawler(self):
+        """Synchronize the members, repositories, branches and teams, crawled
+        concurrently (see ``lib.crawler``)"""
+        if not self:
+            return
+        client = self._get_github_client()
+        concurrency = self._get_config_param(
+            "github.fetch_concurrency", DEFAULT_CONCURRENCY
+        )
+        partners = self.env["res.partner"].search([("github_id_external", "!=", False)])
+        for organization in self:
+            with self._record_github_sync("Crawl of %s" % organization.github_name):
+                watermark = organization._get_repository_watermark()
+                result = crawl_organization(
+                    client,
+                    organization.github_name,
+                    branch_names=organization.organization_serie_ids.mapped("name"),
+                    known_user_ids={
+                        int(x) for x in partners.mapped("github_id_external")
+                    },
+                    watermark=watermark,
+                    is_ignored=organization._is_ignored_repository_name,
+                    concurrency=min(concurrency, client.pool_size),
+                    rate_limit_reserve=self._get_config_param(
+                        "github.rate_limit_threshold", 200
+                    ),
+                    branch_lookup_threshold=self._get_config_param(
+                        "github.branch_lookup_threshold", 10
+                    ),
+                )
+                organization._write_crawl_result(client, result, watermark)
+
+    def _write_crawl_result(self, client, result, watermark):
+        """Write the data of an organization crawl (see ``CrawlResult``)"""
+        self.ensure_one()
+        github = client.github
+        partner_obj = self.env["res.partner"]
+        repository_obj = self.env["github.repository"].with_context(
+            github_organization_id=self.id
+        )
+        team_obj = self.env["github.team"].with_context(github_organization_id=self.id)
+        # Members
+        self.member_ids = partner_obj.get_or_create_many(
+            [github.create_from_raw_data(NamedUser, x) for x in result.members]
+        )
+        # Repositories and their branches
+        gh_repos = [
+            github.create_from_raw_data(Repository, x) for x in result.repositories
+        ]
+        repositories = repository_obj.get_or_create_many(gh_repos)
+        self.repository_ids = repositories
+        updated_repositories = self._update_repositories_from_github(
+            gh_repos, repositories, watermark=watermark
+        )
+        branch_names = {}
+        for i, repository in enumerate(repositories):
+            full_name = result.repositories[i]["full_name"]
+            if repository in updated_repositories and full_name in result.branches:
+                branch_names[repository.id] = result.branches[full_name]
+        repositories._update_branches_from_names(branch_names)
+        # Teams, with their members and repositories
+        teams = team_obj.get_or_create_many(
+            [github.create_from_raw_data(Team, x) for x in result.teams]
+        )
+        self.team_ids = teams
+        team_users = [
+            github.create_from_raw_data(NamedUser, x[0])
+            for team_members in result.team_members.values()
+            for x in team_members
+        ]
+        team_repos = [
+            github.create_from_raw_data(Repository, x)
+            for team_repositories in result.team_repositories.values()
+            for x in team_repositories
+        ]
+        partners = partner_obj.get_or_create_many(team_users)
+        partner_ids = {
+            x._rawData["id"]: partners[i].id for i, x in enumerate(team_users)
+        }
+        team_repositories = self.env["github.repository"].get_or_create_many(team_repos)
+        repository_ids = {
+            x._rawData["id"]: team_repositories[i].id for i, x in enumerate(team_repos)
+        }
+        for i, team in enumerate(teams):
+            team_id = result.teams[i]["id"]
+            team._reconcile_lines(
+                "partner_ids",
+                "partner_id",
+                "role",
+                {
+                    partner_ids[user["id"]]: role
+                    for user, role in result.team_members.get(team_id, [])
+                },
+            )
+            permissions = {}
+            for raw_repo in result.team_repositories.get(team_id, []):
+                gh_permissions = raw_repo.get("permissions") or {}
+                if gh_permissions.get("admin"):
+                    permission = "admin"
+                elif gh_permissions.get("push"):
+                    permission = "write"
+                else:
+                    permission = "read"
+                permissions[repository_ids[raw_repo["id"]]] = permission
+            team._reconcile_lines(
+                "repository_ids", "repository_id", "permission", permissions
+            )
+        _logger.info(
+            "%s crawled: %d members, %d repositories (%d updated), %d teams.",
+            self.github_name,
+            len(self.member_ids),
+            len(repositories),
+            len(updated_repositories),
+            len(teams),
+        )
+
+    def _sync_repository_graphql(self):
+        """Synchronize the repositories, and their branches, with the GraphQL
+        API"""
+        if not self:
+            return
+        client = self._get_github_client()
         repository_obj = self.env["github.repository"]
         for organization in self:
-            repository_ids = []
-            for gh_repo in gh_org.get_repos():
-                repository = repository_obj.with_context(
-                    github_organization_id=organization.id
-                ).get_from_id_or_create(gh_data=gh_repo)
-                repository_ids.append(repository.id)
-            organization.repository_ids = repository_ids
+            gh_repos = []
+            branch_names = []
+            gh_repositories = iter_organization_repositories(
+                client,
+                organization.github_name,
+                organization.organization_serie_ids.mapped("name"),
+            )
+            for repository_data, repository_branch_names in gh_repositories:
+                gh_repos.append(
+                    client.github.create_from_raw_data(Repository, repository_data)
+                )
+                branch_names.append(repository_branch_names)
+            repositories = repository_obj.with_context(
+                github_organization_id=organization.id
+            ).get_or_create_many(gh_repos)
+            organization.repository_ids = repositories
+            updated_repositories = organization._update_repositories_from_github(
+                gh_repos, repositories
+            )
+            repository_branch_names = {}
+            for i, repository in enumerate(repositories):
+                if repository in updated_repositories and not repository.is_ignored:
+                    repository_branch_names[repository.id] = branch_names[i]
+            repositories._update_branches_from_names(repository_branch_names)
 
     def button_sync_team(self):
-        gh_org = self.find_related_github_object()
-        team_obj = self.env["github.team"]
-        for organization in self:
-            try:
-                team_ids = []
-                for gh_team in gh_org.get_teams():
-                    team = team_obj.get_from_id_or_create(
-                        gh_data=gh_team, extra_data={"organization_id": organization.id}
-                    )
-                    team_ids.append(team.id)
-                organization.team_ids = team_ids
-            except GithubException as e:
-                if e.status == 403:
-                    raise exceptions.AccessError(
-                        _(
-                            "The provided Github Token must have admin read:org"
-                            " permissions to the organization '%s'" % self.name
+        with self._record_github_sync(
+            "Teams of %s" % ", ".join(self.mapped("github_name"))
+        ):
+            gh_org = self.find_related_github_object()
+            team_obj = self.env["github.team"]
+            for organization in self:
+                try:
+                    organization.team_ids = team_obj.with_context(
+                        github_organization_id=organization.id
+                    ).get_or_create_many(team_obj._iter_github_list(gh_org.get_teams()))
+                except GithubException as e:
+                    if e.status == 403:
+                        raise exceptions.AccessError(
+                            _(
+                                "The provided Github Token must have admin read:org"
+                                " permissions to the organization '%s'" % self.name
+                            )
                         )
-                    )
 
     def action_github_repository(self):
         self.ensure_one()
@@ -4,8 +4,15 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
 import logging
+import os
+from datetime import datetime
 
-from odoo import api, fields, models
+from github.GithubException import UnknownObjectException
+
+from odoo import api, fields, models, tools
+
+from ..lib.git_download import CLONE_STRATEGIES, get_strategy_args
+from ..lib.graphql import get_repositories_branch_names
 
 _logger = logging.getLogger(__name__)
 
@@ -69,24 +76,37 @@ class GithubRepository(models.Model):
     is_ignored = fields.Boolean(
         string="Is Ignored",
         compute="_compute_ignore",
+        store=True,
+        index=True,
         help="If checked, the branches will not be synchronized, and the"
         " code source will this way not be downloaded and analyzed. To ignore"
         " a repository, go to the organization and add the file"
         " 'Ignored Repositories'.",
     )
 
-    color = fields.Integer(string="Color Index", compute="_compute_ignore")
+    color = fields.Integer(string="Color Index", compute="_compute_ignore", store=True)
+
+    clone_strategy = fields.Selection(
+        string="Clone Strategy",
+        selection=CLONE_STRATEGIES,
+        help="How the source code of the branches is downloaded. If empty,"
+        " the clone strategy of the organization is used.",
+    )
+
+    branch_sync_date = fields.Datetime(string="Last Branches Sync Date", readonly=True)
+
+    github_push_date = fields.Datetime(string="Last Push Date on Github", readonly=True)
+
     analysis_rule_ids = fields.Many2many(
         string="Analysis Rules", comodel_name="github.analysis.rule"
     )
 
     # Compute Section
-    @api.depends("organization_id.ignored_repository_names")
+    @api.depends("name", "organization_id.ignored_repository_names")
     def _compute_ignore(self):
         for repository in self:
-            ignored_txt = repository.organization_id.ignored_repository_names
             repository.is_ignored = (
-                ignored_txt and repository.name in ignored_txt.split("\n")
+                repository.organization_id._is_ignored_repository_name(repository.name)
             )
             repository.color = repository.is_ignored and 1 or 0
 
@@ -119,6 +139,7 @@ class GithubRepository(models.Model):
                 "name": "name",
                 "description": "description",
                 "website": "homepage",
+                "github_push_date": "pushed_at",
             }
         )
         return res
@@ -163,36 +184,166 @@ class GithubRepository(models.Model):
     def full_update(self):
         self.button_sync_branch()
 
+    def _get_sync_plan(self):
+        """Plan the changes of the branches. The branches are listed with
+        the REST API, whatever the synchronization backend."""
+        plan = []
+        branch_obj = self.env["github.repository.branch"]
+        for repository in self.filtered(lambda r: not r.is_ignored):
+            branch_names = repository._get_serie_branch_names(
+                repository.find_related_github_object()
+            )
+            existing_names = repository.repository_branch_ids.mapped("name")
+            plan += [
+                self._prepare_sync_plan_line(
+                    "create", branch_obj, "%s/%s" % (repository.complete_name, x)
+                )
+                for x in branch_names
+                if x not in existing_names
+            ]
+            plan += self._plan_removal(
+                repository.repository_branch_ids.filtered_domain(
+                    [("name", "not in", branch_names)]
+                )
+            )
+        return plan
+
     @api.model
     def cron_update_branch_list(self):
-        branches = self.search([])
-        branches.button_sync_branch()
+        repositories = (
+            self.search([("is_ignored", "=", False)])
+            .filtered(lambda x: x._is_pushed_since(x.branch_sync_date))
+            .sorted(lambda x: x.branch_sync_date or datetime.min)
+        )
+        # The repositories are synchronized by small batches, so that the
+        # branches of a batch are read and created together
+        for batch in self.env["github.sync.scheduler"]._iter_budgeted(
+            tools.split_every(10, repositories.ids, self.browse),
+            "github_connector.cron_update_branch_list",
+        ):
+            batch.button_sync_branch()
         return True
 
+    def _is_pushed_since(self, date):
+        """Return True if the repository may have been pushed on Github since
+        the given date. Always True if the synchronization of the
+        organization is not incremental."""
+        self.ensure_one()
+        if (
+            self.env.context.get("github_full_sync")
+            or not self.organization_id.sync_incremental
+        ):
+            return True
+        return not (date and self.github_push_date) or self.github_push_date > date
+
+    def _get_clone_args(self):
+        """Return the (clone options, fetch options) of the git commands
+        downloading the branches of the repository"""
+        self.ensure_one()
+        organization = self.organization_id
+        return get_strategy_args(
+            self.clone_strategy or organization.clone_strategy,
+            organization.clone_depth,
+        )
+
+    def _get_mirror_path(self):
+        """Return the path of the bare mirror shared by the branches of the
+        repository, or None if its branches are independent clones"""
+        self.ensure_one()
+        if self.organization_id.source_layout != "worktree":
+            return None
+        return os.path.join(
+            self.env["github.repository.branch"]._get_source_path(),
+            self.complete_name + ".git",
+        )
+
     def button_sync_branch(self):
-        branch_obj = self.env["github.repository.branch"]
-        for repository in self.filtered(lambda r: not r.is_ignored):
+        repositories = self.filtered(lambda r: not r.is_ignored)
+        graphql_repositories = repositories.filtered(
+            lambda r: r.organization_id.sync_backend == "graphql"
+        )
+        graphql_repositories._sync_branch_graphql()
+        branch_names = {}
+        for repository in repositories - graphql_repositories:
             gh_repo = repository.find_related_github_object()
-            branch_ids = []
-            correct_series = repository.organization_id.organization_serie_ids.mapped(
-                "name"
-            )
+            branch_names[repository.id] = repository._get_serie_branch_names(gh_repo)
+        self._update_branches_from_names(branch_names)
+
+    def _get_serie_branch_names(self, gh_repo):
+        """Return the names of the branches of the Github repository that
+        match the series of the organization.
+
+        The branches are looked up by name (one request by serie, often
+        answered by the API cache), unless there are more series than
+        'github.branch_lookup_threshold', in which case all the branches
+        of the repository are listed.
+        """
+        self.ensure_one()
+        serie_names = self.organization_id.organization_serie_ids.mapped("name")
+        threshold = self._get_config_param("github.branch_lookup_threshold", 10)
+        if len(serie_names) > threshold:
+            branch_names = []
             for gh_branch in gh_repo.get_branches():
-                if gh_branch.name in correct_series:
-                    # We don't use get_from_id_or_create because repository
-                    # branches does not have any ids. (very basic object in the
-                    # Github API)
-                    branch = branch_obj.create_or_update_from_name(
-                        repository.id, gh_branch.name
-                    )
-                    branch_ids.append(branch.id)
+                if gh_branch.name in serie_names:
+                    branch_names.append(gh_branch.name)
                 else:
-                    _logger.warning(
+                    _logger.debug(
                         "the branch '%s'/'%s' has been ignored.",
-                        repository.name,
+                        self.name,
                         gh_branch.name,
                     )
-            repository.repository_branch_ids = [(6, 0, branch_ids)]
+            return branch_names
+        branch_names = []
+        for serie_name in serie_names:
+            try:
+                gh_branch = gh_repo.get_branch(serie_name)
+            except UnknownObjectException:
+                continue
+            # Github redirects the renamed branches to their new name
+            if gh_branch.name == serie_name:
+                branch_names.append(serie_name)
+        return branch_names
+
+    def _sync_branch_graphql(self):
+        """Synchronize the branches with the GraphQL API, fetching the
+        branches of 50 repositories by query"""
+        if not self:
+            return
+        client = self._get_github_client()
+        for organization in self.mapped("organization_id"):
+            repositories = self.filtered_domain(
+                [("organization_id", "=", organization.id)]
+            )
+            branch_names = get_repositories_branch_names(
+                client,
+                repositories.mapped("complete_name"),
+                organization.organization_serie_ids.mapped("name"),
+            )
+            repository_branch_names = {}
+            for repository in repositories:
+                if repository.complete_name not in branch_names:
+                    _logger.warning(
+                        "the repository '%s' has not been found on Github.",
+                        repository.complete_name,
+                    )
+                    continue
+                repository_branch_names[repository.id] = branch_names[
+                    repository.complete_name
+                ]
+            repositories._update_branches_from_names(repository_branch_names)
+
+    def _update_branches_from_names(self, branch_names):
+        """Set the branches of the repositories, from their names
+
+        :param branch_names: dict {repository id: list of branch names}
+        """
+        if not branch_names:
+            return
+        branches = self.env["github.repository.branch"]._upsert_from_names(branch_names)
+        repositories = self.browse(list(branch_names))
+        kept_branches = self.env["github.repository.branch"].union(*branches.values())
+        (repositories.mapped("repository_branch_ids") - kept_branches).unlink()
+        repositories.write({"branch_sync_date": fields.Datetime.now()})
 
     def action_github_team_repository_from_repository(self):
         self.ensure_one()
@@ -6,13 +6,21 @@
 
 import logging
 import os
-import shutil
+from collections import defaultdict
 from datetime import datetime
-from subprocess import check_output
+
+import psycopg2
 
 from odoo import _, addons, api, exceptions, fields, models, tools
 from odoo.tools.safe_eval import safe_eval
 
+from ..lib.git_download import (
+    DEFAULT_CONCURRENCY as DEFAULT_GIT_CONCURRENCY,
+    DEFAULT_TIMEOUT as DEFAULT_GIT_TIMEOUT,
+    DownloadJob,
+    download_all,
+)
+
 _logger = logging.getLogger(__name__)
 
 try:
@@ -85,6 +93,8 @@ class GithubRepository(models.Model):
 
     last_download_date = fields.Datetime(string="Last Download Date")
 
+    last_download_error = fields.Text(string="Last Download Error", readonly=True)
+
     last_analyze_date = fields.Datetime(string="Last Analyze Date")
 
     coverage_url = fields.Char(
@@ -105,6 +115,14 @@ class GithubRepository(models.Model):
         inverse_name="repository_branch_id",
     )
 
+    _sql_constraints = [
+        (
+            "repository_name_uniq",
+            "unique(repository_id, name)",
+            "A branch name must be unique by repository.",
+        )
+    ]
+
     # Init Section
     def __init__(self, pool, cr):
         source_path = self._get_source_path()
@@ -138,13 +156,31 @@ class GithubRepository(models.Model):
 
     @api.model
     def cron_download_all(self):
-        branches = self.search([])
-        branches._download_code()
+        branches = (
+            self.search([("repository_id.is_ignored", "=", False)])
+            .filtered(
+                lambda x: x.state == "to_download"
+                or x.repository_id._is_pushed_since(x.last_download_date)
+            )
+            .sorted(lambda x: x.last_download_date or datetime.min)
+        )
+        # The branches are downloaded by batches, each one by concurrent git
+        # processes
+        batch_size = 5 * self._get_config_param(
+            "git.download_concurrency", DEFAULT_GIT_CONCURRENCY
+        )
+        for batch in self.env["github.sync.scheduler"]._iter_budgeted(
+            tools.split_every(batch_size, branches.ids, self.browse),
+            "github_connector.cron_download_code",
+        ):
+            batch._download_code()
         return True
 
     @api.model
     def cron_analyze_all(self):
-        branches = self.search([("state", "=", "to_analyze")])
+        branches = self.search(
+            [("state", "=", "to_analyze"), ("repository_id.is_ignored", "=", False)]
+        )
         branches._analyze_code()
         return True
 
@@ -156,76 +192,110 @@ class GithubRepository(models.Model):
 
     # Custom
     def create_or_update_from_name(self, repository_id, name):
-        branch = self.search(
-            [("name", "=", name), ("repository_id", "=", repository_id)]
-        )
-        if not branch:
-            branch = self.create({"name": name, "repository_id": repository_id})
-        return branch
+        return self._upsert_from_names({repository_id: [name]})[repository_id]
+
+    @api.model
+    def _upsert_from_names(self, branch_names, retry=True):
+        """Return the branches of the given names, creating the missing ones.
+
+        The existing branches of all the repositories are read with a
+        single query, and the missing ones are created together.
+
+        :param branch_names: dict {repository id: list of branch names}
+        :return: dict {repository id: branches, in the order of the names}
+        """
+        # We don't use get_or_create_many because repository branches
+        # does not have any ids. (very basic object in the Github API)
+        branches = {
+            (branch.repository_id.id, branch.name): branch
+            for branch in self.search([("repository_id", "in", list(branch_names))])
+        }
+        vals_list = [
+            {"repository_id": repository_id, "name": name}
+            for repository_id, names in branch_names.items()
+            for name in dict.fromkeys(names)
+            if (repository_id, name) not in branches
+        ]
+        if vals_list:
+            try:
+                with self.env.cr.savepoint():
+                    new_branches = self.create(vals_list)
+            except psycopg2.IntegrityError:
+                if not retry:
+                    raise
+                # Created meanwhile by a concurrent synchronization
+                self.invalidate_cache()
+                return self._upsert_from_names(branch_names, retry=False)
+            for branch in new_branches:
+                branches[(branch.repository_id.id, branch.name)] = branch
+        return {
+            repository_id: self.browse(
+                [branches[(repository_id, x)].id for x in dict.fromkeys(names)]
+            )
+            for repository_id, names in branch_names.items()
+        }
 
     def _download_code(self):
+        """Clone or update the branches (or their worktrees), with the clone
+        strategy of their repository, by concurrent git processes (see
+        'git.download_concurrency' and 'git.download_timeout'), and write the
+        results together"""
+        repository_args = {}
+        jobs = []
         for branch in self:
             repository = branch.repository_id
-            gh_repo = repository.find_related_github_object()
-            if not os.path.exists(branch.local_path):
-                _logger.info("Cloning new repository into %s ..." % branch.local_path)
-                # Cloning the repository
-                try:
-                    os.makedirs(branch.local_path)
-                except Exception:
-                    raise exceptions.UserError(
-                        _(
-                            "Error when trying to create the folder %s\n"
-                            " Please check Odoo Access Rights."
-                        )
-                        % (branch.local_path)
-                    )
-                command = ("git clone %s -b %s %s") % (
-                    gh_repo.clone_url,
+            if repository not in repository_args:
+                repository_args[repository] = (
+                    repository.find_related_github_object().clone_url,
+                    *repository._get_clone_args(),
+                    repository._get_mirror_path(),
+                )
+            clone_url, clone_args, fetch_args, mirror = repository_args[repository]
+            jobs.append(
+                DownloadJob(
+                    branch.id,
+                    clone_url,
                     branch.name,
                     branch.local_path,
+                    clone_args,
+                    fetch_args,
+                    mirror,
                 )
-                os.system(command)
-                branch.write(
-                    {"last_download_date": datetime.today(), "state": "to_analyze"}
-                )
-            else:
-                # Update repository
-                _logger.info("Pulling existing repository %s ..." % branch.local_path)
-                try:
-                    res = check_output(
-                        ["git", "pull", "origin", branch.name], cwd=branch.local_path
-                    )
-                    if branch.state == "to_download" or b"up-to-date" not in res:
-                        branch.write(
-                            {
-                                "last_download_date": datetime.today(),
-                                "state": "to_analyze",
-                            }
-                        )
-                    else:
-                        branch.write({"last_download_date": datetime.today()})
-                except Exception:
-                    # Trying to clean the local folder
-                    _logger.warning(
-                        _(
-                            "Error when updating the branch %s in the local folder"
-                            " %s.\n Deleting the local folder and trying"
-                            " again."
-                        ),
-                        branch.name,
-                        branch.local_path,
-                    )
-                    try:
-                        shutil.rmtree(branch.local_path)
-                    except Exception:
-                        _logger.error(
-                            "Error deleting the branch %s in the local folder "
-                            "%s. You need to check manually what is happening "
-                            "there."
-                        )
-                    else:
-                        branch._download_code()
+            )
+        results = download_all(
+            jobs,
+            concurrency=self._get_config_param(
+                "git.download_concurrency", DEFAULT_GIT_CONCURRENCY
+            ),
+            timeout=self._get_config_param("git.download_timeout", DEFAULT_GIT_TIMEOUT),
+        )
+        changed = self.browse([x.job.key for x in results if x.changed])
+        unchanged = self.browse([x.job.key for x in results if x.success]) - changed
+        # Never analyzed since the last download request
+        changed |= unchanged.filtered(lambda x: x.state == "to_download")
+        now = datetime.today()
+        changed.write(
+            {
+                "last_download_date": now,
+                "last_download_error": False,
+                "state": "to_analyze",
+            }
+        )
+        (unchanged - changed).write(
+            {"last_download_date": now, "last_download_error": False}
+        )
+        errors = defaultdict(list)
+        for result in results:
+            if not result.success:
+                errors[result.error].append(result.job.key)
+        for error, ids in errors.items():
+            self.browse(ids).write({"last_download_error": error})
+        _logger.info(
+            "%d branches downloaded: %d changed, %d failed.",
+            len(results),
+            len(changed),
+            sum(len(x) for x in errors.values()),
+        )
         return True
 
     def _get_analyzable_files(self, existing_folder):
@@ -233,7 +303,8 @@ class GithubRepository(models.Model):
         for root, _dirs, files in os.walk(existing_folder):
             if "/.git" not in root:
                 for fic in files:
-                    if fic != ".gitignore":
+                    # .git is a file in a worktree
+                    if fic not in (".git", ".gitignore"):
                         res.append(os.path.join(root, fic))
         return res
 
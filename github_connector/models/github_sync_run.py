@@ -0,0 +1,432 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from github.GithubException import GithubException
+
+from odoo import _, api, exceptions, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubSyncRun(models.Model):
+    """Checkpointed synchronization of an organization.
+
+    The 'Synchronize All Organizations and Teams' cron synchronizes the
+    organizations one page of Github results at a time, and commits after
+    each page. The run records where it stopped (phase and page), so that
+    a run interrupted (by the time limit of the worker, a Github error or
+    the rate limit) resumes from there at the next execution of the cron,
+    instead of starting from scratch.
+    """
+
+    _name = "github.sync.run"
+    _description = "Github Synchronization Run"
+    _order = "date_start desc, id desc"
+    _rec_name = "organization_id"
+
+    _PHASE_SELECTION = [
+        ("member", "Members"),
+        ("repository", "Repositories"),
+        ("team", "Teams"),
+        ("team_member", "Team Members"),
+        ("done", "Done"),
+    ]
+
+    # Main model of each phase, on which the cost of the phase is reported
+    _PHASE_MODELS = {
+        "member": "res.partner",
+        "repository": "github.repository",
+        "team": "github.team",
+        "team_member": "github.team",
+    }
+
+    _STATE_SELECTION = [
+        ("running", "Running"),
+        ("failed", "Failed"),
+        ("abandoned", "Abandoned"),
+        ("done", "Done"),
+    ]
+
+    # Maximum delay (in hours) before retrying a failed run
+    _RETRY_DELAY_MAX = 24
+
+    # Column Section
+    organization_id = fields.Many2one(
+        comodel_name="github.organization",
+        string="Organization",
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    state = fields.Selection(
+        selection=_STATE_SELECTION,
+        string="State",
+        required=True,
+        readonly=True,
+        index=True,
+        default="running",
+    )
+
+    phase = fields.Selection(
+        selection=_PHASE_SELECTION,
+        string="Phase",
+        required=True,
+        readonly=True,
+        default="member",
+    )
+
+    page = fields.Integer(
+        string="Page",
+        readonly=True,
+        help="Next page of Github results to synchronize in the current phase.",
+    )
+
+    team_id = fields.Many2one(
+        comodel_name="github.team",
+        string="Last Synchronized Team",
+        readonly=True,
+        ondelete="set null",
+    )
+
+    res_ids = fields.Text(
+        string="Synchronized Records",
+        readonly=True,
+        help="Ids of the records found on Github in the current phase.",
+    )
+
+    repository_watermark = fields.Datetime(
+        string="Repository Watermark",
+        readonly=True,
+        help="Watermark of the organization when the synchronization of the"
+        " repositories started.",
+    )
+
+    item_qty = fields.Integer(string="Synchronized Items", readonly=True)
+
+    date_start = fields.Datetime(
+        string="Start Date", readonly=True, default=fields.Datetime.now
+    )
+
+    date_checkpoint = fields.Datetime(string="Last Checkpoint", readonly=True)
+
+    date_end = fields.Datetime(string="End Date", readonly=True)
+
+    error_message = fields.Text(string="Error", readonly=True)
+
+    failure_qty = fields.Integer(
+        string="Failures",
+        readonly=True,
+        help="Number of failed steps. A failed run is retried after a delay"
+        " doubling at each failure, and abandoned after"
+        " 'github.sync_run_max_failure' failures.",
+    )
+
+    stat_ids = fields.One2many(
+        comodel_name="github.sync.run.stat",
+        inverse_name="run_id",
+        string="Statistics",
+        readonly=True,
+    )
+
+    request_qty = fields.Integer(
+        string="Requests", compute="_compute_stats", store=True
+    )
+
+    network_time = fields.Float(
+        string="Network Time (s)", compute="_compute_stats", store=True
+    )
+
+    query_qty = fields.Integer(
+        string="SQL Queries", compute="_compute_stats", store=True
+    )
+
+    duration = fields.Float(string="Duration (s)", compute="_compute_stats", store=True)
+
+    @api.depends(
+        "stat_ids.request_qty",
+        "stat_ids.network_time",
+        "stat_ids.query_qty",
+        "stat_ids.duration",
+    )
+    def _compute_stats(self):
+        for run in self:
+            run.request_qty = sum(run.stat_ids.mapped("request_qty"))
+            run.network_time = sum(run.stat_ids.mapped("network_time"))
+            run.query_qty = sum(run.stat_ids.mapped("query_qty"))
+            run.duration = sum(run.stat_ids.mapped("duration"))
+
+    @api.model
+    def _get_runs(self, organizations):
+        """Return the runs to process: the unfinished runs of the given
+        organizations, then new runs for the other ones.
+
+        A failed run is retried once its retry date is reached (see
+        ``_get_retry_date``), its organization having no new run meanwhile.
+        After 'github.sync_run_max_failure' failures, it is abandoned, and
+        a new run is started from scratch.
+        """
+        runs = self.search(
+            [
+                ("organization_id", "in", organizations.ids),
+                ("state", "in", ("running", "failed")),
+            ],
+            order="id",
+        )
+        max_failure = self.env["abstract.github.model"]._get_config_param(
+            "github.sync_run_max_failure", 5
+        )
+        abandoned_runs = runs.filtered(lambda x: x.failure_qty >= max_failure)
+        if abandoned_runs:
+            _logger.warning(
+                "Abandoning %d Github synchronization runs, after %d failures.",
+                len(abandoned_runs),
+                max_failure,
+            )
+            abandoned_runs.write({"state": "abandoned"})
+        runs -= abandoned_runs
+        now = fields.Datetime.now()
+        waiting_runs = runs.filtered(
+            lambda x: x.state == "failed" and x._get_retry_date() > now
+        )
+        resumed_runs = runs - waiting_runs
+        if resumed_runs:
+            resumed_runs.write({"state": "running"})
+            _logger.info("Resuming %d Github synchronization runs.", len(resumed_runs))
+        new_runs = self.create(
+            [
+                {"organization_id": x.id}
+                for x in organizations - runs.mapped("organization_id")
+            ]
+        )
+        return resumed_runs | new_runs
+
+    def _get_retry_date(self):
+        """Return the date after which the failed run can be retried"""
+        self.ensure_one()
+        if not self.failure_qty:
+            return self.date_start
+        delay = min(2 ** (self.failure_qty - 1), self._RETRY_DELAY_MAX)
+        return (self.date_checkpoint or self.date_start) + timedelta(hours=delay)
+
+    def _iter_steps(self):
+        """Yield each run as long as it has pages to synchronize"""
+        for run in self:
+            while run.state == "running":
+                yield run
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), "testing", False):
+            self._cr.commit()  # pylint: disable=invalid-commit
+
+    def _run_step(self):
+        """Synchronize the next page of the current phase, and commit.
+
+        A failed step is rolled back (to a savepoint, not to lose the
+        uncommitted run and API usage), and the run marked as failed.
+        """
+        self.ensure_one()
+        phase = self.phase
+        recorder = None
+        try:
+            with self._cr.savepoint():
+                with self.env["abstract.github.model"]._record_github_sync(
+                    "Synchronization of %s (%s, page %d)"
+                    % (self.organization_id.github_name, phase, self.page)
+                ) as recorder:
+                    if getattr(self, "_sync_%s" % phase)():
+                        self._next_phase()
+        except (GithubException, exceptions.UserError) as e:
+            # Drop the cache and the pending writes of the failed page, so
+            # that they are not flushed with the failed state
+            self.env.clear()
+            _logger.warning(
+                "Synchronization of %s failed in phase '%s', page %d: %s",
+                self.organization_id.github_name,
+                phase,
+                self.page,
+                e,
+            )
+            self.write(
+                {
+                    "state": "failed",
+                    "error_message": str(e),
+                    "failure_qty": self.failure_qty + 1,
+                }
+            )
+        else:
+            if self.failure_qty:
+                self.write({"error_message": False, "failure_qty": 0})
+        if recorder:
+            self._add_stats(phase, recorder)
+        self.date_checkpoint = fields.Datetime.now()
+        self._commit()
+
+    def _add_stats(self, phase, recorder):
+        """Add the figures of a step (see ``SyncRecorder``) to the
+        statistics of the phase"""
+        stats = {x.res_model: x for x in self.stat_ids if x.phase == phase}
+        record_qties = recorder.get_record_qties()
+        main_model = self._PHASE_MODELS[phase]
+        vals_list = []
+        for model in set(record_qties) | {main_model}:
+            created, updated, unchanged = record_qties.get(model, (0, 0, 0))
+            vals = {
+                "created_qty": created,
+                "updated_qty": updated,
+                "unchanged_qty": unchanged,
+            }
+            if model == main_model:
+                vals.update(
+                    {
+                        "step_qty": 1,
+                        "request_qty": recorder.request_qty,
+                        "not_modified_qty": recorder.not_modified_qty,
+                        "network_time": recorder.network_time,
+                        "query_qty": recorder.query_qty,
+                        "duration": recorder.duration,
+                    }
+                )
+            stat = stats.get(model)
+            if stat:
+                stat.write({key: stat[key] + value for key, value in vals.items()})
+            else:
+                vals_list.append(
+                    dict(vals, run_id=self.id, phase=phase, res_model=model)
+                )
+        self.env["github.sync.run.stat"].create(vals_list)
+
+    def _next_phase(self):
+        phases = [x[0] for x in self._PHASE_SELECTION]
+        phase = phases[phases.index(self.phase) + 1]
+        vals = {"phase": phase, "page": 0, "res_ids": False}
+        if phase == "done":
+            vals.update({"state": "done", "date_end": fields.Datetime.now()})
+            self.organization_id.github_last_sync_date = vals["date_end"]
+        self.write(vals)
+
+    def _get_res_ids(self):
+        return json.loads(self.res_ids or "[]")
+
+    def _save_page(self, gh_objects, records):
+        """Move the cursor to the next page, saving the ids of the records
+        of the page.
+
+        :return: True if it was the last page
+        """
+        self.write(
+            {
+                "page": self.page + 1,
+                "res_ids": json.dumps(self._get_res_ids() + records.ids),
+                "item_qty": self.item_qty + len(gh_objects),
+            }
+        )
+        per_page = (
+            self.env["abstract.github.model"]._get_github_client().github.per_page
+        )
+        return len(gh_objects) < per_page
+
+    def _sync_member(self):
+        organization = self.organization_id
+        if organization.sync_engine == "crawler":
+            # The whole organization is crawled in one step
+            organization._sync_crawler()
+            self.write(
+                {
+                    "phase": "team_member",
+                    "item_qty": organization.member_qty
+                    + organization.repository_qty
+                    + organization.team_qty,
+                }
+            )
+            return True
+        gh_users = (
+            organization.find_related_github_object().get_members().get_page(self.page)
+        )
+        partners = self.env["res.partner"].get_or_create_many(gh_users)
+        if not self._save_page(gh_users, partners):
+            return False
+        organization.member_ids = [(6, 0, self._get_res_ids())]
+        return True
+
+    def _sync_repository(self):
+        organization = self.organization_id
+        if organization.sync_backend == "graphql":
+            # The GraphQL pages are fetched in a row
+            organization._sync_repository_graphql()
+            self.item_qty += organization.repository_qty
+            return True
+        if not self.page:
+            # Keep the watermark of the start of the run, as the
+            # repositories are not listed by date
+            self.repository_watermark = (
+                not self.env.context.get("github_full_sync")
+                and organization.sync_incremental
+                and organization.repository_sync_watermark
+            )
+        gh_repos = (
+            organization.find_related_github_object().get_repos().get_page(self.page)
+        )
+        repositories = (
+            self.env["github.repository"]
+            .with_context(github_organization_id=organization.id)
+            .get_or_create_many(gh_repos)
+        )
+        organization._update_repositories_from_github(
+            gh_repos, repositories, watermark=self.repository_watermark
+        )
+        if not self._save_page(gh_repos, repositories):
+            return False
+        organization.repository_ids = [(6, 0, self._get_res_ids())]
+        return True
+
+    def _sync_team(self):
+        organization = self.organization_id
+        try:
+            gh_teams = (
+                organization.find_related_github_object()
+                .get_teams()
+                .get_page(self.page)
+            )
+        except GithubException as e:
+            if e.status == 403:
+                raise exceptions.UserError(
+                    _(
+                        "The provided Github Token must have admin read:org"
+                        " permissions to the organization '%s'"
+                    )
+                    % organization.name
+                )
+            raise
+        teams = (
+            self.env["github.team"]
+            .with_context(github_organization_id=organization.id)
+            .get_or_create_many(gh_teams)
+        )
+        if not self._save_page(gh_teams, teams):
+            return False
+        organization.team_ids = [(6, 0, self._get_res_ids())]
+        return True
+
+    def _sync_team_member(self):
+        """Synchronize the members and repositories of the next team"""
+        team = self.env["github.team"].search(
+            [
+                ("organization_id", "=", self.organization_id.id),
+                ("id", ">", self.team_id.id or 0),
+            ],
+            order="id",
+            limit=1,
+        )
+        if not team:
+            return True
+        team.full_update()
+        team.github_last_sync_date = fields.Datetime.now()
+        self.write({"team_id": team.id, "item_qty": self.item_qty + 1})
+        return False
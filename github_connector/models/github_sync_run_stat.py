@@ -0,0 +1,64 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, fields, models
+
+
+class GithubSyncRunStat(models.Model):
+    """Cost of a phase of a synchronization run.
+
+    The Github requests, network time, SQL queries and duration are
+    measured for the whole phase, and set on the line of the main model of
+    the phase. The records created, updated and unchanged are counted by
+    model.
+    """
+
+    _name = "github.sync.run.stat"
+    _description = "Github Synchronization Run Statistics"
+    _order = "run_id desc, id"
+
+    # Column Section
+    run_id = fields.Many2one(
+        comodel_name="github.sync.run",
+        string="Run",
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete="cascade",
+    )
+
+    organization_id = fields.Many2one(
+        related="run_id.organization_id", string="Organization", store=True
+    )
+
+    date_start = fields.Datetime(
+        related="run_id.date_start", string="Start Date", store=True
+    )
+
+    phase = fields.Selection(
+        selection="_get_phase_selection", string="Phase", readonly=True
+    )
+
+    res_model = fields.Char(string="Model", readonly=True)
+
+    step_qty = fields.Integer(string="Pages", readonly=True)
+
+    request_qty = fields.Integer(string="Requests", readonly=True)
+
+    not_modified_qty = fields.Integer(string="Not Modified Requests", readonly=True)
+
+    network_time = fields.Float(string="Network Time (s)", readonly=True)
+
+    query_qty = fields.Integer(string="SQL Queries", readonly=True)
+
+    duration = fields.Float(string="Duration (s)", readonly=True)
+
+    created_qty = fields.Integer(string="Created", readonly=True)
+
+    updated_qty = fields.Integer(string="Updated", readonly=True)
+
+    unchanged_qty = fields.Integer(string="Unchanged", readonly=True)
+
+    @api.model
+    def _get_phase_selection(self):
+        return self.env["github.sync.run"]._PHASE_SELECTION
@@ -0,0 +1,137 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+from datetime import datetime, timedelta
+
+from odoo import api, fields, models
+
+from ..lib.client import RequestRecorder
+from ..lib.retry import circuit_breaker
+
+_logger = logging.getLogger(__name__)
+
+
+class GithubSyncScheduler(models.AbstractModel):
+    """Service that spreads the Github API rate limit (5000 requests by hour)
+    between the connector crons.
+
+    Crons iterate over their records through ``_iter_budgeted()``. Before
+    each record, the remaining rate limit (read in the X-RateLimit headers)
+    and the budget of the cron are checked. When one of them is exhausted,
+    the iteration stops, and the cron is triggered again when Github resets
+    the rate limit. The requests made are saved as 'github.api.usage'.
+    """
+
+    _name = "github.sync.scheduler"
+    _description = "Github Synchronization Scheduler"
+
+    @api.model
+    def _iter_budgeted(self, records, cron_xmlid):
+        """Iterate over records, while the rate limit allows it.
+
+        The records should be ordered so that the ones that were not
+        processed by a paused run come first in the next one.
+
+        :param records: recordset to process
+        :param cron_xmlid: XML id of the cron processing the records
+        """
+        cron = self.env.ref(cron_xmlid, raise_if_not_found=False)
+        recorder = RequestRecorder()
+        usage = self.env["github.api.usage"].create(
+            {
+                "cron_id": cron and cron.id,
+                "date_start": fields.Datetime.now(),
+            }
+        )
+        state = "done"
+        try:
+            for record in records:
+                if self._must_pause(cron, recorder):
+                    state = "paused"
+                    self._reschedule(cron, recorder)
+                    break
+                with recorder:
+                    yield record
+        finally:
+            usage.write(self._prepare_usage_vals(recorder, state))
+
+    @api.model
+    def _get_rate_limit(self, recorder):
+        """Return (remaining, limit, reset timestamp) of the core rate limit,
+        or None if unknown"""
+        rate_limit = recorder.rate_limit.get("core")
+        if not rate_limit:
+            client = self.env["abstract.github.model"]._get_github_client()
+            rate_limit = client.rate_limit.get("core")
+        return rate_limit
+
+    @api.model
+    def _must_pause(self, cron, recorder):
+        if circuit_breaker.get_remaining():
+            _logger.info("Github calls suspended after too many errors.")
+            return True
+        rate_limit = self._get_rate_limit(recorder)
+        if not rate_limit:
+            return False
+        remaining, _limit, reset = rate_limit
+        threshold = self.env["abstract.github.model"]._get_config_param(
+            "github.rate_limit_threshold", 200
+        )
+        if remaining < threshold:
+            _logger.info(
+                "Github rate limit almost exhausted (%d remaining requests).",
+                remaining,
+            )
+            return True
+        if cron and cron.github_request_budget:
+            consumed = self.env["github.api.usage"]._get_window_consumed_qty(
+                cron, datetime.utcfromtimestamp(reset)
+            )
+            if consumed + recorder.consumed_qty >= cron.github_request_budget:
+                _logger.info(
+                    "Github requests budget of '%s' exhausted (%d requests).",
+                    cron.name,
+                    cron.github_request_budget,
+                )
+                return True
+        return False
+
+    @api.model
+    def _get_reset_date(self, recorder):
+        # The end of the cooldown of the circuit breaker, if open
+        reset_date = fields.Datetime.now() + timedelta(
+            seconds=circuit_breaker.get_remaining()
+        )
+        rate_limit = self._get_rate_limit(recorder)
+        if not rate_limit or not rate_limit[2]:
+            return reset_date
+        return max(reset_date, datetime.utcfromtimestamp(rate_limit[2]))
+
+    @api.model
+    def _reschedule(self, cron, recorder):
+        """Trigger the cron again, once the rate limit is reset"""
+        if not cron:
+            return
+        reset_date = self._get_reset_date(recorder)
+        _logger.info("'%s' paused until %s.", cron.name, reset_date)
+        cron.sudo()._trigger(at=reset_date)
+
+    @api.model
+    def _prepare_usage_vals(self, recorder, state):
+        rate_limit = self._get_rate_limit(recorder) or (0, 0, 0)
+        return {
+            "date_end": fields.Datetime.now(),
+            "state": state,
+            "request_qty": recorder.request_qty,
+            "not_modified_qty": recorder.not_modified_qty,
+            "consumed_qty": recorder.consumed_qty,
+            "network_time": recorder.network_time,
+            "retry_qty": recorder.retry_qty,
+            "retry_time": recorder.retry_time,
+            "circuit_trip_qty": recorder.trip_qty,
+            "rate_limit_remaining": rate_limit[0],
+            "rate_limit_reset_date": datetime.utcfromtimestamp(rate_limit[2])
+            if rate_limit[2]
+            else False,
+        }
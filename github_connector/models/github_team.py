@@ -3,6 +3,8 @@
 # @author: Sylvain LE GAL (https://twitter.com/legalsylvain)
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
+from collections import defaultdict
+
 from odoo import api, fields, models
 
 
@@ -118,12 +120,11 @@ class GithubTeam(models.Model):
     def get_odoo_data_from_github(self, gh_data):
         organization_obj = self.env["github.organization"]
         res = super().get_odoo_data_from_github(gh_data)
-        if gh_data.organization:
+        organization_id = self.env.context.get("github_organization_id", False)
+        if not organization_id and gh_data.organization:
             organization_id = organization_obj.get_from_id_or_create(
                 gh_data=gh_data.organization
             ).id
-        else:
-            organization_id = False
         res.update({"organization_id": organization_id})
         return res
 
@@ -151,6 +152,86 @@ class GithubTeam(models.Model):
         self.button_sync_member()
         self.button_sync_repository()
 
+    def _get_sync_plan(self):
+        """Plan the changes of the members and repositories"""
+        plan = []
+        partner_obj = self.env["res.partner"]
+        repository_obj = self.env["github.repository"]
+        for team in self:
+            gh_team = team.find_related_github_object()
+            gh_users = []
+            roles = {}
+            for role in ("member", "maintainer"):
+                for gh_user in partner_obj._iter_github_list(
+                    gh_team.get_members(role=role)
+                ):
+                    gh_users.append(gh_user)
+                    roles[str(gh_user._rawData["id"])] = role
+            partner_plan, partners = partner_obj._plan_github_objects(gh_users)
+            plan += partner_plan
+            plan += team._plan_lines(
+                "partner_ids", "partner_id", "role", partners, roles
+            )
+            gh_repos = list(repository_obj._iter_github_list(gh_team.get_repos()))
+            permissions = {}
+            for gh_repo in gh_repos:
+                if gh_repo.permissions.admin:
+                    permission = "admin"
+                elif gh_repo.permissions.push:
+                    permission = "write"
+                else:
+                    permission = "read"
+                permissions[str(gh_repo._rawData["id"])] = permission
+            repository_plan, repositories = repository_obj._plan_github_objects(
+                gh_repos
+            )
+            plan += repository_plan
+            plan += team._plan_lines(
+                "repository_ids",
+                "repository_id",
+                "permission",
+                repositories,
+                permissions,
+            )
+        return plan
+
+    def _plan_lines(self, line_field, key_field, value_field, records, values):
+        """Dry run of _reconcile_lines().
+
+        :param records: dict {Github id: existing key record}
+        :param values: dict {Github id: value}
+        """
+        self.ensure_one()
+        lines = self[line_field]
+        plan = []
+        lines_by_key = {}
+        for line in lines:
+            # The duplicated lines are removed
+            lines_by_key.setdefault(line[key_field].id, line)
+        kept_lines = lines.browse()
+        for github_id, value in values.items():
+            record = records.get(github_id)
+            line = record and lines_by_key.get(record.id)
+            if not line:
+                plan.append(
+                    self._prepare_sync_plan_line(
+                        "create",
+                        lines.browse(),
+                        "%s / %s"
+                        % (self.name, record and record.display_name or github_id),
+                    )
+                )
+                continue
+            kept_lines |= line
+            if line[value_field] != value:
+                plan.append(
+                    self._prepare_sync_plan_line(
+                        "update", line, changes={value_field: value}
+                    )
+                )
+        plan += self._plan_removal(lines - kept_lines)
+        return plan
+
     def find_related_github_object(self, obj_id=None):
         """Query Github API to find the related object"""
         self.get_github_connector()
@@ -160,39 +241,79 @@ class GithubTeam(models.Model):
 
     # Action Section
     def button_sync_member(self):
-        partner_obj = self.env["res.partner"]
-        gh_team = self.find_related_github_object()
-        for team in self:
-            partner_data = []
-            # Fetching the role after getting each user requires more API calls for
-            # each user, so we fetch the users in 2 steps, one for each role
-            for gh_user in gh_team.get_members(role="member"):
-                partner = partner_obj.get_from_id_or_create(gh_data=gh_user)
-                partner_data.append({"partner_id": partner.id, "role": "member"})
-            for gh_user in gh_team.get_members(role="maintainer"):
-                partner = partner_obj.get_from_id_or_create(gh_data=gh_user)
-                partner_data.append({"partner_id": partner.id, "role": "maintainer"})
-            team.partner_ids = [(2, x.id, False) for x in team.partner_ids]
-            team.partner_ids = [(0, False, x) for x in partner_data]
+        with self._record_github_sync("Members of %s" % ", ".join(self.mapped("name"))):
+            partner_obj = self.env["res.partner"]
+            gh_team = self.find_related_github_object()
+            for team in self:
+                roles = {}
+                # Fetching the role after getting each user requires more API calls for
+                # each user, so we fetch the users in 2 steps, one for each role
+                for role in ("member", "maintainer"):
+                    partners = partner_obj.get_or_create_many(
+                        partner_obj._iter_github_list(gh_team.get_members(role=role))
+                    )
+                    roles.update(dict.fromkeys(partners.ids, role))
+                team._reconcile_lines("partner_ids", "partner_id", "role", roles)
 
     def button_sync_repository(self):
-        repository_obj = self.env["github.repository"]
-        gh_team = self.find_related_github_object()
-        for team in self:
-            repository_data = []
-            for gh_repo in gh_team.get_repos():
-                repository = repository_obj.get_from_id_or_create(gh_data=gh_repo)
-                if gh_repo.permissions.admin:
-                    permission = "admin"
-                elif gh_repo.permissions.push:
-                    permission = "write"
-                else:
-                    permission = "read"
-                repository_data.append(
-                    {"repository_id": repository.id, "permission": permission}
+        with self._record_github_sync(
+            "Repositories of %s" % ", ".join(self.mapped("name"))
+        ):
+            repository_obj = self.env["github.repository"]
+            gh_team = self.find_related_github_object()
+            for team in self:
+                permissions = {}
+                gh_repos = list(repository_obj._iter_github_list(gh_team.get_repos()))
+                repositories = repository_obj.get_or_create_many(gh_repos)
+                for i, gh_repo in enumerate(gh_repos):
+                    if gh_repo.permissions.admin:
+                        permission = "admin"
+                    elif gh_repo.permissions.push:
+                        permission = "write"
+                    else:
+                        permission = "read"
+                    permissions[repositories[i].id] = permission
+                team._reconcile_lines(
+                    "repository_ids", "repository_id", "permission", permissions
                 )
-            team.repository_ids = [(2, x.id, False) for x in team.repository_ids]
-            team.repository_ids = [(0, False, x) for x in repository_data]
+
+    def _reconcile_lines(self, line_field, key_field, value_field, values):
+        """Make the lines of a one2many match the data fetched from Github,
+        creating, updating and deleting only the lines that changed.
+
+        :param line_field: name of the one2many field
+        :param key_field: name of the many2one field identifying a line
+        :param value_field: name of the field holding the value of a line
+        :param values: dict {id of the key record: value}
+        """
+        self.ensure_one()
+        lines = self[line_field]
+        to_unlink = lines.browse()
+        to_update = defaultdict(lines.browse)
+        existing_keys = set()
+        for line in lines:
+            key = line[key_field].id
+            if key not in values or key in existing_keys:
+                to_unlink |= line
+                continue
+            existing_keys.add(key)
+            if line[value_field] != values[key]:
+                to_update[values[key]] |= line
+        # One write by value, one unlink and one create for all the lines
+        for value, value_lines in to_update.items():
+            value_lines.write({value_field: value})
+        to_unlink.unlink()
+        lines.create(
+            [
+                {
+                    self._fields[line_field].inverse_name: self.id,
+                    key_field: key,
+                    value_field: value,
+                }
+                for key, value in values.items()
+                if key not in existing_keys
+            ]
+        )
 
     def action_github_team_partner_from_team(self):
         self.ensure_one()
@@ -0,0 +1,204 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import hashlib
+import hmac
+import logging
+import re
+from datetime import datetime
+
+from github.NamedUser import NamedUser
+from github.Repository import Repository
+from github.Team import Team
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+_EVENT_NAME = re.compile(r"^[a-z_]+$")
+
+
+class GithubWebhook(models.AbstractModel):
+    """Apply the events sent by Github webhooks (see controllers/main.py).
+
+    The supported events are 'repository', 'organization' (members),
+    'team', 'membership' (team members) and 'push'. The events about
+    organizations unknown in Odoo are ignored.
+    """
+
+    _name = "github.webhook"
+    _description = "Github Webhook"
+
+    @api.model
+    def _verify_signature(self, body, signature):
+        """Check the X-Hub-Signature-256 header of a delivery against the
+        secret of the webhook ('github.webhook_secret')"""
+        secret = (
+            self.env["ir.config_parameter"].sudo().get_param("github.webhook_secret")
+        )
+        if not secret or not signature:
+            return False
+        expected = "sha256=%s" % (
+            hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        )
+        return hmac.compare_digest(expected, signature)
+
+    @api.model
+    def _process_event(self, event, payload):
+        """Apply a Github event.
+
+        :param event: the event name (X-GitHub-Event header)
+        :param payload: the decoded payload of the event
+        :return: True if the event was handled
+        """
+        method = _EVENT_NAME.match(event or "") and getattr(
+            self, "_process_%s_event" % event, None
+        )
+        if not method:
+            _logger.debug("Github event '%s' ignored.", event)
+            return False
+        _logger.info(
+            "Github event '%s' (%s) received.", event, payload.get("action", "")
+        )
+        return method(payload)
+
+    @api.model
+    def _get_event_organization(self, payload):
+        if not payload.get("organization"):
+            return self.env["github.organization"]
+        return self.env["github.organization"].search(
+            [("github_id_external", "=", str(payload["organization"]["id"]))]
+        )
+
+    @api.model
+    def _get_github_object(self, klass, raw_data):
+        gh_api = self.env["abstract.github.model"].get_github_connector()
+        return gh_api.create_from_raw_data(klass, raw_data)
+
+    @api.model
+    def _search_by_github_id(self, model, raw_data):
+        return (
+            self.env[model]
+            .with_context(active_test=False)
+            .search([("github_id_external", "=", str(raw_data["id"]))])
+        )
+
+    # Events Section
+    @api.model
+    def _process_ping_event(self, payload):
+        return True
+
+    @api.model
+    def _process_repository_event(self, payload):
+        organization = self._get_event_organization(payload)
+        if not organization:
+            return False
+        repository_obj = self.env["github.repository"].with_context(
+            github_organization_id=organization.id
+        )
+        repository = self._search_by_github_id(
+            "github.repository", payload["repository"]
+        )
+        if payload["action"] == "deleted":
+            repository.unlink()
+            return True
+        gh_repo = self._get_github_object(Repository, payload["repository"])
+        if repository:
+            repository._update_from_github_data(
+                repository_obj.get_odoo_data_from_github(gh_repo)
+            )
+        else:
+            repository = repository_obj.get_or_create_many([gh_repo])
+            organization.repository_ids = [(4, repository.id)]
+        return True
+
+    @api.model
+    def _process_organization_event(self, payload):
+        organization = self._get_event_organization(payload)
+        if not organization or "membership" not in payload:
+            return False
+        raw_user = payload["membership"]["user"]
+        if payload["action"] == "member_added":
+            partner = self.env["res.partner"].get_or_create_many(
+                [self._get_github_object(NamedUser, raw_user)]
+            )
+            organization.member_ids = [(4, partner.id)]
+        elif payload["action"] == "member_removed":
+            partner = self._search_by_github_id("res.partner", raw_user)
+            organization.member_ids = [(3, x.id) for x in partner]
+        else:
+            return False
+        return True
+
+    @api.model
+    def _process_team_event(self, payload):
+        organization = self._get_event_organization(payload)
+        if not organization:
+            return False
+        team = self._search_by_github_id("github.team", payload["team"])
+        if payload["action"] == "deleted":
+            team.unlink()
+            return True
+        team_obj = self.env["github.team"].with_context(
+            github_organization_id=organization.id
+        )
+        gh_team = self._get_github_object(Team, payload["team"])
+        if team:
+            team._update_from_github_data(team_obj.get_odoo_data_from_github(gh_team))
+        else:
+            team_obj.get_or_create_many([gh_team])
+        return True
+
+    @api.model
+    def _process_membership_event(self, payload):
+        if payload.get("scope") != "team" or not self._get_event_organization(payload):
+            return False
+        team = self._search_by_github_id("github.team", payload["team"])
+        if not team:
+            return False
+        if payload["action"] == "added":
+            partner = self.env["res.partner"].get_or_create_many(
+                [self._get_github_object(NamedUser, payload["member"])]
+            )
+            if partner not in team.partner_ids.mapped("partner_id"):
+                # The role is not given by the event
+                team.partner_ids = [
+                    (0, False, {"partner_id": partner.id, "role": "member"})
+                ]
+        elif payload["action"] == "removed":
+            partner = self._search_by_github_id("res.partner", payload["member"])
+            team.partner_ids.filtered(lambda x: x.partner_id in partner).unlink()
+        else:
+            return False
+        return True
+
+    @api.model
+    def _process_push_event(self, payload):
+        if not payload.get("ref", "").startswith("refs/heads/"):
+            return False
+        repository = self._search_by_github_id(
+            "github.repository", payload["repository"]
+        )
+        if not repository or repository.is_ignored:
+            return False
+        branch_name = payload["ref"][len("refs/heads/") :]
+        branch = repository.repository_branch_ids.filtered(
+            lambda x: x.name == branch_name
+        )
+        pushed_at = payload["repository"].get("pushed_at")
+        if isinstance(pushed_at, int):
+            # Timestamp in push events
+            repository.github_push_date = datetime.utcfromtimestamp(pushed_at)
+        if payload.get("deleted"):
+            branch.unlink()
+        elif branch:
+            branch.state = "to_download"
+        elif branch_name in repository.organization_id.organization_serie_ids.mapped(
+            "name"
+        ):
+            self.env["github.repository.branch"].create_or_update_from_name(
+                repository.id, branch_name
+            )
+        else:
+            return False
+        return True
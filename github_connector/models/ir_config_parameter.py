@@ -0,0 +1,29 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import api, models
+
+from ..lib.client import clear_clients
+
+
+class IrConfigParameter(models.Model):
+    _inherit = "ir.config_parameter"
+
+    @api.model
+    def _github_clear_clients(self, keys):
+        """Drop the shared Github clients if their settings changed"""
+        if any(key and key.startswith("github.") for key in keys):
+            clear_clients()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._github_clear_clients([vals.get("key") for vals in vals_list])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._github_clear_clients(self.mapped("key") + [vals.get("key")])
+        return super().write(vals)
+
+    def unlink(self):
+        self._github_clear_clients(self.mapped("key"))
+        return super().unlink()
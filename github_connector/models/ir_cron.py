@@ -0,0 +1,16 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields, models
+
+
+class IrCron(models.Model):
+    _inherit = "ir.cron"
+
+    github_request_budget = fields.Integer(
+        string="Github Requests Budget",
+        help="Maximum number of Github API requests this scheduled action can"
+        " consume in a rate limit window (one hour). Once reached, the action"
+        " is paused, and triggered again when the rate limit is reset."
+        " Set 0 for no limit.",
+    )
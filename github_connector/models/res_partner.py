@@ -11,10 +11,11 @@ from odoo.exceptions import UserError
 
 class ResPartner(models.Model):
     _name = "res.partner"
-    _inherit = ["res.partner", "abstract.github.model"]
+    _inherit = ["res.partner", "abstract.github.model", "github.avatar.mixin"]
 
     _github_login_field = "login"
     _need_individual_call = True
+    _github_must_have_fields = ["name"]
     _field_list_prevent_overwrite = ["name", "website", "email", "image_1920"]
 
     # Column Section
@@ -82,17 +83,16 @@ class ResPartner(models.Model):
     @api.model
     def get_conversion_dict(self):
         res = super().get_conversion_dict()
-        res.update({"website": "blog", "email": "email"})
+        res.update(
+            {"website": "blog", "email": "email", "github_avatar_url": "avatar_url"}
+        )
         return res
 
     @api.model
     def get_odoo_data_from_github(self, gh_data):
         res = super().get_odoo_data_from_github(gh_data)
-        res.update({"name": gh_data.name or "%s (Github)" % gh_data.login})
-        if hasattr(gh_data, "avatar_url"):
-            res.update(
-                {"image_1920": self.get_base64_image_from_github(gh_data.avatar_url)}
-            )
+        raw_data = self._get_github_raw_data(gh_data)
+        res.update({"name": raw_data.get("name") or "%s (Github)" % raw_data["login"]})
         return res
 
     def find_related_github_object(self, obj_id=None):
@@ -2,6 +2,13 @@
 # License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
 
 from . import test_branch
+from . import test_github_client
 from . import test_github_connector
 from . import test_github_analysis_rule
+from . import test_organization
 from . import test_repository
+from . import test_team
+from . import test_github_sync_run
+from . import test_github_sync_scheduler
+from . import test_github_webhook
+from . import test_benchmark
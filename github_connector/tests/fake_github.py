@@ -0,0 +1,574 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Local stand-in for the Github REST API, and git smart HTTP server.
+
+``FakeGithub`` synthesizes organizations with the given numbers of
+repositories, serie branches, teams and members, and serves them on a local
+port, with the pagination (Link headers), the conditional requests (ETag)
+and the rate limit headers of Github. The repositories are generated bare
+repositories, that can be cloned and pulled through ``git http-backend``.
+
+>>> with FakeGithub(tmp_dir, {"bench-org": {"repository_qty": 50}}) as server:
+...     ICP.set_param("github.base_url", server.base_url)
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+DEFAULT_ORGANIZATION = {
+    "repository_qty": 10,
+    "branch_names": ["13.0", "14.0"],
+    "team_qty": 2,
+    "member_qty": 20,
+    "team_member_qty": 5,
+    "team_repository_qty": 5,
+    "module_qty": 3,
+    "commit_qty": 1,
+}
+
+RATE_LIMIT = 5000
+RATE_LIMIT_RESET = 4102444800  # 2100-01-01
+DATE = "2023-03-01T10:00:00Z"
+
+# 1x1 transparent PNG
+AVATAR = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+_MODULE_FILES = {
+    "__init__.py": "from . import models\n",
+    "__manifest__.py": '{\n    "name": "%(name)s",\n    "version": "%(serie)s.1.0.0",\n'
+    '    "license": "AGPL-3",\n    "depends": ["base"],\n}\n',
+    "models/__init__.py": "from . import res_partner\n",
+    "models/res_partner.py": '"""Partner extension"""\n\nfrom odoo import fields, models\n\n\n'
+    'class ResPartner(models.Model):\n    _inherit = "res.partner"\n\n'
+    '    %(name)s_note = fields.Char(string="Note")\n',
+}
+
+
+class FakeGithub:
+    """Fake Github, serving the organizations described by ``organizations``:
+    {login: {"repository_qty": ..., "branch_names": [...], "team_qty": ...,
+    "member_qty": ..., "team_member_qty": ..., "team_repository_qty": ...,
+    "module_qty": ..., "commit_qty": ...}} (see ``DEFAULT_ORGANIZATION``).
+
+    :ivar calls: Counter of the API calls, by route
+    """
+
+    def __init__(self, root_dir, organizations=None, git=True):
+        self.root_dir = root_dir
+        self.git = git
+        self.calls = Counter()
+        self.rate_limit_remaining = RATE_LIMIT
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = None
+        self._next_id = 1000
+        self.organizations = {}
+        self.users = {}
+        self.repositories = {}
+        self.teams = {}
+        for login, values in (organizations or {"bench-org": {}}).items():
+            self._add_organization(login, dict(DEFAULT_ORGANIZATION, **values))
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake_github", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    # Data Section
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def _add_organization(self, login, values):
+        organization = {
+            "login": login,
+            "id": self._new_id(),
+            "name": login.title(),
+            "description": "Fake organization",
+            "email": "%s@example.com" % login,
+            "blog": "https://example.com",
+            "location": "Internet",
+            "type": "Organization",
+            "created_at": DATE,
+            "updated_at": DATE,
+        }
+        self.organizations[login] = {
+            "data": organization,
+            "values": values,
+            "members": [],
+            "repositories": [],
+            "teams": [],
+        }
+        members = [
+            self._add_user("%s-user-%d" % (login, i))
+            for i in range(values["member_qty"])
+        ]
+        repositories = [
+            self._add_repository(organization, "repository-%d" % i, values)
+            for i in range(values["repository_qty"])
+        ]
+        teams = [
+            self._add_team(
+                organization, "team-%d" % i, i, members, repositories, values
+            )
+            for i in range(values["team_qty"])
+        ]
+        self.organizations[login].update(
+            {"members": members, "repositories": repositories, "teams": teams}
+        )
+        if self.git and repositories:
+            self._generate_git_repositories(login, repositories, values)
+
+    def _add_user(self, login):
+        self.users[login] = {
+            "login": login,
+            "id": self._new_id(),
+            "type": "User",
+            "name": login.replace("-", " ").title(),
+            "email": "%s@example.com" % login,
+            "blog": "",
+            "location": "Internet",
+            "created_at": DATE,
+            "updated_at": DATE,
+        }
+        return login
+
+    def _add_repository(self, organization, name, values):
+        full_name = "%s/%s" % (organization["login"], name)
+        self.repositories[full_name] = {
+            "data": {
+                "id": self._new_id(),
+                "name": name,
+                "full_name": full_name,
+                "owner": {
+                    "login": organization["login"],
+                    "id": organization["id"],
+                    "type": "Organization",
+                },
+                "private": False,
+                "description": "Fake repository %s" % name,
+                "homepage": None,
+                "default_branch": values["branch_names"][-1]
+                if values["branch_names"]
+                else "main",
+                "created_at": DATE,
+                "updated_at": DATE,
+                "pushed_at": DATE,
+            },
+            "branches": list(values["branch_names"]),
+        }
+        return full_name
+
+    def _add_team(self, organization, name, index, members, repositories, values):
+        team_id = self._new_id()
+        self.teams[team_id] = {
+            "data": {
+                "id": team_id,
+                "name": name.title(),
+                "slug": name,
+                "description": "Fake team %s" % name,
+                "privacy": "closed",
+                "permission": "pull",
+                "organization": {
+                    "login": organization["login"],
+                    "id": organization["id"],
+                    "type": "Organization",
+                },
+            },
+            "members": [
+                (
+                    members[(index + i) % len(members)],
+                    "maintainer" if not i else "member",
+                )
+                for i in range(min(values["team_member_qty"], len(members)))
+            ],
+            "repositories": [
+                repositories[(index + i) % len(repositories)]
+                for i in range(min(values["team_repository_qty"], len(repositories)))
+            ],
+        }
+        return team_id
+
+    def _generate_git_repositories(self, login, repositories, values):
+        """Generate a template repository with a branch by serie, copied
+        for all the repositories of the organization. Each serie branch is
+        made of ``commit_qty`` commits rewriting a data file, on top of the
+        previous serie."""
+        work_dir = os.path.join(self.root_dir, "work", login)
+        template = os.path.join(self.root_dir, "work", login + ".git")
+        os.makedirs(work_dir)
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME="Fake Github",
+            GIT_AUTHOR_EMAIL="fake@example.com",
+            GIT_COMMITTER_NAME="Fake Github",
+            GIT_COMMITTER_EMAIL="fake@example.com",
+        )
+
+        def git(*args):
+            subprocess.run(
+                ("git",) + args,
+                cwd=work_dir,
+                env=env,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+
+        git("init", "-q")
+        git("commit", "-q", "--allow-empty", "-m", "Initial commit")
+        for serie in values["branch_names"]:
+            git("checkout", "-q", "-B", serie)
+            for i in range(values["module_qty"]):
+                name = "module_%d" % i
+                for path, content in _MODULE_FILES.items():
+                    path = os.path.join(work_dir, name, path)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "w") as module_file:
+                        module_file.write(content % {"name": name, "serie": serie})
+            for commit in range(values["commit_qty"]):
+                path = os.path.join(work_dir, "data", "history.txt")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as data_file:
+                    data_file.writelines(
+                        hashlib.sha256(
+                            ("%s %d %d" % (serie, commit, i)).encode()
+                        ).hexdigest()
+                        + "\n"
+                        for i in range(200)
+                    )
+                git("add", "-A")
+                git("commit", "-q", "-m", "Commit %d of %s" % (commit, serie))
+        git("clone", "-q", "--bare", work_dir, template)
+        # Allow partial clones
+        git("-C", template, "config", "uploadpack.allowFilter", "true")
+        for full_name in repositories:
+            shutil.copytree(template, self._git_path(full_name))
+
+    def _git_path(self, full_name):
+        return os.path.join(self.root_dir, "git", full_name + ".git")
+
+    # JSON Section
+    def _api_url(self, path):
+        return self.base_url + path
+
+    def _user_json(self, login, complete=False):
+        user = self.users[login]
+        res = {
+            "login": login,
+            "id": user["id"],
+            "type": user["type"],
+            "url": self._api_url("/users/%s" % login),
+            "html_url": "https://github.com/%s" % login,
+            "avatar_url": self._api_url("/avatars/%s?v=4" % login),
+        }
+        if complete:
+            res.update(user)
+        return res
+
+    def _organization_json(self, login):
+        return dict(
+            self.organizations[login]["data"],
+            url=self._api_url("/orgs/%s" % login),
+            html_url="https://github.com/%s" % login,
+            avatar_url=self._api_url("/avatars/%s?v=4" % login),
+        )
+
+    def _repository_json(self, full_name, permissions=None):
+        res = dict(
+            self.repositories[full_name]["data"],
+            url=self._api_url("/repos/%s" % full_name),
+            html_url="https://github.com/%s" % full_name,
+            clone_url=self._api_url("/git/%s.git" % full_name),
+        )
+        if permissions:
+            res["permissions"] = permissions
+        return res
+
+    def _team_json(self, team_id):
+        url = self._api_url("/teams/%d" % team_id)
+        return dict(
+            self.teams[team_id]["data"],
+            url=url,
+            html_url="https://github.com/orgs/teams/%d" % team_id,
+            members_url=url + "/members{/member}",
+            repositories_url=url + "/repos",
+        )
+
+    def _branch_json(self, full_name, name):
+        sha = hashlib.sha1(("%s:%s" % (full_name, name)).encode()).hexdigest()
+        return {
+            "name": name,
+            "commit": {
+                "sha": sha,
+                "url": self._api_url("/repos/%s/commits/%s" % (full_name, sha)),
+            },
+            "protected": False,
+        }
+
+    # Routes Section
+    def _route(self, path, query):
+        """Return (route name, status, JSON payload) for a GET API call"""
+        for name, pattern in _ROUTES:
+            match = pattern.match(path)
+            if match:
+                try:
+                    return (
+                        name,
+                        200,
+                        getattr(self, "_get_" + name)(query, *match.groups()),
+                    )
+                except KeyError:
+                    return (name, 404, {"message": "Not Found"})
+        return ("unknown", 404, {"message": "Not Found"})
+
+    def _get_rate_limit(self, query):
+        core = {
+            "limit": RATE_LIMIT,
+            "remaining": self.rate_limit_remaining,
+            "reset": RATE_LIMIT_RESET,
+            "used": RATE_LIMIT - self.rate_limit_remaining,
+        }
+        return {"resources": {"core": core}, "rate": core}
+
+    def _get_organization(self, query, login):
+        return self._organization_json(login)
+
+    def _get_organization_members(self, query, login):
+        return [self._user_json(x) for x in self.organizations[login]["members"]]
+
+    def _get_organization_repositories(self, query, login):
+        return [
+            self._repository_json(x) for x in self.organizations[login]["repositories"]
+        ]
+
+    def _get_organization_teams(self, query, login):
+        return [self._team_json(x) for x in self.organizations[login]["teams"]]
+
+    def _get_user(self, query, login):
+        return self._user_json(login, complete=True)
+
+    def _get_user_by_id(self, query, user_id):
+        for login, user in self.users.items():
+            if user["id"] == int(user_id):
+                return self._user_json(login, complete=True)
+        raise KeyError(user_id)
+
+    def _get_repository(self, query, full_name):
+        return self._repository_json(full_name)
+
+    def _get_branches(self, query, full_name):
+        return [
+            self._branch_json(full_name, x)
+            for x in self.repositories[full_name]["branches"]
+        ]
+
+    def _get_branch(self, query, full_name, name):
+        name = unquote(name)
+        if name not in self.repositories[full_name]["branches"]:
+            raise KeyError(name)
+        return self._branch_json(full_name, name)
+
+    def _get_team(self, query, team_id):
+        return self._team_json(int(team_id))
+
+    def _get_team_members(self, query, team_id):
+        role = query.get("role", ["all"])[0]
+        return [
+            self._user_json(login)
+            for login, member_role in self.teams[int(team_id)]["members"]
+            if role in ("all", member_role)
+        ]
+
+    def _get_team_repositories(self, query, team_id):
+        return [
+            self._repository_json(x, permissions={"admin": False, "push": True})
+            for x in self.teams[int(team_id)]["repositories"]
+        ]
+
+    def _paginate(self, path, query, payload):
+        """Return the requested page of a list, and its Link header"""
+        per_page = min(int(query.get("per_page", ["30"])[0]), 100)
+        page = int(query.get("page", ["1"])[0])
+        last_page = max(1, -(-len(payload) // per_page))
+        links = []
+        for rel, number in (("next", page + 1), ("last", last_page)):
+            if page < last_page:
+                params = {k: v[0] for k, v in query.items()}
+                params.update({"per_page": per_page, "page": number})
+                links.append(
+                    '<%s?%s>; rel="%s"' % (self._api_url(path), urlencode(params), rel)
+                )
+        return payload[(page - 1) * per_page : page * per_page], ", ".join(links)
+
+    def _use_rate_limit(self):
+        with self._lock:
+            self.rate_limit_remaining = max(0, self.rate_limit_remaining - 1)
+            return self.rate_limit_remaining
+
+
+_ROUTES = [
+    (name, re.compile(pattern + r"\Z"))
+    for name, pattern in [
+        ("rate_limit", r"/rate_limit"),
+        ("organization_members", r"/orgs/([^/]+)/members"),
+        ("organization_repositories", r"/orgs/([^/]+)/repos"),
+        ("organization_teams", r"/orgs/([^/]+)/teams"),
+        ("organization", r"/orgs/([^/]+)"),
+        ("user_by_id", r"/user/(\d+)"),
+        ("user", r"/users/([^/]+)"),
+        ("branches", r"/repos/([^/]+/[^/]+)/branches"),
+        ("branch", r"/repos/([^/]+/[^/]+)/branches/(.+)"),
+        ("repository", r"/repos/([^/]+/[^/]+)"),
+        ("team_members", r"/teams/(\d+)/members"),
+        ("team_repositories", r"/teams/(\d+)/repos"),
+        ("team", r"/teams/(\d+)"),
+    ]
+]
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        return
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/git/"):
+            return self._git(url)
+        if url.path.startswith("/avatars/"):
+            with self.fake._lock:
+                self.fake.calls["avatar"] += 1
+            return self._send(200, AVATAR, {"Content-Type": "image/png"})
+        query = parse_qs(url.query)
+        route, status, payload = self.fake._route(url.path, query)
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if status == 200 and isinstance(payload, list):
+            payload, headers["Link"] = self.fake._paginate(url.path, query, payload)
+        body = json.dumps(payload).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        headers["ETag"] = etag
+        with self.fake._lock:
+            self.fake.calls[route] += 1
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            # Not counted in the rate limit, as on Github
+            status, body = 304, b""
+            remaining = self.fake.rate_limit_remaining
+        else:
+            remaining = self.fake._use_rate_limit()
+        headers.update(
+            {
+                "X-RateLimit-Limit": str(RATE_LIMIT),
+                "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset": str(RATE_LIMIT_RESET),
+                "X-RateLimit-Used": str(RATE_LIMIT - remaining),
+                "X-RateLimit-Resource": "core",
+            }
+        )
+        self._send(status, body, headers)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/git/"):
+            return self._git(url)
+        self._send(404, b'{"message": "Not Found"}', {})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for key, value in headers.items():
+            if value:
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if not size:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _git(self, url):
+        """Serve the generated repositories with ``git http-backend``"""
+        with self.fake._lock:
+            self.fake.calls["git"] += 1
+        env = dict(
+            os.environ,
+            GIT_PROJECT_ROOT=os.path.join(self.fake.root_dir, "git"),
+            GIT_HTTP_EXPORT_ALL="1",
+            REQUEST_METHOD=self.command,
+            PATH_INFO=quote(url.path[len("/git") :]),
+            QUERY_STRING=url.query,
+            CONTENT_TYPE=self.headers.get("Content-Type", ""),
+            HTTP_CONTENT_ENCODING=self.headers.get("Content-Encoding", ""),
+            HTTP_GIT_PROTOCOL=self.headers.get("Git-Protocol", ""),
+            REMOTE_ADDR=self.client_address[0],
+        )
+        body = self._read_body() if self.command == "POST" else b""
+        output = subprocess.run(
+            ["git", "http-backend"],
+            input=body,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ).stdout
+        raw_headers, _sep, body = output.partition(b"\r\n\r\n")
+        if not _sep:
+            raw_headers, _sep, body = output.partition(b"\n\n")
+        status = 200
+        headers = {}
+        for line in raw_headers.decode().splitlines():
+            key, _sep, value = line.partition(":")
+            if key.lower() == "status":
+                status = int(value.split()[0])
+            elif key:
+                headers[key] = value.strip()
+        self._send(status, body, headers)
@@ -0,0 +1,203 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+"""Synchronization throughput benchmark, against a local fake Github.
+
+Not run by default. Run it with ``--test-tags github_benchmark``; the size
+of the organization is set by the GITHUB_BENCHMARK_REPOSITORIES,
+GITHUB_BENCHMARK_BRANCHES, GITHUB_BENCHMARK_TEAMS and
+GITHUB_BENCHMARK_MEMBERS environment variables. The source code layouts and
+the clone strategies are compared on a repository of
+GITHUB_BENCHMARK_COMMITS commits by branch.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from odoo.tests.common import tagged
+
+from ..lib.git_download import CLONE_STRATEGIES
+from .common import TestGithubConnectorCommon
+from .fake_github import FakeGithub
+
+_logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name) or default)
+
+
+def _get_disk_usage(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _dirs, files in os.walk(path)
+        for name in files
+    )
+
+
+@tagged("-standard", "github_benchmark")
+class TestGithubBenchmark(TestGithubConnectorCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.serie_names = [
+            "%d.0" % (14 + i) for i in range(_env_int("GITHUB_BENCHMARK_BRANCHES", 2))
+        ]
+        cls.root_dir = tempfile.mkdtemp(prefix="github_benchmark_")
+        cls.server = FakeGithub(
+            cls.root_dir,
+            {
+                "bench-org": {
+                    "repository_qty": _env_int("GITHUB_BENCHMARK_REPOSITORIES", 20),
+                    "branch_names": cls.serie_names,
+                    "team_qty": _env_int("GITHUB_BENCHMARK_TEAMS", 3),
+                    "member_qty": _env_int("GITHUB_BENCHMARK_MEMBERS", 30),
+                },
+                "clone-org": {
+                    "repository_qty": 1,
+                    "branch_names": cls.serie_names,
+                    "team_qty": 0,
+                    "member_qty": 1,
+                    "commit_qty": _env_int("GITHUB_BENCHMARK_COMMITS", 200),
+                },
+            },
+        ).start()
+        ICP = cls.env["ir.config_parameter"]
+        ICP.set_param("github.base_url", cls.server.base_url)
+        ICP.set_param("git.partial_commit_during_analysis", "False")
+        cls.organization = cls.env["github.organization"].create_from_name("bench-org")
+        cls.organization.organization_serie_ids = [
+            (0, 0, {"name": name, "sequence": i})
+            for i, name in enumerate(cls.serie_names)
+        ]
+        cls.source_patch = mock.patch.object(
+            type(cls.env["github.repository.branch"]),
+            "_get_source_path",
+            return_value=os.path.join(cls.root_dir, "source"),
+        )
+        cls.source_patch.start()
+        cls.report = []
+        cls.clone_report = []
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.source_patch.stop()
+        cls.server.stop()
+        shutil.rmtree(cls.root_dir, ignore_errors=True)
+        _logger.info(
+            "Github synchronization benchmark:\n%s",
+            "\n".join(
+                "%-30s %6d entities %8.2fs %8.1f entities/s %6.2f calls/entity"
+                " %8.1f queries/entity" % line
+                for line in cls.report
+            ),
+        )
+        if cls.clone_report:
+            _logger.info(
+                "Clone strategies benchmark:\n%s",
+                "\n".join(
+                    "%-50s clone %8.2fs update %8.2fs %10.1f KB" % line
+                    for line in cls.clone_report
+                ),
+            )
+        super().tearDownClass()
+
+    def _benchmark(self, label, func, entity_qty):
+        """Run func, and add its throughput and costs to the report"""
+        self.server.reset_calls()
+        with self.env["abstract.github.model"]._record_github_sync(label) as recorder:
+            func()
+        entity_qty = entity_qty() if callable(entity_qty) else entity_qty
+        self.report.append(
+            (
+                label,
+                entity_qty,
+                recorder.duration,
+                entity_qty / (recorder.duration or 1),
+                sum(self.server.calls.values()) / (entity_qty or 1),
+                recorder.query_qty / (entity_qty or 1),
+            )
+        )
+        return recorder
+
+    def _get_entity_qty(self):
+        organization = self.organization
+        return (
+            organization.member_qty
+            + organization.repository_qty
+            + len(organization.team_ids)
+        )
+
+    def _get_branches(self):
+        return self.organization.repository_ids.mapped("repository_branch_ids")
+
+    def test_benchmark(self):
+        organization = self.organization
+        repository_qty = len(self.server.organizations["bench-org"]["repositories"])
+        self._benchmark(
+            "full_update (sequential)", organization.full_update, self._get_entity_qty
+        )
+        self.assertEqual(organization.repository_qty, repository_qty)
+        organization.sync_engine = "crawler"
+        self._benchmark(
+            "full_update (crawler, again)",
+            organization.full_update,
+            self._get_entity_qty,
+        )
+        self.assertEqual(organization.repository_qty, repository_qty)
+        repository_obj = self.env["github.repository"]
+        self._benchmark(
+            "cron_update_branch_list",
+            repository_obj.cron_update_branch_list,
+            lambda: len(self._get_branches()),
+        )
+        branches = self._get_branches()
+        self.assertEqual(len(branches), repository_qty * len(self.serie_names))
+        branch_obj = self.env["github.repository.branch"]
+        self._benchmark(
+            "cron_download_all", branch_obj.cron_download_all, len(branches)
+        )
+        self.assertEqual(set(branches.mapped("state")), {"to_analyze"})
+        self._benchmark("cron_analyze_all", branch_obj.cron_analyze_all, len(branches))
+        self.assertEqual(set(branches.mapped("state")), {"analyzed"})
+
+    def test_benchmark_clone_strategies(self):
+        organization = self.env["github.organization"].create_from_name("clone-org")
+        organization.organization_serie_ids = [
+            (0, 0, {"name": name, "sequence": i})
+            for i, name in enumerate(self.serie_names)
+        ]
+        organization.full_update()
+        repository = organization.repository_ids
+        repository.button_sync_branch()
+        branches = repository.repository_branch_ids
+        self.assertEqual(len(branches), len(self.serie_names))
+        repository_path = os.path.dirname(branches[0].local_path)
+        for layout, layout_label in organization._fields["source_layout"].selection:
+            organization.source_layout = layout
+            for strategy, label in CLONE_STRATEGIES:
+                repository.clone_strategy = strategy
+                shutil.rmtree(repository_path, ignore_errors=True)
+                shutil.rmtree(repository_path + ".git", ignore_errors=True)
+                start = time.perf_counter()
+                branches._download_code()
+                clone_duration = time.perf_counter() - start
+                self.assertEqual(set(branches.mapped("state")), {"to_analyze"})
+                self.assertFalse(any(branches.mapped("last_download_error")))
+                start = time.perf_counter()
+                branches._download_code()
+                self.clone_report.append(
+                    (
+                        "%s, %s" % (layout_label, label),
+                        clone_duration,
+                        time.perf_counter() - start,
+                        (
+                            _get_disk_usage(repository_path)
+                            + _get_disk_usage(repository_path + ".git")
+                        )
+                        / 1024,
+                    )
+                )
@@ -1,6 +1,9 @@
 #  Copyright 2023 Simone Rubino - Aion Tech
 #  License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
+from unittest import mock
+
+from ..lib.git_download import DownloadResult
 from .common import TestGithubConnectorCommon
 
 
@@ -19,3 +22,59 @@ class TestBranch(TestGithubConnectorCommon):
         self.assertIn(branch.name, display_name)
         self.assertIn(repository.name, display_name)
         self.assertIn(organization.github_name, display_name)
+
+    def test_update_branches_from_names(self):
+        """The existing branches are kept, the missing ones created,
+        and the ones no more on Github deleted."""
+        repositories = self.repository_ocb | self.repository_interface_github
+        repositories._update_branches_from_names(
+            {
+                self.repository_ocb.id: ["13.0", "14.0"],
+                self.repository_interface_github.id: [],
+            }
+        )
+        self.assertIn(self.repository_ocb_13, self.repository_ocb.repository_branch_ids)
+        self.assertEqual(
+            self.repository_ocb.repository_branch_ids.mapped("name"), ["13.0", "14.0"]
+        )
+        self.assertFalse(self.repository_interface_github.repository_branch_ids)
+        self.assertFalse(self.repository_interface_github_13.exists())
+        self.assertTrue(self.repository_ocb.branch_sync_date)
+        self.assertEqual(
+            self.model_grb.create_or_update_from_name(self.repository_ocb.id, "13.0"),
+            self.repository_ocb_13,
+        )
+
+    def test_download_code(self):
+        """The results of the concurrent downloads are written back to the
+        branches."""
+        branches = self.repository_ocb_13 | self.repository_interface_github_13
+        branches.write({"state": "analyzed"})
+        model_path = "odoo.addons.github_connector.models"
+
+        def download_all(jobs, concurrency, timeout):
+            self.assertEqual(len(jobs), 2)
+            # A mirror by repository
+            self.assertTrue(jobs[0].mirror.endswith("OCA/OCB.git"))
+            self.assertNotEqual(jobs[0].mirror, jobs[1].mirror)
+            return [
+                DownloadResult(jobs[0], changed=True),
+                DownloadResult(jobs[1], error="Timeout after 600 seconds"),
+            ]
+
+        with mock.patch.object(
+            type(self.model_gr),
+            "find_related_github_object",
+            return_value=mock.Mock(clone_url="https://github.com/OCA/OCB.git"),
+        ), mock.patch(
+            model_path + ".github_repository_branch.download_all",
+            side_effect=download_all,
+        ):
+            branches._download_code()
+        self.assertEqual(self.repository_ocb_13.state, "to_analyze")
+        self.assertTrue(self.repository_ocb_13.last_download_date)
+        self.assertEqual(self.repository_interface_github_13.state, "analyzed")
+        self.assertEqual(
+            self.repository_interface_github_13.last_download_error,
+            "Timeout after 600 seconds",
+        )
@@ -0,0 +1,94 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from unittest import mock
+
+import responses
+
+from ..lib.client import RequestRecorder
+from ..lib.retry import CircuitBreaker, CircuitOpenError, circuit_breaker
+from .common import TestGithubConnectorCommon
+
+
+class TestGithubClient(TestGithubConnectorCommon):
+    def test_client_shared(self):
+        partner_model = self.env["res.partner"]
+        gh_api = partner_model.get_github_connector()
+        self.assertIs(gh_api, self.oca.get_github_connector())
+        self.assertIs(gh_api, self.repository_ocb.get_github_connector())
+
+    def test_client_invalidation(self):
+        ICP = self.env["ir.config_parameter"]
+        gh_api = self.oca.get_github_connector()
+        ICP.set_param("github.pool_size", 4)
+        gh_api_pool = self.oca.get_github_connector()
+        self.assertIsNot(gh_api, gh_api_pool)
+        ICP.set_param("github.access_token", "other_token")
+        self.assertIsNot(gh_api_pool, self.oca.get_github_connector())
+
+    def test_client_api_cache(self):
+        ICP = self.env["ir.config_parameter"]
+        cache_store = self.env["github.api.cache"]._get_cache_store()
+        self.assertEqual(cache_store.dbname, self.env.cr.dbname)
+        ICP.set_param("github.api_cache", "False")
+        self.assertIsNone(self.env["github.api.cache"]._get_cache_store())
+
+    def test_client_api_cache_batch(self):
+        cache_model = self.env["github.api.cache"]
+        cache_store = cache_model._get_cache_store()
+        self.assertIs(cache_store, cache_model._get_cache_store())
+        url = "https://api.github.com/orgs/OCA"
+        values = {
+            "etag": '"abc"',
+            "last_modified": None,
+            "headers": "{}",
+            "payload": "{}",
+        }
+        with self.oca._record_github_sync("Test"):
+            cache_store.set(url, values)
+            # Buffered until the end of the synchronization
+            self.assertEqual(cache_store.get(url), values)
+            self.assertEqual(cache_store._pending, {url: values})
+        self.assertFalse(cache_store._pending)
+        self.assertIsNone(cache_store._cr)
+        # Not committed during the tests
+        self.assertFalse(cache_model.search([("url", "=", url)]))
+
+    def test_record_github_sync(self):
+        repositories = self.repository_ocb | self.repository_interface_github
+        with self.oca._record_github_sync("Test") as recorder:
+            repositories._update_many_from_github_data(
+                [{"description": "Odoo"}, {"description": False}]
+            )
+        self.assertEqual(recorder.get_record_qties(), {"github.repository": (0, 1, 1)})
+        self.assertTrue(recorder.query_qty)
+
+    @responses.activate
+    def test_retry(self):
+        url = "https://api.github.com:443/rate_limit"
+        responses.add(responses.GET, url, status=503)
+        responses.add(responses.GET, url, status=403, headers={"Retry-After": "2"})
+        responses.add(responses.GET, url, json={})
+        client = self.oca._get_github_client()
+        with RequestRecorder() as recorder, mock.patch(
+            "odoo.addons.github_connector.lib.retry.time.sleep"
+        ) as sleep:
+            response = client.request("GET", url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(recorder.request_qty, 3)
+        self.assertEqual(recorder.retry_qty, 2)
+        self.assertLessEqual(sleep.call_args_list[0][0][0], 0.5)
+        sleep.assert_called_with(2.0)
+        circuit_breaker.reset()
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(threshold=0.5, min_calls=4, cooldown=60)
+        self.assertFalse(breaker.record(True))
+        self.assertFalse(breaker.record(False))
+        self.assertFalse(breaker.record(True))
+        self.assertTrue(breaker.record(False))
+        self.assertEqual(breaker.trip_qty, 1)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+        breaker.reset()
+        breaker.check()
@@ -2,14 +2,28 @@
 # Copyright 2021 Tecnativa - João Marques
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+import base64
 import json
 
 import responses
+from github.NamedUser import NamedUser
 
+from odoo import fields
 from odoo.modules.module import get_resource_path
+from odoo.tests.common import new_test_user
 
+from ..lib import avatar
+from ..lib.client import RequestRecorder
 from .common import TestGithubConnectorCommon
 
+# 1x1 PNG images
+RED_IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC"
+)
+BLUE_IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGNgYPgPAAEDAQAIicLsAAAAAElFTkSuQmCC"
+)
+
 
 class TestGithubConnector(TestGithubConnectorCommon):
     @classmethod
@@ -58,3 +72,106 @@ class TestGithubConnector(TestGithubConnectorCommon):
         partner.active = False
         res = partner_model.get_from_id_or_create(data={"login": "OCA-git-bot"})
         self.assertEqual(partner.id, res.id)
+
+    @responses.activate
+    def test_partner_get_or_create_many_from_list(self):
+        partner_model = self.env["res.partner"]
+        partner = partner_model.create(
+            {"name": "OCA Bot", "github_name": "OCA-git-bot"}
+        )
+        # Users returned in a list of members don't have a name
+        gh_user = partner_model.get_github_connector().create_from_raw_data(
+            NamedUser,
+            {
+                "login": "OCA-git-bot",
+                "id": 8723280,
+                "url": "https://api.github.com/users/OCA-git-bot",
+            },
+        )
+        with RequestRecorder() as recorder:
+            partners = partner_model.get_or_create_many([gh_user])
+        self.assertEqual(partners, partner)
+        self.assertEqual(partner.github_id_external, "8723280")
+        # Existing partners are found without completing the user
+        self.assertEqual(recorder.request_qty, 0)
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/users/OCA-git-bot",
+            json=self.user_data,
+            status=200,
+        )
+        raw_data = partner_model._get_github_raw_data(gh_user)
+        self.assertEqual(raw_data["name"], self.user_data["name"])
+
+    @responses.activate
+    def test_partner_avatar(self):
+        avatar.clear_cache()
+        avatar_url = "https://avatars.githubusercontent.com/u/8723280?v=%d"
+        for version, content in [(1, RED_IMAGE), (2, RED_IMAGE), (3, BLUE_IMAGE)]:
+            responses.add(responses.GET, avatar_url % version, body=content)
+        partner = self.env["res.partner"].create(
+            {"name": "OCA Bot", "github_avatar_url": avatar_url % 1}
+        )
+        image = partner.image_1920
+        self.assertTrue(image)
+        self.assertEqual(partner.github_avatar_checksum, avatar.checksum(RED_IMAGE))
+        # Same URL: served by the cache
+        self.env["res.partner"].create(
+            {"name": "OCA Bot 2", "github_avatar_url": avatar_url % 1}
+        )
+        self.assertEqual(len(responses.calls), 1)
+        # New version with the same content
+        partner.write({"github_avatar_url": avatar_url % 2})
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(partner.github_avatar_url, avatar_url % 2)
+        self.assertEqual(partner.image_1920, image)
+        # New content: images of partners are not overwritten
+        partner.write({"github_avatar_url": avatar_url % 3})
+        self.assertEqual(partner.github_avatar_checksum, avatar.checksum(BLUE_IMAGE))
+        self.assertEqual(partner.image_1920, image)
+
+    @responses.activate
+    def test_partner_avatar_deferred(self):
+        avatar.clear_cache()
+        self.env["ir.config_parameter"].set_param("github.avatar_deferred", "True")
+        queue_model = self.env["github.avatar.queue"]
+        avatar_url = "https://avatars.githubusercontent.com/u/8723280?v=1"
+        partner = self.env["res.partner"].create(
+            {"name": "OCA Bot", "github_avatar_url": avatar_url}
+        )
+        self.assertFalse(partner.image_1920)
+        self.assertEqual(len(responses.calls), 0)
+        entry = queue_model.search([("res_model", "=", "res.partner")])
+        self.assertEqual((entry.res_id, entry.url), (partner.id, avatar_url))
+        # Failure: retried later
+        responses.add(responses.GET, avatar_url, status=500)
+        queue_model.cron_download_avatars()
+        self.assertEqual(entry.attempt_qty, 1)
+        self.assertGreater(entry.next_try_date, fields.Datetime.now())
+        responses.replace(responses.GET, avatar_url, body=RED_IMAGE)
+        entry.next_try_date = fields.Datetime.now()
+        queue_model.cron_download_avatars()
+        self.assertFalse(entry.exists())
+        self.assertEqual(partner.github_avatar_checksum, avatar.checksum(RED_IMAGE))
+        self.assertTrue(partner.image_1920)
+
+    def test_partner_avatar_deferred_manager(self):
+        """The managers, who can't write the queue, can queue the avatars"""
+        self.env["ir.config_parameter"].set_param("github.avatar_deferred", "True")
+        user = new_test_user(
+            self.env,
+            login="github_manager",
+            groups="base.group_partner_manager,"
+            "github_connector.group_github_connector_manager",
+        )
+        avatar_url = "https://avatars.githubusercontent.com/u/8723280?v=%d"
+        partner = (
+            self.env["res.partner"]
+            .with_user(user)
+            .create({"name": "OCA Bot", "github_avatar_url": avatar_url % 1})
+        )
+        partner.write({"github_avatar_url": avatar_url % 2})
+        entry = self.env["github.avatar.queue"].search(
+            [("res_model", "=", "res.partner"), ("res_id", "=", partner.id)]
+        )
+        self.assertEqual(entry.url, avatar_url % 2)
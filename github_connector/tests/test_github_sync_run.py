@@ -0,0 +1,140 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import json
+from datetime import timedelta
+from unittest import mock
+
+import responses
+from github.GithubException import GithubException
+
+from odoo import fields
+from odoo.modules.module import get_resource_path
+
+from .common import TestGithubConnectorCommon
+
+
+class TestGithubSyncRun(TestGithubConnectorCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.run_obj = cls.env["github.sync.run"]
+        cls.env["ir.config_parameter"].set_param("github.avatar_deferred", "True")
+
+    def test_get_runs_resume(self):
+        run = self.run_obj.create(
+            {"organization_id": self.oca.id, "state": "failed", "phase": "team"}
+        )
+        self.assertEqual(self.run_obj._get_runs(self.oca), run)
+        self.assertEqual(run.state, "running")
+        run.state = "done"
+        new_run = self.run_obj._get_runs(self.oca)
+        self.assertNotEqual(new_run, run)
+        self.assertEqual(new_run.phase, "member")
+
+    def test_get_runs_failed(self):
+        """A failed run only delays its organization, is retried with a
+        backoff, and abandoned after too many failures"""
+        other = self.env["github.organization"].create(
+            {"name": "Other", "github_name": "other"}
+        )
+        organizations = self.oca | other
+        run = self.run_obj.create(
+            {
+                "organization_id": self.oca.id,
+                "state": "failed",
+                "failure_qty": 2,
+                "date_checkpoint": fields.Datetime.now(),
+            }
+        )
+        # Retried 2 hours after the failure
+        runs = self.run_obj._get_runs(organizations)
+        self.assertEqual(runs.organization_id, other)
+        self.assertEqual(run.state, "failed")
+        runs.state = "done"
+        run.date_checkpoint = fields.Datetime.now() - timedelta(hours=3)
+        runs = self.run_obj._get_runs(organizations)
+        self.assertEqual(runs.organization_id, organizations)
+        self.assertIn(run, runs)
+        self.assertEqual(run.state, "running")
+        # Abandoned, a new run starts from scratch
+        run.write({"state": "failed", "failure_qty": 5})
+        runs = self.run_obj._get_runs(self.oca)
+        self.assertEqual(run.state, "abandoned")
+        self.assertNotIn(run, runs)
+        self.assertEqual(runs.phase, "member")
+
+    def test_run_step_failed(self):
+        """A failed step is rolled back, without losing the run"""
+        run = self.run_obj.create({"organization_id": self.oca.id})
+
+        def sync_member():
+            run.item_qty = 10
+            raise GithubException(403, {"message": "Forbidden"}, {})
+
+        with mock.patch.object(
+            type(self.run_obj), "_sync_member", side_effect=sync_member
+        ):
+            run._run_step()
+        self.assertTrue(run.exists())
+        self.assertEqual(run.state, "failed")
+        self.assertEqual(run.phase, "member")
+        self.assertEqual(run.item_qty, 0)
+        self.assertEqual(run.failure_qty, 1)
+        self.assertIn("Forbidden", run.error_message)
+        self.assertEqual(run.stat_ids.step_qty, 1)
+        self.assertGreater(run._get_retry_date(), fields.Datetime.now())
+
+    def test_run_step_last_phase(self):
+        run = self.run_obj.create(
+            {"organization_id": self.oca.id, "phase": "team_member"}
+        )
+        self.assertEqual(list(run._iter_steps()), [run])
+        run._run_step()
+        self.assertEqual(run.state, "done")
+        self.assertEqual(self.oca.github_last_sync_date, run.date_end)
+        self.assertFalse(list(run._iter_steps()))
+
+    @responses.activate
+    def test_run_step_member(self):
+        with open(
+            get_resource_path(
+                "github_connector",
+                "tests",
+                "res",
+                "github_user_OCA-git-bot_response.json",
+            )
+        ) as jsonfile:
+            user_data = json.loads(jsonfile.read())
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/orgs/OCA",
+            json={
+                "login": "OCA",
+                "id": 7600578,
+                "url": "https://api.github.com/orgs/OCA",
+            },
+        )
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/orgs/OCA/members",
+            json=[{"login": "OCA-git-bot", "id": 8723280}],
+        )
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/users/OCA-git-bot",
+            json=user_data,
+        )
+        run = self.run_obj.create({"organization_id": self.oca.id})
+        run._run_step()
+        self.assertEqual(run.phase, "repository")
+        self.assertEqual(run.page, 0)
+        self.assertEqual(run.item_qty, 1)
+        self.assertEqual(self.oca.member_ids.mapped("github_name"), ["OCA-git-bot"])
+        self.assertTrue(run.date_checkpoint)
+        stat = run.stat_ids
+        self.assertEqual(stat.phase, "member")
+        self.assertEqual(stat.res_model, "res.partner")
+        self.assertEqual(stat.created_qty, 1)
+        self.assertEqual(stat.request_qty, 3)
+        self.assertEqual(run.request_qty, 3)
@@ -0,0 +1,54 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from unittest import mock
+
+from .common import TestGithubConnectorCommon
+
+
+class TestGithubSyncScheduler(TestGithubConnectorCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.scheduler = cls.env["github.sync.scheduler"]
+        cls.repositories = cls.repository_ocb + cls.repository_interface_github
+        cls.cron = cls.env.ref("github_connector.cron_update_branch_list")
+
+    def _iter_budgeted(self, rate_limit):
+        with mock.patch.object(
+            type(self.scheduler), "_get_rate_limit", return_value=rate_limit
+        ):
+            return list(
+                self.scheduler._iter_budgeted(
+                    self.repositories, "github_connector.cron_update_branch_list"
+                )
+            )
+
+    def test_iter_budgeted(self):
+        self.assertEqual(len(self._iter_budgeted((4000, 5000, 0))), 2)
+        usage = self.env["github.api.usage"].search(
+            [("cron_id", "=", self.cron.id)], limit=1
+        )
+        self.assertEqual(usage.state, "done")
+        self.assertEqual(usage.rate_limit_remaining, 4000)
+
+    def test_iter_budgeted_rate_limit_exhausted(self):
+        self.assertFalse(self._iter_budgeted((10, 5000, 0)))
+        usage = self.env["github.api.usage"].search(
+            [("cron_id", "=", self.cron.id)], limit=1
+        )
+        self.assertEqual(usage.state, "paused")
+
+    def test_iter_budgeted_cron_budget(self):
+        self.env["github.api.usage"].create(
+            {
+                "cron_id": self.cron.id,
+                "state": "done",
+                "consumed_qty": 500,
+                "rate_limit_reset_date": "1970-01-01 00:00:00",
+            }
+        )
+        self.cron.github_request_budget = 1000
+        self.assertEqual(len(self._iter_budgeted((4000, 5000, 0))), 2)
+        self.cron.github_request_budget = 500
+        self.assertFalse(self._iter_budgeted((4000, 5000, 0)))
@@ -0,0 +1,114 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import hashlib
+import hmac
+import json
+
+import responses
+
+from odoo.modules.module import get_resource_path
+from odoo.tests.common import HttpCase, tagged
+
+from .common import TestGithubConnectorCommon
+
+
+def _read_payload(name):
+    with open(
+        get_resource_path("github_connector", "tests", "res", "webhook_%s.json" % name),
+        "rb",
+    ) as payload_file:
+        return payload_file.read()
+
+
+class TestGithubWebhook(TestGithubConnectorCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.webhook = cls.env["github.webhook"]
+        ICP = cls.env["ir.config_parameter"]
+        ICP.set_param("github.webhook_secret", "secret")
+        ICP.set_param("github.avatar_deferred", "True")
+        with open(
+            get_resource_path(
+                "github_connector",
+                "tests",
+                "res",
+                "github_user_OCA-git-bot_response.json",
+            )
+        ) as jsonfile:
+            cls.user_data = json.loads(jsonfile.read())
+
+    def _process(self, event, name):
+        return self.webhook._process_event(event, json.loads(_read_payload(name)))
+
+    def test_signature(self):
+        body = _read_payload("ping")
+        signature = "sha256=%s" % hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+        self.assertTrue(self.webhook._verify_signature(body, signature))
+        self.assertFalse(self.webhook._verify_signature(body + b" ", signature))
+        self.assertFalse(self.webhook._verify_signature(body, None))
+
+    def test_unknown_event(self):
+        self.assertFalse(self._process("fork", "ping"))
+        self.assertFalse(self._process("__init__", "ping"))
+
+    def test_push(self):
+        self.repository_interface_github_13.state = "analyzed"
+        self.assertTrue(self._process("push", "push"))
+        self.assertEqual(self.repository_interface_github_13.state, "to_download")
+        self.assertTrue(self.repository_interface_github.github_push_date)
+
+    def test_repository(self):
+        self.assertTrue(self._process("repository", "repository_created"))
+        repository = self.model_gr.search([("github_id_external", "=", "20558480")])
+        self.assertEqual(repository.name, "web")
+        self.assertIn(repository, self.oca.repository_ids)
+        self.assertTrue(self._process("repository", "repository_renamed"))
+        self.assertEqual(
+            self.repository_interface_github.name, "interface-github-renamed"
+        )
+        self.assertTrue(self._process("repository", "repository_deleted"))
+        self.assertFalse(self.repository_interface_github.exists())
+
+    @responses.activate
+    def test_members(self):
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/users/OCA-git-bot",
+            json=self.user_data,
+        )
+        self.assertTrue(self._process("organization", "organization_member_added"))
+        partner = self.env["res.partner"].search([("github_name", "=", "OCA-git-bot")])
+        self.assertEqual(partner.name, "OCA Bot")
+        self.assertIn(partner, self.oca.member_ids)
+        team = self.env["github.team"].create(
+            {
+                "name": "Board",
+                "organization_id": self.oca.id,
+                "github_id_external": 2000001,
+            }
+        )
+        self.assertTrue(self._process("membership", "membership_added"))
+        self.assertEqual(team.partner_ids.mapped("partner_id"), partner)
+        # Only one call to complete the user
+        self.assertEqual(len(responses.calls), 1)
+
+
+@tagged("post_install", "-at_install")
+class TestGithubWebhookController(HttpCase):
+    def test_webhook_signature(self):
+        self.env["ir.config_parameter"].set_param("github.webhook_secret", "secret")
+        body = _read_payload("ping")
+        headers = {"Content-Type": "application/json", "X-GitHub-Event": "ping"}
+        response = self.url_open(
+            "/github_connector/webhook", data=body, headers=headers
+        )
+        self.assertEqual(response.status_code, 403)
+        headers["X-Hub-Signature-256"] = (
+            "sha256=%s" % hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+        )
+        response = self.url_open(
+            "/github_connector/webhook", data=body, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,318 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from datetime import datetime
+from unittest import mock
+
+import responses
+from github.NamedUser import NamedUser
+from github.Repository import Repository
+from responses import matchers
+
+from ..lib.client import RequestRecorder
+from ..lib.crawler import CrawlResult, crawl_organization
+from .common import TestGithubConnectorCommon
+
+
+class TestOrganization(TestGithubConnectorCommon):
+    def _get_graphql_repository_node(self, branch_names):
+        serie_names = self.oca.organization_serie_ids.mapped("name")
+        node = {
+            "databaseId": 70173147,
+            "name": "interface-github",
+            "nameWithOwner": "OCA/interface-github",
+            "url": "https://github.com/OCA/interface-github",
+            "description": "Odoo modules to interface Github",
+            "homepageUrl": None,
+            "createdAt": "2016-10-06T16:24:59Z",
+            "updatedAt": "2023-03-01T10:00:00Z",
+            "pushedAt": "2023-03-01T10:00:00Z",
+            "owner": {"login": "OCA"},
+        }
+        for branch_name in branch_names:
+            node["b%d" % serie_names.index(branch_name)] = {"name": branch_name}
+        return node
+
+    def _add_graphql_organization_response(self, branch_names):
+        responses.add(
+            responses.POST,
+            "https://api.github.com/graphql",
+            json={
+                "data": {
+                    "organization": {
+                        "repositories": {
+                            "pageInfo": {"hasNextPage": False, "endCursor": None},
+                            "nodes": [self._get_graphql_repository_node(branch_names)],
+                        }
+                    }
+                }
+            },
+        )
+
+    @responses.activate
+    def test_sync_repository_graphql(self):
+        self.oca.sync_backend = "graphql"
+        self._add_graphql_organization_response(["13.0"])
+        self.oca.button_sync_repository()
+        self.assertEqual(self.oca.repository_ids, self.repository_interface_github)
+        self.assertEqual(
+            self.repository_interface_github.repository_branch_ids,
+            self.repository_interface_github_13,
+        )
+        self.assertTrue(self.repository_interface_github.branch_sync_date)
+
+    @responses.activate
+    def test_sync_repository_incremental(self):
+        self.oca.write({"sync_backend": "graphql", "sync_incremental": True})
+        self._add_graphql_organization_response(["13.0"])
+        self.oca.button_sync_repository()
+        repository = self.repository_interface_github
+        self.assertEqual(
+            self.oca.repository_sync_watermark, datetime(2023, 3, 1, 10, 0)
+        )
+        self.assertEqual(repository.github_push_date, datetime(2023, 3, 1, 10, 0))
+        self.assertEqual(repository.repository_branch_ids.mapped("name"), ["13.0"])
+        self.assertFalse(repository._is_pushed_since(repository.branch_sync_date))
+        # Not updated nor pushed since the last synchronization: skipped
+        responses.reset()
+        self._add_graphql_organization_response(["12.0", "13.0"])
+        self.oca.button_sync_repository()
+        self.assertEqual(repository.repository_branch_ids.mapped("name"), ["13.0"])
+        # Unless a full synchronization is asked
+        self.oca.with_context(github_full_sync=True).button_sync_repository()
+        self.assertEqual(
+            sorted(repository.repository_branch_ids.mapped("name")), ["12.0", "13.0"]
+        )
+
+    def test_sync_crawler(self):
+        self.oca.sync_engine = "crawler"
+        result = CrawlResult()
+        user = {"id": 7600001, "login": "oca-dev", "name": "OCA Dev"}
+        result.members = [user]
+        result.repositories = [
+            {
+                "id": 70173147,
+                "name": "interface-github",
+                "full_name": "OCA/interface-github",
+                "updated_at": "2023-03-01T10:00:00Z",
+                "pushed_at": "2023-03-01T10:00:00Z",
+            }
+        ]
+        result.branches = {"OCA/interface-github": ["12.0", "13.0"]}
+        result.teams = [{"id": 2000001, "name": "Board", "privacy": "closed"}]
+        result.team_members = {2000001: [(user, "maintainer")]}
+        result.team_repositories = {
+            2000001: [dict(result.repositories[0], permissions={"push": True})]
+        }
+        with mock.patch(
+            "odoo.addons.github_connector.models.github_organization"
+            ".crawl_organization",
+            return_value=result,
+        ) as crawl:
+            self.oca.full_update()
+        self.assertEqual(crawl.call_args[0][1], "OCA")
+        partner = self.oca.member_ids
+        self.assertEqual(partner.name, "OCA Dev")
+        self.assertEqual(self.oca.repository_ids, self.repository_interface_github)
+        self.assertEqual(
+            sorted(
+                self.repository_interface_github.repository_branch_ids.mapped("name")
+            ),
+            ["12.0", "13.0"],
+        )
+        team = self.oca.team_ids
+        self.assertEqual(team.name, "Board")
+        self.assertEqual(team.partner_ids.partner_id, partner)
+        self.assertEqual(team.partner_ids.role, "maintainer")
+        self.assertEqual(
+            team.repository_ids.repository_id, self.repository_interface_github
+        )
+        self.assertEqual(team.repository_ids.permission, "write")
+
+    @responses.activate
+    def test_crawl_renamed_branch(self):
+        """A serie branch redirected to its new name is not crawled as
+        existing, and does not stop the crawl"""
+        api_url = "https://api.github.com"
+        repository_url = api_url + "/repos/OCA/interface-github"
+        for path in ("members", "teams"):
+            responses.add(responses.GET, "%s/orgs/OCA/%s" % (api_url, path), json=[])
+        responses.add(
+            responses.GET,
+            api_url + "/orgs/OCA/repos",
+            json=[
+                {
+                    "id": 70173147,
+                    "name": "interface-github",
+                    "full_name": "OCA/interface-github",
+                    "url": repository_url,
+                }
+            ],
+        )
+        responses.add(
+            responses.GET, repository_url + "/branches/12.0", json={"name": "12.0"}
+        )
+        responses.add(
+            responses.GET,
+            repository_url + "/branches/13.0",
+            status=301,
+            json={
+                "message": "Moved Permanently",
+                "url": repository_url + "/branches/main",
+            },
+            headers={"Location": repository_url + "/branches/main"},
+        )
+        result = crawl_organization(
+            self.oca._get_github_client(), "OCA", branch_names=["12.0", "13.0"]
+        )
+        self.assertEqual(result.branches, {"OCA/interface-github": ["12.0"]})
+
+    @responses.activate
+    def test_sync_branch_graphql(self):
+        self.oca.sync_backend = "graphql"
+        responses.add(
+            responses.POST,
+            "https://api.github.com/graphql",
+            json={"data": {"r0": self._get_graphql_repository_node(["12.0", "13.0"])}},
+        )
+        self.repository_interface_github.button_sync_branch()
+        self.assertEqual(
+            sorted(
+                self.repository_interface_github.repository_branch_ids.mapped("name")
+            ),
+            ["12.0", "13.0"],
+        )
+
+    @responses.activate
+    def test_iter_github_list(self):
+        url = "https://api.github.com:443/orgs/OCA/repos"
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/orgs/OCA",
+            json={
+                "login": "OCA",
+                "id": 7600578,
+                "url": "https://api.github.com/orgs/OCA",
+            },
+        )
+        pages = [range(0, 30), range(30, 60), range(60, 65)]
+        for i, ids in enumerate(pages):
+            responses.add(
+                responses.GET,
+                url,
+                match=[matchers.query_param_matcher({"page": str(i + 1)} if i else {})],
+                json=[{"id": x} for x in ids],
+                headers={"Link": '<%s?page=3>; rel="last"' % url} if not i else {},
+            )
+        # Size of the list, requested with one item by page
+        responses.add(
+            responses.GET,
+            url,
+            match=[matchers.query_param_matcher({"per_page": "1"})],
+            json=[{"id": 0}],
+            headers={"Link": '<%s?per_page=1&page=65>; rel="last"' % url},
+        )
+        self.env["ir.config_parameter"].set_param("github.fetch_concurrency", 3)
+        gh_org = self.oca.find_related_github_object()
+        with RequestRecorder() as recorder:
+            gh_repos = self.model_gr._iter_github_list(gh_org.get_repos())
+            self.assertEqual([x.id for x in gh_repos], list(range(65)))
+        self.assertEqual(recorder.request_qty, 4)
+
+    def test_get_or_create_many(self):
+        repository_server_tools = self.model_gr.create(
+            {
+                "name": "server-tools",
+                "organization_id": self.oca.id,
+                "github_name": "OCA/server-tools",
+            }
+        )
+        gh_api = self.oca.get_github_connector()
+        gh_repos = [
+            gh_api.create_from_raw_data(
+                Repository, {"id": github_id, "name": name, "full_name": "OCA/" + name}
+            )
+            for github_id, name in [
+                (70173147, "interface-github"),
+                (20558476, "server-tools"),
+                (20558480, "web"),
+                (70173147, "interface-github"),
+            ]
+        ]
+        repositories = self.model_gr.with_context(
+            github_organization_id=self.oca.id
+        ).get_or_create_many(gh_repos)
+        self.assertEqual(len(repositories), 4)
+        self.assertEqual(repositories[0], self.repository_interface_github)
+        self.assertEqual(repositories[1], repository_server_tools)
+        self.assertEqual(repository_server_tools.github_id_external, "20558476")
+        self.assertEqual(repositories[2].name, "web")
+        self.assertEqual(repositories[2].organization_id, self.oca)
+        self.assertEqual(repositories[3], self.repository_interface_github)
+
+    @responses.activate
+    def test_get_or_create_many_complete(self):
+        """Only the partial Github objects to create are completed, together"""
+        partner_model = self.env["res.partner"]
+        partner_model.create({"name": "OCA Bot", "github_name": "oca-bot"})
+        gh_api = self.oca.get_github_connector()
+        logins = ["oca-bot", "oca-dev-1", "oca-dev-2", "oca-dev-3"]
+        gh_users = [
+            gh_api.create_from_raw_data(
+                NamedUser,
+                {
+                    "id": 7600001 + i,
+                    "login": login,
+                    "url": "https://api.github.com/users/" + login,
+                },
+            )
+            for i, login in enumerate(logins)
+        ]
+        for i, login in enumerate(logins[1:]):
+            responses.add(
+                responses.GET,
+                "https://api.github.com:443/users/" + login,
+                json={"id": 7600002 + i, "login": login, "name": "OCA Dev %d" % i},
+            )
+        self.env["ir.config_parameter"].set_param("github.fetch_concurrency", 3)
+        with RequestRecorder() as recorder:
+            partners = partner_model.get_or_create_many(gh_users)
+        self.assertEqual(recorder.request_qty, 3)
+        self.assertEqual(
+            partners.mapped("name"), ["OCA Bot", "OCA Dev 0", "OCA Dev 1", "OCA Dev 2"]
+        )
+
+    def test_plan_github_objects(self):
+        gh_api = self.oca.get_github_connector()
+        gh_repos = [
+            gh_api.create_from_raw_data(
+                Repository,
+                {
+                    "id": github_id,
+                    "name": name,
+                    "full_name": "OCA/" + name,
+                    "description": "Odoo",
+                },
+            )
+            for github_id, name in [(70173147, "interface-github"), (20558480, "web")]
+        ]
+        repository_qty = self.model_gr.search_count([])
+        plan, records = self.model_gr.with_context(
+            github_organization_id=self.oca.id
+        )._plan_github_objects(gh_repos, update=True)
+        self.assertEqual(records, {"70173147": self.repository_interface_github})
+        self.assertEqual(
+            [(x["action"], x["name"]) for x in plan],
+            [
+                ("update", self.repository_interface_github.display_name),
+                ("create", "OCA/web"),
+            ],
+        )
+        # The ids and the organization are unchanged once converted
+        self.assertEqual(
+            plan[0]["changes"],
+            "description: False → Odoo\ngithub_name: False → OCA/interface-github",
+        )
+        # Nothing is written
+        self.assertEqual(self.model_gr.search_count([]), repository_qty)
+        self.assertFalse(self.repository_interface_github.description)
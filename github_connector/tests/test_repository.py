@@ -1,6 +1,11 @@
 #  Copyright 2023 Simone Rubino - Aion Tech
 #  License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
+import responses
+from github.Repository import Repository
+
+from odoo.exceptions import ValidationError
+
 from .common import TestGithubConnectorCommon
 
 
@@ -16,3 +21,131 @@ class TestRepository(TestGithubConnectorCommon):
         display_name = repository.display_name
         self.assertIn(repository.name, display_name)
         self.assertIn(organization.github_name, display_name)
+
+    def test_update_many_from_github_data(self):
+        """Only the changed values are written, and counted by field."""
+        repositories = self.repository_ocb | self.repository_interface_github
+        counts = repositories._update_many_from_github_data(
+            [
+                {"name": self.repository_ocb.name, "description": "Odoo"},
+                {"name": "interface-github", "description": "Odoo"},
+            ]
+        )
+        self.assertEqual(counts, {"description": 2})
+        self.assertEqual(repositories.mapped("description"), ["Odoo", "Odoo"])
+        counts = repositories._update_from_github_data({"description": "Odoo"})
+        self.assertEqual(counts, {})
+
+    def test_update_many_from_github_data_converted(self):
+        """The Github data are compared once converted to the type of their
+        field: the integer ids and the synchronization date are not changes."""
+        repositories = self.repository_ocb | self.repository_interface_github
+        gh_api = self.oca.get_github_connector()
+        model = self.model_gr.with_context(github_organization_id=self.oca.id)
+        datas = [
+            model.get_odoo_data_from_github(
+                gh_api.create_from_raw_data(
+                    Repository,
+                    {
+                        "id": int(repository.github_id_external),
+                        "name": repository.name,
+                        "description": "Odoo",
+                        "pushed_at": "2023-03-01T10:00:00Z",
+                    },
+                )
+            )
+            for repository in repositories
+        ]
+        self.assertEqual(datas[0]["github_id_external"], 20558462)
+        counts = repositories._update_many_from_github_data(datas)
+        self.assertEqual(counts, {"description": 2, "github_push_date": 2})
+        self.assertTrue(all(repositories.mapped("github_last_sync_date")))
+        with self.oca._record_github_sync("Test") as recorder:
+            counts = repositories._update_many_from_github_data(datas)
+        self.assertEqual(counts, {})
+        self.assertEqual(recorder.get_record_qties(), {"github.repository": (0, 0, 2)})
+
+    def test_update_many_from_github_data_unhashable(self):
+        """The changes with unhashable values (given by an overload of
+        get_odoo_data_from_github) are written record by record."""
+        repositories = self.repository_ocb | self.repository_interface_github
+        rule = self.env.ref("github_connector.github_analysis_rule_python")
+        counts = repositories._update_many_from_github_data(
+            [
+                {"description": "Odoo", "analysis_rule_ids": [(6, 0, rule.ids)]},
+                {"description": "Odoo", "analysis_rule_ids": [(6, 0, rule.ids)]},
+            ]
+        )
+        self.assertEqual(counts, {"description": 2, "analysis_rule_ids": 2})
+        self.assertEqual(repositories.mapped("analysis_rule_ids"), rule)
+        self.assertEqual(repositories.mapped("description"), ["Odoo", "Odoo"])
+
+    @responses.activate
+    def test_get_serie_branch_names(self):
+        gh_repo = self.oca.get_github_connector().create_from_raw_data(
+            Repository,
+            {"id": 20558462, "url": "https://api.github.com/repos/OCA/OCB"},
+        )
+        serie_names = self.oca.organization_serie_ids.mapped("name")
+        for serie_name in serie_names:
+            responses.add(
+                responses.GET,
+                "https://api.github.com:443/repos/OCA/OCB/branches/" + serie_name,
+                json={"message": "Branch not found"},
+                status=404,
+            )
+        responses.replace(
+            responses.GET,
+            "https://api.github.com:443/repos/OCA/OCB/branches/13.0",
+            json={"name": "13.0"},
+        )
+        self.assertEqual(self.repository_ocb._get_serie_branch_names(gh_repo), ["13.0"])
+        self.assertEqual(len(responses.calls), len(serie_names))
+        # Too many series: all the branches are listed
+        self.env["ir.config_parameter"].set_param("github.branch_lookup_threshold", 0)
+        responses.add(
+            responses.GET,
+            "https://api.github.com:443/repos/OCA/OCB/branches",
+            json=[{"name": "13.0"}, {"name": "master"}],
+        )
+        self.assertEqual(self.repository_ocb._get_serie_branch_names(gh_repo), ["13.0"])
+
+    def test_is_ignored(self):
+        self.oca.ignored_repository_names = "OCB\nl10n-*\nre:interface-(github|gitlab)"
+        repository_l10n = self.model_gr.create(
+            {"name": "l10n-france", "organization_id": self.oca.id}
+        )
+        self.assertTrue(self.repository_ocb.is_ignored)
+        self.assertTrue(repository_l10n.is_ignored)
+        self.assertTrue(self.repository_interface_github.is_ignored)
+        self.assertEqual(
+            self.model_gr.search(
+                [("organization_id", "=", self.oca.id), ("is_ignored", "=", False)]
+            ),
+            self.oca.repository_ids.filtered(lambda x: not x.is_ignored),
+        )
+        # Only the repositories matching the new patterns are ignored
+        self.oca.ignored_repository_names = "re:OC.*"
+        self.assertTrue(self.repository_ocb.is_ignored)
+        self.assertFalse(repository_l10n.is_ignored)
+        self.assertFalse(self.repository_interface_github.is_ignored)
+        with self.assertRaises(ValidationError):
+            self.oca.ignored_repository_names = "re:(OCB"
+
+    def test_get_clone_args(self):
+        self.assertEqual(
+            self.repository_ocb._get_clone_args(), (["--single-branch"], [])
+        )
+        self.oca.write({"clone_strategy": "shallow", "clone_depth": 10})
+        self.assertEqual(
+            self.repository_ocb._get_clone_args(),
+            (["--depth", "10", "--single-branch"], ["--depth", "10"]),
+        )
+        # The strategy of the repository overrides the one of the organization
+        self.repository_ocb.clone_strategy = "full"
+        self.assertEqual(self.repository_ocb._get_clone_args(), ([], []))
+
+    def test_get_mirror_path(self):
+        self.assertTrue(self.repository_ocb._get_mirror_path().endswith("OCA/OCB.git"))
+        self.oca.source_layout = "clone"
+        self.assertIsNone(self.repository_ocb._get_mirror_path())
@@ -0,0 +1,83 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from github.Team import Team
+
+from .common import TestGithubConnectorCommon
+
+
+class TestTeam(TestGithubConnectorCommon):
+    def test_reconcile_lines(self):
+        partner_a, partner_b, partner_c = self.env["res.partner"].create(
+            [{"name": "A"}, {"name": "B"}, {"name": "C"}]
+        )
+        team = self.env["github.team"].create(
+            {
+                "name": "Board",
+                "organization_id": self.oca.id,
+                "partner_ids": [
+                    (0, 0, {"partner_id": partner_a.id, "role": "member"}),
+                    (0, 0, {"partner_id": partner_b.id, "role": "member"}),
+                ],
+            }
+        )
+        line_a = team.partner_ids.filtered(lambda x: x.partner_id == partner_a)
+        team._reconcile_lines(
+            "partner_ids",
+            "partner_id",
+            "role",
+            {partner_a.id: "maintainer", partner_c.id: "member"},
+        )
+        self.assertEqual(team.partner_ids.mapped("partner_id"), partner_a | partner_c)
+        # The existing line is updated, not recreated
+        self.assertIn(line_a, team.partner_ids)
+        self.assertEqual(line_a.role, "maintainer")
+        self.assertEqual(team.partner_qty, 2)
+
+    def test_plan_lines(self):
+        partner_a, partner_b, partner_c = self.env["res.partner"].create(
+            [{"name": "A"}, {"name": "B"}, {"name": "C"}]
+        )
+        team = self.env["github.team"].create(
+            {
+                "name": "Board",
+                "organization_id": self.oca.id,
+                "partner_ids": [
+                    (0, 0, {"partner_id": partner_a.id, "role": "member"}),
+                    (0, 0, {"partner_id": partner_b.id, "role": "member"}),
+                ],
+            }
+        )
+        plan = team._plan_lines(
+            "partner_ids",
+            "partner_id",
+            "role",
+            {"1": partner_a, "3": partner_c},
+            {"1": "maintainer", "3": "member", "4": "member"},
+        )
+        self.assertEqual(
+            sorted(x["action"] for x in plan), ["create", "create", "remove", "update"]
+        )
+        # Nothing is written
+        self.assertEqual(team.partner_ids.mapped("role"), ["member", "member"])
+
+    def test_search_github_records_by_name(self):
+        """The team slugs are unique only in their organization"""
+        organization = self.env["github.organization"].create(
+            {"name": "Other", "github_name": "other"}
+        )
+        team_model = self.env["github.team"]
+        team_oca, team_other = team_model.create(
+            [
+                {"name": "Board", "github_name": "board", "organization_id": x.id}
+                for x in (self.oca, organization)
+            ]
+        )
+        gh_team = self.oca.get_github_connector().create_from_raw_data(
+            Team, {"id": 2000001, "slug": "board"}
+        )
+        for team in (team_oca, team_other):
+            records = team_model.with_context(
+                github_organization_id=team.organization_id.id
+            )._search_github_records([gh_team])
+            self.assertEqual(records, {"2000001": team})
@@ -1,3 +1,5 @@
 from . import wizard_create_team
 from . import wizard_create_repository
 from . import wizard_load_github_model
+from . import wizard_sync_plan
+from . import wizard_sync_plan_line
@@ -0,0 +1,82 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from collections import Counter
+
+from odoo import _, api, fields, models
+
+
+class WizardSyncPlan(models.TransientModel):
+    """Dry run of the full update of Github records: what the
+    synchronization would create, update or remove. Nothing is written,
+    except this plan."""
+
+    _name = "wizard.sync.plan"
+    _description = "Wizard Github Synchronization Plan"
+
+    # Columns Section
+    name = fields.Char(string="Synchronized Records", readonly=True)
+
+    line_ids = fields.One2many(
+        comodel_name="wizard.sync.plan.line",
+        inverse_name="plan_id",
+        string="Changes",
+        readonly=True,
+    )
+
+    summary = fields.Text(string="Summary", compute="_compute_summary")
+
+    request_qty = fields.Integer(string="Github Requests", readonly=True)
+
+    network_time = fields.Float(string="Network Time (s)", readonly=True)
+
+    duration = fields.Float(string="Duration (s)", readonly=True)
+
+    @api.depends("line_ids.res_model", "line_ids.action")
+    def _compute_summary(self):
+        actions = dict(self.env["wizard.sync.plan.line"]._fields["action"].selection)
+        for plan in self:
+            qties = Counter((x.res_model, x.action) for x in plan.line_ids)
+            plan.summary = "\n".join(
+                "%s: %d %s" % (model, qty, actions[action])
+                for (model, action), qty in sorted(qties.items())
+            ) or _("Nothing to change.")
+
+    @api.model
+    def _create_from_records(self, records):
+        """Plan the full update of the records"""
+        with self.env["abstract.github.model"]._record_github_sync(
+            "Synchronization plan of %s" % ", ".join(records.mapped("display_name"))
+        ) as recorder:
+            lines = records._get_sync_plan()
+        return self.create(
+            {
+                "name": ", ".join(records.mapped("display_name")),
+                "request_qty": recorder.request_qty,
+                "network_time": recorder.network_time,
+                "duration": recorder.duration,
+                "line_ids": [(0, 0, x) for x in lines],
+            }
+        )
+
+    def _get_action(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Synchronization Plan"),
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def button_export_lines(self):
+        """Open the changes in a list, from which they can be exported"""
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Synchronization Plan"),
+            "res_model": "wizard.sync.plan.line",
+            "view_mode": "tree",
+            "domain": [("plan_id", "=", self.id)],
+        }
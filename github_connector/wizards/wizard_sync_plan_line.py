@@ -0,0 +1,32 @@
+# Copyright (C) 2016-Today: Odoo Community Association (OCA)
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields, models
+
+
+class WizardSyncPlanLine(models.TransientModel):
+    _name = "wizard.sync.plan.line"
+    _description = "Wizard Github Synchronization Plan Line"
+    _order = "plan_id, res_model, action, name"
+
+    plan_id = fields.Many2one(
+        comodel_name="wizard.sync.plan", required=True, ondelete="cascade"
+    )
+
+    res_model = fields.Char(string="Model", readonly=True)
+
+    res_id = fields.Integer(string="Record ID", readonly=True)
+
+    action = fields.Selection(
+        selection=[
+            ("create", "To Create"),
+            ("update", "To Update"),
+            ("remove", "To Remove"),
+        ],
+        string="Action",
+        readonly=True,
+    )
+
+    name = fields.Char(string="Name", readonly=True)
+
+    changes = fields.Text(string="Changes", readonly=True)